@@ -1,11 +1,10 @@
+import argparse
+import time
 import pandas as pd
 import numpy as np
 import random
 import string
 
-# Set seed for reproducibility
-np.random.seed(42)
-
 # Common Hindi names (first names)
 hindi_first_names = [
     "Aarav", "Aditya", "Amit", "Ananya", "Arjun", "Deepak", "Divya", "Gaurav", 
@@ -19,28 +18,42 @@ hindi_surnames = [
     "Chauhan", "Yadav", "Agarwal", "Mehta", "Choudhary", "Shah", "Trivedi"
 ]
 
+# Common transliteration variations of Hindi names
+transliteration_variations = {
+    "aa": "a",
+    "ee": "i",
+    "oo": "u",
+    "sh": "s",
+    "ks": "x",
+    "v": "w",
+    "ph": "f",
+    "th": "t",
+    "kh": "k",
+    "a": "aa",
+    "i": "ee",
+    "u": "oo"
+}
+
+# Phonetic variations common in Hindi names
+phonetic_variations = {
+    "v": "b",
+    "w": "v",
+    "f": "ph",
+    "s": "sh",
+    "z": "j",
+    "t": "th",
+    "d": "dh",
+    "n": "nn",
+    "m": "mm"
+}
+
 # Functions to generate variations
 
 def generate_transliteration_variation(name):
     """Generate common transliteration variations of Hindi names."""
-    variations = {
-        "aa": "a",
-        "ee": "i",
-        "oo": "u",
-        "sh": "s",
-        "ks": "x",
-        "v": "w",
-        "ph": "f",
-        "th": "t",
-        "kh": "k",
-        "a": "aa",
-        "i": "ee",
-        "u": "oo"
-    }
-    
     # Choose one variation to apply
     possible_variations = []
-    for old, new in variations.items():
+    for old, new in transliteration_variations.items():
         if old in name.lower():
             possible_variations.append((old, new))
     
@@ -72,18 +85,6 @@ def introduce_typo(name):
 
 def generate_phonetic_variation(name):
     """Generate phonetic variations common in Hindi names."""
-    phonetic_variations = {
-        "v": "b",
-        "w": "v",
-        "f": "ph",
-        "s": "sh",
-        "z": "j",
-        "t": "th",
-        "d": "dh",
-        "n": "nn",
-        "m": "mm"
-    }
-    
     possible_variations = []
     for old, new in phonetic_variations.items():
         if old in name.lower():
@@ -95,121 +96,371 @@ def generate_phonetic_variation(name):
     old, new = random.choice(possible_variations)
     return name.replace(old, new, 1)
 
-# Generate dataset
-num_samples = 1000
-data = []
-
-for _ in range(num_samples):
-    # Create a standard name
-    first_name = random.choice(hindi_first_names)
-    last_name = random.choice(hindi_surnames)
-    standard_name = f"{first_name} {last_name}"
-    person_id = f"PID{random.randint(10000, 99999)}"
-    
-    # Add the standard entry
-    data.append({
-        'person_id': person_id,
-        'name': standard_name,
-        'name_type': 'standard',
-        'case_id': f"C{random.randint(1000, 9999)}",
-        'role': random.choice(['witness', 'suspect', 'victim', 'reporter']),
-        'is_matching_pair': 1
-    })
+def generate_dataset(num_samples=1000, seed=42):
+    """Generate name records: one standard name per person plus 1-3 variations,
+    and a non-matching name for about 30% of people.
     
-    # Add variations
-    num_variations = random.randint(1, 3)
-    for i in range(num_variations):
-        variation_type = random.choice(['transliteration', 'typo', 'phonetic'])
-        
-        if variation_type == 'transliteration':
-            varied_first = generate_transliteration_variation(first_name)
-            varied_last = generate_transliteration_variation(last_name)
-        elif variation_type == 'typo':
-            varied_first = introduce_typo(first_name)
-            varied_last = introduce_typo(last_name)
-        else:  # phonetic
-            varied_first = generate_phonetic_variation(first_name)
-            varied_last = generate_phonetic_variation(last_name)
-        
-        varied_name = f"{varied_first} {varied_last}"
+    The same num_samples and seed always give the same records.
+    """
+    # Set seeds for reproducibility
+    random.seed(seed)
+    np.random.seed(seed)
+    
+    data = []
+    for _ in range(num_samples):
+        # Create a standard name
+        first_name = random.choice(hindi_first_names)
+        last_name = random.choice(hindi_surnames)
+        standard_name = f"{first_name} {last_name}"
+        person_id = f"PID{random.randint(10000, 99999)}"
         
+        # Add the standard entry
         data.append({
-            'person_id': person_id,  # Same person_id indicates it's the same person
-            'name': varied_name,
-            'name_type': variation_type,
+            'person_id': person_id,
+            'name': standard_name,
+            'name_type': 'standard',
             'case_id': f"C{random.randint(1000, 9999)}",
             'role': random.choice(['witness', 'suspect', 'victim', 'reporter']),
             'is_matching_pair': 1
         })
-    
-    # Add some non-matching pairs for training
-    if random.random() < 0.3:  # 30% chance to add a non-matching pair
-        diff_first_name = random.choice([n for n in hindi_first_names if n != first_name])
-        diff_last_name = random.choice([n for n in hindi_surnames if n != last_name])
         
-        if random.random() < 0.5:
-            non_match_name = f"{diff_first_name} {last_name}"
-        else:
-            non_match_name = f"{first_name} {diff_last_name}"
+        # Add variations
+        num_variations = random.randint(1, 3)
+        for i in range(num_variations):
+            variation_type = random.choice(['transliteration', 'typo', 'phonetic'])
+            
+            if variation_type == 'transliteration':
+                varied_first = generate_transliteration_variation(first_name)
+                varied_last = generate_transliteration_variation(last_name)
+            elif variation_type == 'typo':
+                varied_first = introduce_typo(first_name)
+                varied_last = introduce_typo(last_name)
+            else:  # phonetic
+                varied_first = generate_phonetic_variation(first_name)
+                varied_last = generate_phonetic_variation(last_name)
+            
+            varied_name = f"{varied_first} {varied_last}"
+            
+            data.append({
+                'person_id': person_id,  # Same person_id indicates it's the same person
+                'name': varied_name,
+                'name_type': variation_type,
+                'case_id': f"C{random.randint(1000, 9999)}",
+                'role': random.choice(['witness', 'suspect', 'victim', 'reporter']),
+                'is_matching_pair': 1
+            })
         
-        data.append({
-            'person_id': f"PID{random.randint(10000, 99999)}",  # Different person_id
-            'name': non_match_name,
-            'name_type': 'non_matching',
-            'case_id': f"C{random.randint(1000, 9999)}",
-            'role': random.choice(['witness', 'suspect', 'victim', 'reporter']),
-            'is_matching_pair': 0
-        })
+        # Add some non-matching pairs for training
+        if random.random() < 0.3:  # 30% chance to add a non-matching pair
+            diff_first_name = random.choice([n for n in hindi_first_names if n != first_name])
+            diff_last_name = random.choice([n for n in hindi_surnames if n != last_name])
+            
+            if random.random() < 0.5:
+                non_match_name = f"{diff_first_name} {last_name}"
+            else:
+                non_match_name = f"{first_name} {diff_last_name}"
+            
+            data.append({
+                'person_id': f"PID{random.randint(10000, 99999)}",  # Different person_id
+                'name': non_match_name,
+                'name_type': 'non_matching',
+                'case_id': f"C{random.randint(1000, 9999)}",
+                'role': random.choice(['witness', 'suspect', 'victim', 'reporter']),
+                'is_matching_pair': 0
+            })
+    
+    return pd.DataFrame(data)
 
-# Create DataFrame and save to CSV
-df = pd.DataFrame(data)
-
-# Create pairs for training
-pairs = []
-for idx, row in df.iterrows():
-    # For each name, create matching and non-matching pairs
-    # Matching pairs (same person_id)
-    matches = df[(df['person_id'] == row['person_id']) & (df.index != idx)]
-    for _, match in matches.iterrows():
-        pairs.append({
-            'name1': row['name'],
-            'name2': match['name'],
-            'is_match': 1
-        })
+def generate_pairs(df):
+    """Training pairs: every matching pair within a person_id plus two sampled non-matches per name."""
+    pairs = []
+    for idx, row in df.iterrows():
+        # For each name, create matching and non-matching pairs
+        # Matching pairs (same person_id)
+        matches = df[(df['person_id'] == row['person_id']) & (df.index != idx)]
+        for _, match in matches.iterrows():
+            pairs.append({
+                'name1': row['name'],
+                'name2': match['name'],
+                'is_match': 1
+            })
+        
+        # Non-matching pairs (different person_id)
+        non_matches = df[(df['person_id'] != row['person_id'])]
+        # Sample a few non-matches to keep dataset balanced
+        non_matches_sample = non_matches.sample(min(2, len(non_matches)))
+        for _, non_match in non_matches_sample.iterrows():
+            pairs.append({
+                'name1': row['name'],
+                'name2': non_match['name'],
+                'is_match': 0
+            })
     
-    # Non-matching pairs (different person_id)
-    non_matches = df[(df['person_id'] != row['person_id'])]
-    # Sample a few non-matches to keep dataset balanced
-    non_matches_sample = non_matches.sample(min(2, len(non_matches)))
-    for _, non_match in non_matches_sample.iterrows():
-        pairs.append({
-            'name1': row['name'],
-            'name2': non_match['name'],
-            'is_match': 0
-        })
+    return pd.DataFrame(pairs)
 
-pairs_df = pd.DataFrame(pairs)
+# Streaming generation for large corpora. Every variant a variation
+# function can produce from a base name is enumerated once into a table;
+# chunks of people are then sampled from the tables with NumPy, so a chunk
+# costs a few array operations per column instead of Python calls per
+# record. Chunk k draws from its own seed spawned from the run seed, so a
+# given seed, size and chunk size always give the same corpus.
 
-# Display sample from original dataset
-print("Original Dataset Sample:")
-print(df.head())
-print(f"\nTotal records: {len(df)}")
+VARIATION_TYPES = ('transliteration', 'typo', 'phonetic')
+TYPO_KINDS = ('swap', 'drop', 'add', 'replace')
+ROLES = np.array(['witness', 'suspect', 'victim', 'reporter'], dtype=object)
 
-# Display sample from pairs dataset
-print("\nPairs Dataset Sample:")
-print(pairs_df.head())
-print(f"\nTotal pairs: {len(pairs_df)}")
+# People per chunk; memory use depends on this, not on the corpus size
+DEFAULT_CHUNK_SIZE = 100000
 
-# Save datasets
-df.to_csv('hindi_names_dataset.csv', index=False)
-pairs_df.to_csv('hindi_names_pairs_dataset.csv', index=False)
+def substitution_variants(name, variations):
+    """Every name one of the given replacements can produce, as generate_*_variation applies them."""
+    variants = [name.replace(old, new, 1) for old, new in variations.items() if old in name.lower()]
+    return variants or [name]
 
-# Print counts
-print("\nVariation Types:")
-print(df['name_type'].value_counts())
+def typo_variants(name, kind):
+    """Every name one typo of the given kind can produce at positions 1..len-1."""
+    if len(name) <= 2:
+        return [name]
+    positions = range(1, len(name))
+    if kind == 'swap':
+        variants = [name[:p] + name[p + 1] + name[p] + name[p + 2:] for p in positions if p < len(name) - 1]
+    elif kind == 'drop':
+        variants = [name[:p] + name[p + 1:] for p in positions]
+    elif kind == 'add':
+        variants = [name[:p] + c + name[p:] for p in positions for c in string.ascii_lowercase]
+    else:  # replace
+        variants = [name[:p] + c + name[p + 1:] for p in positions for c in string.ascii_lowercase]
+    return variants or [name]
+
+class VariationTable:
+    """Every variant of every base name by variation kind, padded into one object array.
+    
+    Kinds are transliteration, phonetic and one per typo kind, in that order.
+    """
+    kinds = ('transliteration', 'phonetic') + tuple(f"typo_{kind}" for kind in TYPO_KINDS)
+    
+    def __init__(self, names):
+        self.names = np.array(names, dtype=object)
+        variants = [
+            [substitution_variants(name, transliteration_variations) for name in names],
+            [substitution_variants(name, phonetic_variations) for name in names]
+        ] + [[typo_variants(name, kind) for name in names] for kind in TYPO_KINDS]
+        width = max(len(v) for kind in variants for v in kind)
+        self.table = np.empty((len(self.kinds), len(names), width), dtype=object)
+        self.counts = np.zeros((len(self.kinds), len(names)), dtype=np.int64)
+        for k, kind in enumerate(variants):
+            for n, name_variants in enumerate(kind):
+                self.table[k, n, :len(name_variants)] = name_variants
+                self.counts[k, n] = len(name_variants)
+    
+    def sample(self, rng, kinds, indices):
+        """One uniformly chosen variant of base name indices[i] of kind kinds[i], for every i."""
+        choice = (rng.random(len(indices)) * self.counts[kinds, indices]).astype(np.int64)
+        return self.table[kinds, indices, choice]
 
-print("\nRole Distribution:")
-print(df['role'].value_counts())
+first_name_table = VariationTable(hindi_first_names)
+surname_table = VariationTable(hindi_surnames)
+
+def _variation_kinds(rng, types):
+    """VariationTable kind per variation type (0 transliteration, 1 typo, 2 phonetic); typos pick a kind each."""
+    typo = 2 + rng.integers(len(TYPO_KINDS), size=len(types))
+    return np.where(types == 0, 0, np.where(types == 2, 1, typo))
+
+def generate_record_chunk(rng, first_person, count, mix=(1, 1, 1), variations=(1, 3), non_match_rate=0.3):
+    """Records for people first_person..first_person+count-1, with the columns of generate_dataset.
+    
+    Every person has a standard name and variations[0]..variations[1]
+    variations, whose types are drawn with weights mix (transliteration,
+    typo, phonetic); with probability non_match_rate a non-matching name
+    (first or last name swapped for another) follows as a separate person.
+    """
+    weights = np.asarray(mix, dtype=np.float64) / np.sum(mix)
+    first = rng.integers(len(hindi_first_names), size=count)
+    last = rng.integers(len(hindi_surnames), size=count)
+    
+    # Variations, person by person
+    num_variations = rng.integers(variations[0], variations[1] + 1, size=count)
+    owner = np.repeat(np.arange(count), num_variations)
+    types = rng.choice(len(VARIATION_TYPES), size=len(owner), p=weights)
+    varied = (first_name_table.sample(rng, _variation_kinds(rng, types), first[owner]) + ' '
+              + surname_table.sample(rng, _variation_kinds(rng, types), last[owner]))
+    slot = np.arange(len(owner)) - np.repeat(np.cumsum(num_variations) - num_variations, num_variations) + 1
+    
+    # Non-matching names: a different first or last name, each half of the time
+    non_match = np.flatnonzero(rng.random(count) < non_match_rate)
+    change_first = rng.random(len(non_match)) < 0.5
+    other_first = (first[non_match] + rng.integers(1, len(hindi_first_names), size=len(non_match))) % len(hindi_first_names)
+    other_last = (last[non_match] + rng.integers(1, len(hindi_surnames), size=len(non_match))) % len(hindi_surnames)
+    non_match_names = (first_name_table.names[np.where(change_first, other_first, first[non_match])] + ' '
+                       + surname_table.names[np.where(change_first, last[non_match], other_last)])
+    
+    person = np.concatenate([np.arange(count), owner, non_match])
+    slot = np.concatenate([np.zeros(count, dtype=np.int64), slot, np.full(len(non_match), variations[1] + 1)])
+    order = np.lexsort((slot, person))
+    is_non_match = np.concatenate([np.zeros(count + len(owner), dtype=bool), np.ones(len(non_match), dtype=bool)])
+    names = np.concatenate([first_name_table.names[first] + ' ' + surname_table.names[last], varied, non_match_names])
+    name_types = np.concatenate([np.full(count, 'standard', dtype=object),
+                                 np.array(VARIATION_TYPES, dtype=object)[types],
+                                 np.full(len(non_match), 'non_matching', dtype=object)])
+    
+    # Non-matching names are separate people: odd ids next to their person's even id
+    person_ids = 2 * (first_person + person) + is_non_match
+    total = len(person)
+    return pd.DataFrame({
+        'person_id': np.char.mod('PID%010d', person_ids[order]).astype(object),
+        'name': names[order],
+        'name_type': name_types[order],
+        'case_id': np.char.mod('C%d', rng.integers(1000, 10000, size=total)).astype(object),
+        'role': ROLES[rng.integers(len(ROLES), size=total)],
+        'is_matching_pair': (~is_non_match[order]).astype(np.int64)
+    })
+
+def generate_pair_chunk(rng, records, non_matches_per_name=2):
+    """Labelled pairs within a chunk of records, like generate_pairs.
+    
+    Every ordered pair of records sharing a person_id is a match, and every
+    record is paired with non_matches_per_name records of other people
+    drawn from the same chunk.
+    """
+    groups = pd.factorize(records['person_id'])[0]
+    names = records['name'].to_numpy(dtype=object)
+    order = np.argsort(groups, kind='stable')
+    sizes = np.bincount(groups)
+    starts = np.cumsum(sizes) - sizes
+    
+    # Matching pairs: all ordered pairs within each group, groups of one size at a time
+    first_rows, second_rows = [], []
+    for size in np.unique(sizes[sizes > 1]):
+        a, b = np.nonzero(~np.eye(size, dtype=bool))
+        group_starts = starts[sizes == size][:, None]
+        first_rows.append(order[(group_starts + a).ravel()])
+        second_rows.append(order[(group_starts + b).ravel()])
+    match_first = np.concatenate(first_rows) if first_rows else np.empty(0, dtype=np.int64)
+    match_second = np.concatenate(second_rows) if second_rows else np.empty(0, dtype=np.int64)
+    
+    # Non-matching pairs: redraw partners of the same person or with the same name,
+    # dropping the few still left after a bounded number of rounds
+    non_first = np.repeat(np.arange(len(names)), non_matches_per_name)
+    non_second = rng.integers(len(names), size=len(non_first))
+    same = np.flatnonzero((groups[non_second] == groups[non_first]) | (names[non_second] == names[non_first]))
+    for _ in range(100):
+        if not len(same):
+            break
+        non_second[same] = rng.integers(len(names), size=len(same))
+        same = same[(groups[non_second[same]] == groups[non_first[same]])
+                    | (names[non_second[same]] == names[non_first[same]])]
+    keep = np.ones(len(non_first), dtype=bool)
+    keep[same] = False
+    non_first, non_second = non_first[keep], non_second[keep]
+    
+    # Grouped by the first name's record, its matches before its non-matches
+    first = np.concatenate([match_first, non_first])
+    second = np.concatenate([match_second, non_second])
+    is_match = np.concatenate([np.ones(len(match_first), dtype=np.int64), np.zeros(len(non_first), dtype=np.int64)])
+    order = np.lexsort((1 - is_match, first))
+    return pd.DataFrame({'name1': names[first[order]], 'name2': names[second[order]], 'is_match': is_match[order]})
+
+def generate_chunks(num_people, seed=42, chunk_size=DEFAULT_CHUNK_SIZE, mix=(1, 1, 1), variations=(1, 3),
+                    non_match_rate=0.3, non_matches_per_name=2):
+    """Yield (records, pairs) DataFrames for num_people people, chunk_size people at a time."""
+    starts = range(0, num_people, chunk_size)
+    for start, chunk_seed in zip(starts, np.random.SeedSequence(seed).spawn(len(starts))):
+        rng = np.random.default_rng(chunk_seed)
+        records = generate_record_chunk(rng, start, min(chunk_size, num_people - start), mix, variations,
+                                        non_match_rate)
+        yield records, generate_pair_chunk(rng, records, non_matches_per_name)
+
+class ChunkWriter:
+    """Appends DataFrame chunks to one CSV or Parquet file (one row group per chunk)."""
+    
+    def __init__(self, path, file_format='csv'):
+        self.path = path
+        self.format = file_format
+        self.rows = 0
+        self._parquet = None
+    
+    def write(self, df):
+        if self.format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+        self.rows += len(df)
+    
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+def parse_mix(values):
+    """Variation weights from KEY=WEIGHT arguments, in VARIATION_TYPES order (missing types get 0)."""
+    weights = dict.fromkeys(VARIATION_TYPES, 0.0)
+    for value in values:
+        key, _, weight = value.partition('=')
+        if key not in weights or not weight:
+            raise ValueError(f"Expected TYPE=WEIGHT with TYPE one of {', '.join(VARIATION_TYPES)}, got {value!r}")
+        weights[key] = float(weight)
+    if sum(weights.values()) <= 0:
+        raise ValueError("At least one variation weight must be positive")
+    return tuple(weights[key] for key in VARIATION_TYPES)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Hindi name corpus and labelled pairs.")
+    parser.add_argument('--people', type=int, default=1000, help="People to generate (about 3.3 records each)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="People per chunk")
+    parser.add_argument('--mix', nargs='+', default=['transliteration=1', 'typo=1', 'phonetic=1'],
+                        help="Variation type weights as TYPE=WEIGHT")
+    parser.add_argument('--variations', type=int, nargs=2, default=[1, 3], metavar=('MIN', 'MAX'),
+                        help="Variations per person")
+    parser.add_argument('--non-match-rate', type=float, default=0.3,
+                        help="Share of people followed by a non-matching name")
+    parser.add_argument('--non-matches-per-name', type=int, default=2, help="Non-matching pairs per record")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--records', help="Records output (default hindi_names_dataset.<format>)")
+    parser.add_argument('--pairs', help="Pairs output (default hindi_names_pairs_dataset.<format>)")
+    parser.add_argument('--no-pairs', action='store_true', help="Only write the records")
+    args = parser.parse_args()
+    
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.format == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            parser.error("--format parquet needs pyarrow (pip install pyarrow)")
+    
+    records_writer = ChunkWriter(args.records or f"hindi_names_dataset.{args.format}", args.format)
+    pairs_writer = None if args.no_pairs else ChunkWriter(args.pairs or f"hindi_names_pairs_dataset.{args.format}",
+                                                          args.format)
+    name_types = pd.Series(dtype=np.int64)
+    matches = 0
+    start = time.perf_counter()
+    for records, pairs in generate_chunks(args.people, args.seed, args.chunk_size, mix, tuple(args.variations),
+                                          args.non_match_rate, args.non_matches_per_name):
+        records_writer.write(records)
+        name_types = name_types.add(records['name_type'].value_counts(), fill_value=0)
+        if pairs_writer is not None:
+            pairs_writer.write(pairs)
+            matches += int(pairs['is_match'].sum())
+        print(f"  {records_writer.rows} records, {pairs_writer.rows if pairs_writer else 0} pairs "
+              f"({time.perf_counter() - start:.1f}s)")
+    records_writer.close()
+    if pairs_writer is not None:
+        pairs_writer.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"\nWrote {records_writer.rows} records to {records_writer.path} "
+          f"({records_writer.rows / max(elapsed, 1e-9):,.0f} records/s)")
+    print("Variation types:")
+    print(name_types.astype(np.int64).to_string())
+    if pairs_writer is not None:
+        print(f"Wrote {pairs_writer.rows} pairs to {pairs_writer.path} ({matches} matches)")
 
-print("\nMatch Distribution in Pairs:")
-print(pairs_df['is_match'].value_counts())
\ No newline at end of file
+if __name__ == '__main__':
+    main()
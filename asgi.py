@@ -0,0 +1,223 @@
+"""Production ASGI front end for the name matching API.
+
+The CPU-bound endpoints (/api/compare, /api/search, /api/registry/search)
+are scored in a bounded pool of worker processes, so one slow search no
+longer blocks every other request. Every other route is served by the
+Flask app in server.py.
+
+Requests beyond the pool's workers wait in a bounded queue; when that is
+full the server answers 429 with Retry-After instead of piling up work.
+On shutdown new scoring requests get 503, in-flight ones are allowed to
+finish, and then the pool is shut down.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --timeout-graceful-shutdown 30
+
+Settings (environment):
+    SCORING_WORKERS        worker processes (default: number of CPUs)
+    SCORING_QUEUE          requests allowed to wait for a worker (default: 4 per worker)
+    SHUTDOWN_TIMEOUT       seconds to wait for in-flight scoring on shutdown (default: 30)
+    COMPARE_BATCH_WAIT_MS  micro-batch concurrent /api/compare calls for up to this long
+                           before scoring them as one pool job (default: 0, off)
+    COMPARE_BATCH_SIZE     maximum compare requests per micro-batch (default: 64)
+    METRICS_DIR            where worker processes publish their timing histograms for
+                           /api/metrics (default: a temporary directory)
+
+Every batched compare request counts against the capacity, so raise
+SCORING_QUEUE to at least COMPARE_BATCH_SIZE when batching is on.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+# Must be set before metrics is imported, so the workers inherit it
+_temporary_metrics_dir = None
+if not os.environ.get('METRICS_DIR'):
+    _temporary_metrics_dir = os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='hnm-metrics-')
+
+import metrics
+import server
+from batching import MicroBatcher
+
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', os.cpu_count() or 1))
+SCORING_QUEUE = int(os.environ.get('SCORING_QUEUE', 4 * SCORING_WORKERS))
+SHUTDOWN_TIMEOUT = float(os.environ.get('SHUTDOWN_TIMEOUT', 30))
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class PoolClosed(Exception):
+    """Raised for requests arriving after shutdown has started."""
+
+
+def _init_worker():
+    # Importing server loads the model, registry and result cache once per worker
+    import server  # noqa: F401
+
+
+def _call(func, *args):
+    """Run a scoring job in a worker, then publish the worker's metrics if due.
+
+    Each worker picks up retrained model files itself before scoring.
+    """
+    server.reload_models_if_changed()
+    try:
+        return func(*args)
+    finally:
+        metrics.flush_if_due()
+
+
+class ScoringPool:
+    """Process pool with a bounded number of running plus queued jobs."""
+
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.pending = 0
+        self.accepting = False
+        self.executor = None
+        self._idle = None
+
+    def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.accepting = True
+
+    async def run(self, func, *args):
+        """Run func(*args) in a worker process, subject to the capacity limit."""
+        loop = asyncio.get_running_loop()
+        return await self.admit(lambda: loop.run_in_executor(self.executor, _call, func, *args))
+
+    async def admit(self, start):
+        """Await the awaitable returned by start(), subject to the capacity limit."""
+        # Only touched from the event loop thread, so the counter needs no lock
+        if not self.accepting:
+            raise PoolClosed()
+        if self.pending >= self.capacity:
+            raise PoolSaturated()
+        self.pending += 1
+        self._idle.clear()
+        try:
+            return await start()
+        finally:
+            self.pending -= 1
+            if not self.pending:
+                self._idle.set()
+
+    async def shutdown(self, timeout):
+        """Stop accepting work, let in-flight jobs finish, then stop the workers."""
+        self.accepting = False
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+pool = ScoringPool(SCORING_WORKERS, SCORING_QUEUE)
+
+# Started in lifespan when COMPARE_BATCH_WAIT_MS > 0
+compare_batcher = None
+
+
+def submit_compare_batch(batch):
+    """Score a micro-batch of compare requests as one pool job, without waiting for it."""
+    return pool.executor.submit(_call, server.compare_batch_response, batch)
+
+
+async def score(request, handler, batcher=None):
+    """Run one of server.py's response functions in the scoring pool."""
+    start = time.perf_counter()
+    response = await _score(request, handler, batcher)
+    metrics.request_seconds.observe(time.perf_counter() - start, request.url.path, str(response.status_code))
+    return response
+
+
+async def _score(request, handler, batcher):
+    try:
+        data = await request.json()
+    except ValueError:
+        return JSONResponse({'error': 'Request body must be JSON'}, status_code=400)
+
+    if batcher is not None:
+        # Checked before queueing, so an invalid request cannot fail the batch it would join
+        error = server.compare_request_error(data)
+        if error:
+            return JSONResponse(error[0], status_code=error[1])
+
+    try:
+        if batcher is not None:
+            body, status = await pool.admit(lambda: asyncio.wrap_future(batcher.submit(data)))
+        else:
+            body, status = await pool.run(handler, data)
+    except PoolSaturated:
+        return JSONResponse({'error': 'Server is busy, retry later'}, status_code=429,
+                            headers={'Retry-After': '1'})
+    except PoolClosed:
+        return JSONResponse({'error': 'Server is shutting down'}, status_code=503)
+    with metrics.stage_seconds.time('serialization'):
+        return JSONResponse(body, status_code=status)
+
+
+async def compare_names(request):
+    return await score(request, server.compare_response, compare_batcher)
+
+
+async def search_names(request):
+    return await score(request, server.search_response)
+
+
+async def search_registry(request):
+    return await score(request, server.registry_search_response)
+
+
+async def pool_status(request):
+    return JSONResponse({
+        'workers': pool.workers,
+        'capacity': pool.capacity,
+        'pending': pool.pending,
+        'accepting': pool.accepting,
+        'compare_batching': compare_batcher.stats() if compare_batcher else None
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global compare_batcher
+    metrics.clear_snapshots()
+    pool.start()
+    if server.COMPARE_BATCH_WAIT_MS > 0:
+        compare_batcher = MicroBatcher(submit_compare_batch, server.COMPARE_BATCH_SIZE,
+                                       server.COMPARE_BATCH_WAIT_MS)
+    yield
+    pool.accepting = False
+    if compare_batcher is not None:
+        compare_batcher.close()
+    await pool.shutdown(SHUTDOWN_TIMEOUT)
+    if _temporary_metrics_dir:
+        shutil.rmtree(_temporary_metrics_dir, ignore_errors=True)
+
+
+app = Starlette(
+    routes=[
+        Route('/api/compare', compare_names, methods=['POST']),
+        Route('/api/search', search_names, methods=['POST']),
+        Route('/api/registry/search', search_registry, methods=['POST']),
+        Route('/api/pool', pool_status, methods=['GET']),
+        # Everything else (static files, bulk compare, feature importance, ...) stays on Flask
+        Mount('/', app=WSGIMiddleware(server.app)),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,104 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Collects concurrent requests and scores them with one call.
+
+    Callers submit() items from any thread and get a Future back. A
+    background thread takes the first waiting item, keeps collecting until
+    it has max_batch items or max_wait_ms has passed since that first item,
+    then calls score_batch(items), which must return one result per item
+    in the same order. Each result is set on its caller's Future; if
+    score_batch raises, every Future in the batch gets the exception.
+
+    score_batch may instead return a concurrent.futures.Future of the
+    results (e.g. from a process pool), in which case the next batch is
+    collected while this one is still being scored.
+    """
+
+    def __init__(self, score_batch, max_batch=64, max_wait_ms=2.0):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def close(self):
+        """Score whatever is already queued, then stop the background thread."""
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                # Put the stop marker back so the loop ends after this batch
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = self.score_batch([item for item, _ in batch])
+            except Exception as e:
+                self._fail(batch, e)
+                continue
+            if isinstance(results, Future):
+                results.add_done_callback(lambda done, batch=batch: self._resolve(batch, done))
+            else:
+                self._deliver(batch, results)
+
+    def _resolve(self, batch, done):
+        error = done.exception()
+        if error is not None:
+            self._fail(batch, error)
+        else:
+            self._deliver(batch, done.result())
+
+    def _deliver(self, batch, results):
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _fail(self, batch, error):
+        for _, future in batch:
+            future.set_exception(error)
+
+    def stats(self):
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': self.items / self.batches if self.batches else 0.0
+        }
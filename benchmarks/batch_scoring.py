@@ -0,0 +1,54 @@
+"""Compare per-candidate scoring with the batched find_matches path.
+
+Run from the repository root:
+    python -m benchmarks.batch_scoring
+"""
+import time
+
+import pandas as pd
+
+from matcher import HindiNameMatcher, extract_features, load_model
+
+SIZES = [100, 1000, 10000]
+QUERY = "Suresh Kumar"
+
+
+def loop_find_matches(matcher, query_name, candidate_names, threshold=0.5):
+    """The original implementation: one predict_proba call per candidate."""
+    matches = []
+    for candidate in candidate_names:
+        features = extract_features(query_name, candidate)
+        probability = matcher.model.predict_proba([features])[0][1]
+        if probability >= threshold:
+            matches.append({'name': candidate, 'confidence': probability})
+    matches.sort(key=lambda x: x['confidence'], reverse=True)
+    return matches
+
+
+def candidates_of_size(names, size):
+    """Cycle through the dataset names until we have `size` candidates."""
+    return [names[i % len(names)] for i in range(size)]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    matcher = HindiNameMatcher(load_model("hindi_name_matcher.pkl"))
+    names = pd.read_csv("hindi_names_dataset.csv")['name'].tolist()
+
+    print(f"{'candidates':>10} {'loop (s)':>10} {'batch (s)':>10} {'speedup':>8}")
+    for size in SIZES:
+        candidates = candidates_of_size(names, size)
+        loop_matches, loop_time = timed(loop_find_matches, matcher, QUERY, candidates)
+        batch_matches, batch_time = timed(matcher.find_matches, QUERY, candidates)
+
+        assert [m['name'] for m in loop_matches] == [m['name'] for m in batch_matches]
+        print(f"{size:>10} {loop_time:>10.3f} {batch_time:>10.3f} {loop_time / batch_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""Check how much phonetic blocking prunes and how many true matches it keeps.
+
+Run from the repository root:
+    python -m benchmarks.blocking_recall
+"""
+import pandas as pd
+
+from matcher import blocking_recall
+
+
+def main():
+    pairs_df = pd.read_csv("hindi_names_pairs_dataset.csv")
+    stats = blocking_recall(pairs_df[['name1', 'name2', 'is_match']].itertuples(index=False))
+
+    print(f"Queries:                  {stats['queries']}")
+    print(f"Indexed names:            {stats['indexed_names']}")
+    print(f"True matches:             {stats['true_matches']}")
+    print(f"Recall:                   {stats['recall']:.4f}")
+    print(f"Candidates scored:        {stats['candidates_scored']} of {stats['candidates_total']}")
+    print(f"Mean candidates / query:  {stats['mean_candidates_per_query']:.1f}")
+    print(f"Reduction ratio:          {stats['reduction_ratio']:.4f}")
+
+
+if __name__ == '__main__':
+    main()
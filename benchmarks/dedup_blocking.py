@@ -0,0 +1,61 @@
+"""Check that dedup's block_pairs emits every blocked pair exactly once.
+
+For each --max-block-size, the pairs block_pairs yields must be exactly
+the pairs that share at least one block within the limit, with no
+duplicates, including pairs whose smallest shared block is skipped.
+Starting at a later block (as a resumed run does) must yield exactly the
+pairs of the full run from that block on.
+
+Run from the repository root:
+    python -m benchmarks.dedup_blocking
+    python -m benchmarks.dedup_blocking --data records.csv --max-block-size 50 500 2000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from dedup import block_pairs
+from matcher import BlockingIndex, blocking_keys
+
+
+def expected_pairs(blocks, max_block_size):
+    """Pairs sharing at least one block with at most max_block_size names."""
+    pairs = set()
+    for ids in blocks.values():
+        if len(ids) <= max_block_size:
+            ids = sorted(ids)
+            pairs.update((i, j) for a, i in enumerate(ids) for j in ids[a + 1:])
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check dedup block pairing against all blocked pairs.")
+    parser.add_argument('--data', default="hindi_names_dataset.csv", help="CSV with a name column")
+    parser.add_argument('--max-block-size', type=int, nargs='+', default=[20, 100, 2000])
+    args = parser.parse_args()
+
+    names = sorted(set(pd.read_csv(args.data, usecols=['name'], dtype=str)['name'].fillna('')))
+    index = BlockingIndex(names)
+    name_keys = [blocking_keys(name) for name in names]
+    print(f"{len(names)} names, {len(index.blocks)} blocks")
+
+    for max_block_size in args.max_block_size:
+        start = time.perf_counter()
+        emitted = [(i, j) for _, i, j in block_pairs(index.blocks, name_keys, max_block_size)]
+        elapsed = time.perf_counter() - start
+        expected = expected_pairs(index.blocks, max_block_size)
+        oversized = sum(len(ids) > max_block_size for ids in index.blocks.values())
+        print(f"max block size {max_block_size:>6}: {len(emitted)} pairs in {elapsed:.1f}s, "
+              f"{oversized} blocks skipped")
+        assert len(emitted) == len(set(emitted)), "a pair was emitted more than once"
+        assert set(emitted) == expected, (f"{len(expected - set(emitted))} blocked pairs missing, "
+                                          f"{len(set(emitted) - expected)} unexpected")
+        start_block = len(index.blocks) // 2
+        resumed = list(block_pairs(index.blocks, name_keys, max_block_size, start_block=start_block))
+        full = list(block_pairs(index.blocks, name_keys, max_block_size))
+        assert resumed == [pair for pair in full if pair[0] >= start_block], "resumed pairs differ"
+
+
+if __name__ == '__main__':
+    main()
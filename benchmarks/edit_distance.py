@@ -0,0 +1,60 @@
+"""Benchmark Levenshtein candidate filtering with a distance cutoff.
+
+For each cutoff, times one query against --size synthetic names four ways:
+a plain Levenshtein.distance loop, a bounded_distance loop (C comparison
+that stops at the cutoff), HindiNameMatcher's per-request filter (length
+check on all names, then the cutoff comparison) and an EncodedNames scan
+(bit-parallel, all names at once), and checks that all of them agree.
+Encoding the names is timed separately, since the registry does it once
+per change rather than per query.
+
+Run from the repository root:
+    python -m benchmarks.edit_distance
+    python -m benchmarks.edit_distance --size 100000 --cutoffs 1 2 3
+"""
+import argparse
+
+import Levenshtein
+import numpy as np
+
+from benchmarks.suite import best_of, synthetic_names
+from distance import EncodedNames, bounded_distance
+from matcher import HindiNameMatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Edit distance cutoff benchmark.")
+    parser.add_argument('--size', type=int, default=20000, help="Number of candidate names")
+    parser.add_argument('--queries', type=int, default=10)
+    parser.add_argument('--cutoffs', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    names = [name.lower() for name in synthetic_names(args.size)]
+    queries = names[::max(1, len(names) // args.queries)][:args.queries]
+
+    encode_ms = best_of(args.repeats, lambda: EncodedNames(names)) * 1e3
+    encoded = EncodedNames(names)
+    print(f"{len(names)} names, {len(queries)} queries, encoding {encode_ms:.1f} ms (once)")
+    print(f"{'cutoff':>8}{'plain ms':>12}{'bounded ms':>12}{'filter ms':>12}{'encoded ms':>12}{'within':>10}")
+
+    plain = best_of(args.repeats, lambda: [[Levenshtein.distance(q, n) for n in names] for q in queries],
+                    len(queries)) * 1e3
+    for cutoff in args.cutoffs:
+        expected = [np.minimum([Levenshtein.distance(q, n) for n in names], cutoff + 1) for q in queries]
+        assert all((encoded.distances(q, cutoff) == e).all() for q, e in zip(queries, expected))
+        assert all([bounded_distance(q, n, cutoff) for n in names] == e.tolist() for q, e in zip(queries, expected))
+        assert all(HindiNameMatcher._within_rows(q, names, cutoff) == np.flatnonzero(e <= cutoff).tolist()
+                   for q, e in zip(queries, expected))
+
+        bounded = best_of(args.repeats, lambda: [[bounded_distance(q, n, cutoff) for n in names] for q in queries],
+                          len(queries)) * 1e3
+        filtered = best_of(args.repeats, lambda: [HindiNameMatcher._within_rows(q, names, cutoff) for q in queries],
+                           len(queries)) * 1e3
+        scan = best_of(args.repeats, lambda: [encoded.distances(q, cutoff) for q in queries], len(queries)) * 1e3
+        within = np.mean([(e <= cutoff).sum() for e in expected])
+        print(f"{cutoff:>8}{plain:>12.2f}{bounded:>12.2f}{filtered:>12.2f}{scan:>12.2f}{within:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
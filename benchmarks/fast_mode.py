@@ -0,0 +1,59 @@
+"""Compare full, fast and cascade scoring: latency and agreement with the full model.
+
+Pairs come from hindi_names_pairs_dataset.csv. Name profiles and the
+normalizer cache are cleared before each run, since compare requests mostly bring names the server has
+not seen before.
+
+Run from the repository root:
+    python -m benchmarks.fast_mode
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from matcher import CascadeMatcher, HindiNameMatcher, load_model, name_profile, normalize_hindi_transliterations
+
+THRESHOLD = 0.5
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast and cascade mode benchmark.")
+    parser.add_argument('--model', default="hindi_name_matcher.forest")
+    parser.add_argument('--fast-model', default="hindi_name_matcher_fast.forest")
+    parser.add_argument('--pairs', type=int, default=5000)
+    parser.add_argument('--band', type=float, default=0.1)
+    args = parser.parse_args()
+
+    pairs_df = pd.read_csv("hindi_names_pairs_dataset.csv").sample(frac=1, random_state=0).head(args.pairs)
+    pairs = list(zip(pairs_df['name1'].astype(str), pairs_df['name2'].astype(str)))
+    labels = pairs_df['is_match'].values
+
+    full = HindiNameMatcher(load_model(args.model))
+    fast_model = load_model(args.fast_model)
+    fast = HindiNameMatcher(fast_model, fast_model.feature_names)
+    matchers = {'full': full, 'fast': fast, 'cascade': CascadeMatcher(fast, full, args.band)}
+
+    print(f"{len(pairs)} pairs, fast model with {len(fast.feature_names)} of {len(full.feature_names)} features")
+    print(f"{'mode':<10}{'us/pair':>10}{'accuracy':>10}{'agrees w/ full':>16}")
+    reference = None
+    for mode, matcher in matchers.items():
+        name_profile.cache_clear()
+        normalize_hindi_transliterations.cache_clear()
+        start = time.perf_counter()
+        if mode == 'cascade':
+            batches = [matcher.score_pairs(pairs[i:i + 100], THRESHOLD) for i in range(0, len(pairs), 100)]
+        else:
+            batches = [matcher.score_pairs(pairs[i:i + 100]) for i in range(0, len(pairs), 100)]
+        confidences = np.concatenate(batches)
+        elapsed = time.perf_counter() - start
+        predicted = confidences >= THRESHOLD
+        if reference is None:
+            reference = predicted
+        print(f"{mode:<10}{elapsed / len(pairs) * 1e6:>10.1f}{np.mean(predicted == labels):>10.4f}"
+              f"{np.mean(predicted == reference):>16.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark column-wise feature extraction against the scalar extract_features loop.
+
+For each candidate count, times one query against the candidates three
+ways: extract_features per pair, extract_feature_columns on the names
+(encoding included) and CandidateEncoding.features on a pre-built
+encoding, and checks that all three give the same matrix. Name profiles
+are warm in every case, as they are in a running server.
+
+Run from the repository root:
+    python -m benchmarks.feature_columns
+    python -m benchmarks.feature_columns --sizes 100 1000 10000 --repeats 5
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.suite import best_of, synthetic_names
+from matcher import CandidateEncoding, extract_feature_columns, extract_features
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Column-wise feature extraction benchmark.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--queries', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    names = synthetic_names(max(args.sizes) + args.queries)
+    queries = names[-args.queries:]
+
+    print(f"{'candidates':>10}{'scalar ms':>12}{'columns ms':>12}{'encoded ms':>12}{'speedup':>9}")
+    for size in args.sizes:
+        candidates = names[:size]
+        encoding = CandidateEncoding(candidates)
+        for query in queries:
+            expected = np.array([extract_features(query, candidate) for candidate in candidates], dtype=np.float64)
+            assert np.array_equal(extract_feature_columns(query, candidates), expected)
+            assert np.array_equal(encoding.features(query), expected)
+
+        scalar = best_of(args.repeats, lambda: [[extract_features(q, c) for c in candidates] for q in queries],
+                         len(queries)) * 1e3
+        columns = best_of(args.repeats, lambda: [extract_feature_columns(q, candidates) for q in queries],
+                          len(queries)) * 1e3
+        encoded = best_of(args.repeats, lambda: [encoding.features(q) for q in queries], len(queries)) * 1e3
+        print(f"{size:>10}{scalar:>12.2f}{columns:>12.2f}{encoded:>12.2f}{scalar / encoded:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Measure the per-pair cost of extract_features with and without cached name profiles.
+
+Run from the repository root:
+    python -m benchmarks.feature_profiles
+"""
+import time
+
+import pandas as pd
+
+from matcher import extract_features, name_profile
+
+QUERIES = ["Suresh Kumar", "Aditya Sharma", "Neha Verma", "Vikram Gupta", "Pooja Singh"]
+
+
+def per_pair_cost(names, cold):
+    """Mean microseconds per extract_features call over QUERIES x names."""
+    name_profile.cache_clear()
+    pairs = 0
+    start = time.perf_counter()
+    for query in QUERIES:
+        for candidate in names:
+            if cold:
+                # Rebuild both profiles every time, like the uncached code did
+                name_profile.cache_clear()
+            extract_features(query, candidate)
+            pairs += 1
+    return (time.perf_counter() - start) / pairs * 1e6
+
+
+def main():
+    names = pd.read_csv("hindi_names_dataset.csv")['name'].tolist()
+
+    cold = per_pair_cost(names, cold=True)
+    warm = per_pair_cost(names, cold=False)
+    print(f"Pairs per run:            {len(QUERIES) * len(names)}")
+    print(f"Uncached profiles (us):   {cold:.2f}")
+    print(f"Cached profiles (us):     {warm:.2f}")
+    print(f"Speedup:                  {cold / warm:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
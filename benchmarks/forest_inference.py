@@ -0,0 +1,73 @@
+"""Check the NumPy forest engine against sklearn and compare their latency.
+
+Probabilities are compared on the same test split the training script
+uses, through both the NumPy walk (small batches) and the rebuilt
+scikit-learn trees (batches of ForestModel.NATIVE_MIN_ROWS or more). Both
+engines are then timed at several batch sizes, and the run fails when
+ForestModel is more than MAX_SLOWDOWN slower than sklearn at any size.
+
+Run from the repository root:
+    python -m benchmarks.forest_inference
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from forest import ForestModel
+from matcher import feature_names, load_model
+from parallel_features import extract_feature_matrix
+
+BATCH_SIZES = [1, 16, 32, 64, 256, 1024, 4096]
+TOLERANCE = 1e-9
+# Allowed ForestModel/sklearn latency ratio, for timing noise
+MAX_SLOWDOWN = 1.1
+
+
+def latency_ms(model, X):
+    """Median milliseconds per predict_proba call on X."""
+    model.predict_proba(X)
+    runs = max(5, min(500, 20000 // len(X)))
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model.predict_proba(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    pairs_df = pd.read_csv("hindi_names_pairs_dataset.csv")
+    X = extract_feature_matrix(pairs_df['name1'], pairs_df['name2'], workers=1)
+    y = pairs_df['is_match'].values
+    _, X_test, _, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    sklearn_model = load_model("hindi_name_matcher.pkl")
+    engine = ForestModel.from_sklearn(sklearn_model, feature_names)
+
+    expected = sklearn_model.predict_proba(X_test)
+    small = ForestModel.NATIVE_MIN_ROWS - 1
+    walked = np.vstack([engine.predict_proba(X_test[start:start + small]) for start in range(0, len(X_test), small)])
+    for path, proba in (('numpy walk', walked), ('rebuilt trees', engine.predict_proba(X_test))):
+        difference = np.abs(proba - expected).max()
+        print(f"Test rows: {len(X_test)}, {path}: max |p_engine - p_sklearn| = {difference:.2e}")
+        assert difference <= TOLERANCE, f"Engine ({path}) differs from sklearn by more than {TOLERANCE}"
+
+    rows = np.resize(X_test, (max(BATCH_SIZES), X_test.shape[1]))
+    print(f"{'batch':>6} {'sklearn ms':>11} {'engine ms':>10} {'speedup':>8}")
+    slower = []
+    for size in BATCH_SIZES:
+        sklearn_ms = latency_ms(sklearn_model, rows[:size])
+        engine_ms = latency_ms(engine, rows[:size])
+        print(f"{size:>6} {sklearn_ms:>11.3f} {engine_ms:>10.3f} {sklearn_ms / engine_ms:>7.1f}x")
+        if engine_ms > sklearn_ms * MAX_SLOWDOWN:
+            slower.append(size)
+    if slower:
+        print(f"ForestModel is slower than sklearn at batch sizes {slower}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Concurrent load test against a running server.
+
+Starts --concurrency client threads that each send requests back to back
+for --duration seconds, then reports throughput, latency percentiles and
+how many requests were rejected with 429.
+
+Run against either server mode, e.g.:
+    uvicorn asgi:app --port 5000 &
+    python -m benchmarks.load_test --url http://localhost:5000 --endpoint search --concurrency 16
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+
+def make_payloads(endpoint, names, count, candidates):
+    """Request bodies cycling through the dataset names."""
+    payloads = []
+    for i in range(count):
+        name = names[i % len(names)]
+        if endpoint == 'compare':
+            payloads.append({'name1': name, 'name2': names[(i * 7 + 1) % len(names)]})
+        elif endpoint == 'search':
+            payloads.append({'query_name': name, 'candidate_names': names[:candidates]})
+        else:
+            payloads.append({'query_name': name, 'top_k': 10})
+    return payloads
+
+
+PATHS = {'compare': '/api/compare', 'search': '/api/search', 'registry': '/api/registry/search'}
+
+
+def client(url, payloads, deadline, latencies, statuses, lock):
+    i = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps(payloads[i % len(payloads)]).encode('utf-8')
+        i += 1
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except urllib.error.URLError:
+            status = 'error'
+        elapsed = time.perf_counter() - start
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the name matching API.")
+    parser.add_argument('--url', default="http://localhost:5000")
+    parser.add_argument('--endpoint', choices=sorted(PATHS), default='compare')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help="Seconds to run")
+    parser.add_argument('--candidates', type=int, default=1000, help="Candidates per search request")
+    args = parser.parse_args()
+
+    names = pd.read_csv("hindi_names_dataset.csv")['name'].tolist()
+    payloads = make_payloads(args.endpoint, names, 1000, args.candidates)
+    url = args.url.rstrip('/') + PATHS[args.endpoint]
+
+    latencies, statuses, lock = [], {}, threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=client, args=(url, payloads, deadline, latencies, statuses, lock))
+               for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"Endpoint {PATHS[args.endpoint]}, {args.concurrency} clients, {elapsed:.1f}s")
+    print(f"Responses by status: {statuses}")
+    if latencies:
+        ms = np.array(latencies) * 1000
+        print(f"Throughput: {len(ms) / elapsed:.1f} req/s")
+        print(f"Latency ms: p50 {np.percentile(ms, 50):.1f}  p90 {np.percentile(ms, 90):.1f}  "
+              f"p99 {np.percentile(ms, 99):.1f}  max {ms.max():.1f}")
+
+
+if __name__ == '__main__':
+    main()
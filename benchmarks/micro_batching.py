@@ -0,0 +1,79 @@
+"""Benchmark micro-batching of concurrent compare calls.
+
+Runs --concurrency client threads that each score pairs back to back for
+--duration seconds, first calling predict_match directly and then going
+through a MicroBatcher for each batching window, and reports throughput,
+latency percentiles and the mean batch size.
+
+Run from the repository root:
+    python -m benchmarks.micro_batching
+    python -m benchmarks.micro_batching --model hindi_name_matcher.pkl --windows 1 2 5
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from batching import MicroBatcher
+from matcher import HindiNameMatcher, load_model
+
+
+def client(score, pairs, offset, deadline, latencies, lock):
+    i = offset
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        score(pairs[i % len(pairs)])
+        elapsed = time.perf_counter() - start
+        i += 1
+        with lock:
+            latencies.append(elapsed)
+
+
+def run(score, pairs, concurrency, duration):
+    latencies, lock = [], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(score, pairs, n * 97, deadline, latencies, lock))
+               for n in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies) * 1000, time.perf_counter() - start
+
+
+def report(label, ms, elapsed, mean_batch):
+    print(f"{label:<22}{len(ms) / elapsed:>10.1f}{np.percentile(ms, 50):>10.2f}"
+          f"{np.percentile(ms, 99):>10.2f}{mean_batch:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching benchmark for compare calls.")
+    parser.add_argument('--model', default="hindi_name_matcher.forest")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5, help="Seconds per configuration")
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--windows', type=float, nargs='+', default=[0.5, 2, 5], help="Batching windows in ms")
+    args = parser.parse_args()
+
+    matcher = HindiNameMatcher(load_model(args.model))
+    names = pd.read_csv("hindi_names_dataset.csv")['name'].tolist()
+    pairs = [(names[i], names[(i * 7 + 1) % len(names)]) for i in range(2000)]
+
+    print(f"Model {args.model}, {args.concurrency} clients, {args.duration:.0f}s per run")
+    print(f"{'mode':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'mean batch':>12}")
+
+    ms, elapsed = run(lambda pair: matcher.predict_match(*pair), pairs, args.concurrency, args.duration)
+    report("unbatched", ms, elapsed, 1)
+
+    for window in args.windows:
+        batcher = MicroBatcher(matcher.predict_matches, args.max_batch, window)
+        ms, elapsed = run(lambda pair: batcher.submit(pair).result(), pairs, args.concurrency, args.duration)
+        batcher.close()
+        report(f"batched {window:g} ms", ms, elapsed, batcher.stats()['mean_batch_size'])
+
+
+if __name__ == '__main__':
+    main()
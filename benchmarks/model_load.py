@@ -0,0 +1,60 @@
+"""Compare cold-start cost of the pickled model and the .forest export.
+
+Each measurement runs in a fresh interpreter, the way a new server worker
+would start. Exports hindi_name_matcher.pkl first if no .forest exists.
+
+Run from the repository root:
+    python -m benchmarks.model_load
+"""
+import json
+import os
+import subprocess
+import sys
+
+PICKLE_PATH = "hindi_name_matcher.pkl"
+FOREST_PATH = "hindi_name_matcher.forest"
+RUNS = 5
+
+# Time imports and load separately, then score one row so the model is usable
+PROBE = """
+import json, resource, time, warnings
+warnings.simplefilter('ignore')
+start = time.perf_counter()
+from matcher import load_model, extract_features
+imported = time.perf_counter()
+model = load_model({path!r})
+loaded = time.perf_counter()
+model.predict_proba([extract_features('Suresh Kumar', 'Sursh Kumaar')])
+scored = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'load_ms': (loaded - imported) * 1000,
+    'first_predict_ms': (scored - loaded) * 1000,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}}))
+"""
+
+
+def measure(path):
+    runs = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(path=path)],
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output))
+    return {key: sorted(run[key] for run in runs)[RUNS // 2] for key in runs[0]}
+
+
+def main():
+    if not os.path.exists(FOREST_PATH):
+        subprocess.run([sys.executable, '-W', 'ignore', 'forest.py', 'export', PICKLE_PATH, FOREST_PATH], check=True)
+
+    print(f"Median of {RUNS} fresh interpreters")
+    print(f"{'format':>8} {'import ms':>10} {'load ms':>10} {'1st predict ms':>15} {'max RSS MB':>11}")
+    for label, path in (('pickle', PICKLE_PATH), ('forest', FOREST_PATH)):
+        stats = measure(path)
+        print(f"{label:>8} {stats['import_ms']:>10.1f} {stats['load_ms']:>10.1f} "
+              f"{stats['first_predict_ms']:>15.1f} {stats['max_rss_mb']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
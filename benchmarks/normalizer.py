@@ -0,0 +1,45 @@
+"""Throughput of the transliteration normalizer in names/second.
+
+Run from the repository root:
+    python -m benchmarks.normalizer
+"""
+import re
+import time
+
+import pandas as pd
+
+from matcher import normalize_hindi_transliterations, transliteration_replacements
+
+ROUNDS = 20
+
+
+def sequential_normalize(text):
+    """The original implementation: one re.sub per replacement."""
+    for old, new in transliteration_replacements.items():
+        text = re.sub(old, new, text, flags=re.IGNORECASE)
+    return text
+
+
+def throughput(func, names):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for name in names:
+            func(name)
+    return ROUNDS * len(names) / (time.perf_counter() - start)
+
+
+def main():
+    names = pd.read_csv("hindi_names_dataset.csv")['name'].tolist()
+    names += [name.lower() for name in names]
+
+    for name in names:
+        assert normalize_hindi_transliterations(name) == sequential_normalize(name), name
+
+    normalize_hindi_transliterations.cache_clear()
+    print(f"Sequential re.sub (names/s):   {throughput(sequential_normalize, names):>12,.0f}")
+    print(f"Single pass (names/s):         {throughput(normalize_hindi_transliterations.__wrapped__, names):>12,.0f}")
+    print(f"Single pass, cached (names/s): {throughput(normalize_hindi_transliterations, names):>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark scatter-gather registry search as the number of shards grows.
+
+Writes a registry of --people generated people (about 3.3 records each)
+to a temporary CSV, then for each shard count starts the shard processes
+with ShardedRegistry.start and measures: startup time, per-query latency
+with one query at a time, the slowest shard's CPU time per query (the
+latency floor with a core per shard, which the shards approach when they
+do not have to take turns) and throughput with --concurrency client
+threads. The same queries are timed against one in-process NameRegistry
+as the baseline, and --check-queries searches with max_distance confirm
+that the merged confidences equal the single registry's.
+
+Every shard returns its own top_k and prunes only against it, so shards
+score more names in total than one registry does; sharding pays off once
+the scan of a shard's names, rather than scoring the shortlist, dominates.
+
+Run from the repository root:
+    python -m benchmarks.sharded_search
+    python -m benchmarks.sharded_search --people 300000 --shards 1 2 4 8 --concurrency 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.suite import synthetic_names
+from matcher import HindiNameMatcher, load_model
+from Namedatasett import generate_chunks
+from registry import NameRegistry, record_fields
+from sharded_registry import ShardedRegistry
+
+
+def write_registry(path, people):
+    for i, (records, _) in enumerate(generate_chunks(people, seed=42, non_matches_per_name=0)):
+        records[record_fields].to_csv(path, mode='a' if i else 'w', header=not i, index=False)
+
+
+def latencies(search, queries):
+    """Milliseconds per query, and the slowest shard's CPU time per query for sharded results."""
+    times, slowest = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = search(query)
+        times.append((time.perf_counter() - start) * 1e3)
+        slowest.append(max(result.get('shard_cpu_ms', [times[-1]])))
+    return np.array(times), np.array(slowest)
+
+
+def throughput(search, queries, concurrency, duration):
+    """Queries per second with concurrency threads searching back to back for duration seconds."""
+    counts = [0] * concurrency
+    deadline = time.perf_counter() + duration
+
+    def client(i):
+        while time.perf_counter() < deadline:
+            search(queries[(counts[i] * concurrency + i) % len(queries)])
+            counts[i] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded registry search benchmark.")
+    parser.add_argument('--people', type=int, default=60000, help="Generated people in the registry")
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4, help="Client threads for the throughput run")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per throughput run")
+    parser.add_argument('--check-queries', type=int, default=5)
+    parser.add_argument('--model', default="hindi_name_matcher.forest")
+    parser.add_argument('--fast-model', default="hindi_name_matcher_fast.forest")
+    args = parser.parse_args()
+
+    queries = synthetic_names(args.queries, seed=7)
+    directory = tempfile.mkdtemp(prefix='hnm-sharded-bench-')
+    path = os.path.join(directory, 'registry.csv')
+    write_registry(path, args.people)
+
+    matcher = HindiNameMatcher(load_model(args.model))
+    start = time.perf_counter()
+    single = NameRegistry.load(path)
+    single_load = time.perf_counter() - start
+    print(f"{len(single)} records, {len(single.names)} names, {os.cpu_count()} CPUs")
+
+    single_ms, _ = latencies(lambda query: single.search(matcher, query), queries)
+    single_qps = throughput(lambda query: single.search(matcher, query), queries, 1, args.duration)
+    print(f"{'shards':>7}{'startup s':>11}{'p50 ms':>9}{'p99 ms':>9}{'speedup':>9}"
+          f"{'slowest shard p50':>19}{'floor speedup':>15}{'queries/s':>11}")
+    print(f"{'single':>7}{single_load:>11.1f}{np.percentile(single_ms, 50):>9.1f}{np.percentile(single_ms, 99):>9.1f}"
+          f"{'1.0x':>9}{np.percentile(single_ms, 50):>19.1f}{'1.0x':>15}{single_qps:>11.1f}")
+
+    for shards in args.shards:
+        start = time.perf_counter()
+        registry = ShardedRegistry.start(path, shards, args.model, args.fast_model, timeout=60.0)
+        startup = time.perf_counter() - start
+        try:
+            for query in queries[:args.check_queries]:
+                merged = registry.search('full', query, 10, 0.5, 2)
+                expected = single.search(matcher, query, 10, 0.5, 2)
+                assert not merged['partial']
+                assert np.allclose([m['confidence'] for m in merged['matches']],
+                                   [m['confidence'] for m in expected['matches']])
+
+            registry.search('full', queries[0])
+            sharded_ms, slowest_ms = latencies(lambda query: registry.search('full', query), queries)
+            qps = throughput(lambda query: registry.search('full', query), queries, args.concurrency, args.duration)
+            speedup = np.percentile(single_ms, 50) / np.percentile(sharded_ms, 50)
+            floor_speedup = np.percentile(single_ms, 50) / np.percentile(slowest_ms, 50)
+            print(f"{shards:>7}{startup:>11.1f}{np.percentile(sharded_ms, 50):>9.1f}"
+                  f"{np.percentile(sharded_ms, 99):>9.1f}{speedup:>8.1f}x{np.percentile(slowest_ms, 50):>19.1f}"
+                  f"{floor_speedup:>14.1f}x{qps:>11.1f}")
+        finally:
+            registry.stop()
+
+    os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""Reproducible benchmark suite with regression tracking.
+
+Covers extract_features per pair, predict_match, find_matches at several
+candidate-set sizes, model load time, and /api/compare and /api/search end
+to end through Flask's test client. Names come from Namedatasett with a
+fixed seed. Each benchmark is repeated and the fastest repeat is kept, as
+the least noisy estimate on a shared machine.
+
+Results are written as JSON and compared against a stored baseline; any
+benchmark slower than the baseline by more than --tolerance is reported
+and the run exits with status 1. Baselines are machine specific, so record
+one on the machine that runs the comparison.
+
+Run from the repository root:
+    python -m benchmarks.suite                       # run and compare with benchmarks/baseline.json
+    python -m benchmarks.suite --update-baseline     # run and store the results as the new baseline
+    python -m benchmarks.suite --output results.json --tolerance 0.5
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from Namedatasett import generate_dataset
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SEED = 42
+CANDIDATE_SIZES = (100, 1000, 10000)
+
+
+def best_of(repeats, func, ops=1):
+    """Fastest of repeats runs of func, per operation."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) / ops
+
+
+def synthetic_names(count, seed=SEED):
+    """At least count names from the seeded generator (about 3.3 names per sample)."""
+    names = generate_dataset(num_samples=count // 3 + 1, seed=seed)['name'].tolist()
+    while len(names) < count:
+        names += generate_dataset(num_samples=count // 3 + 1, seed=seed + len(names))['name'].tolist()
+    return names[:count]
+
+
+def matcher_benchmarks(model_path, repeats):
+    from matcher import HindiNameMatcher, extract_features, load_model, name_profile
+
+    matcher = HindiNameMatcher(load_model(model_path))
+    names = synthetic_names(max(CANDIDATE_SIZES))
+    queries = names[:50]
+    pairs = [(queries[i % len(queries)], names[i]) for i in range(2000)]
+
+    def extract_warm():
+        for name1, name2 in pairs:
+            extract_features(name1, name2)
+
+    def extract_cold():
+        for name1, name2 in pairs[:500]:
+            name_profile.cache_clear()
+            extract_features(name1, name2)
+
+    def predict():
+        for name1, name2 in pairs[:200]:
+            matcher.predict_match(name1, name2)
+
+    extract_warm()
+    results = {
+        'extract_features_us': best_of(repeats, extract_warm, len(pairs)) * 1e6,
+        'extract_features_cold_us': best_of(repeats, extract_cold, 500) * 1e6,
+        'predict_match_us': best_of(repeats, predict, 200) * 1e6,
+    }
+    for size in CANDIDATE_SIZES:
+        candidates = names[:size]
+        matcher.find_matches(queries[0], candidates)
+        for label, top_k in (('find_matches', None), ('find_matches_top10', 10)):
+            results[f'{label}_{size}_ms'] = best_of(
+                repeats, lambda: [matcher.find_matches(q, candidates, top_k=top_k) for q in queries[:5]], 5) * 1e3
+    return results
+
+
+def load_benchmarks(repeats):
+    from matcher import load_model
+
+    results = {}
+    for label, path in (('pickle', "hindi_name_matcher.pkl"), ('forest', "hindi_name_matcher.forest")):
+        if os.path.exists(path):
+            results[f'model_load_{label}_ms'] = best_of(repeats, lambda: load_model(path)) * 1e3
+    return results
+
+
+def api_benchmarks(model_path, repeats):
+    # The result cache would turn every repeat into a cache hit
+    os.environ['RESULT_CACHE_PATH'] = ''
+    os.environ['MODEL_PATH'] = model_path
+    import server
+
+    client = server.app.test_client()
+    names = synthetic_names(1000, seed=SEED + 1)
+    compare_bodies = [{'name1': names[i], 'name2': names[i + 1]} for i in range(0, 200, 2)]
+    search_body = {'query_name': names[0], 'candidate_names': names}
+
+    def compare():
+        for body in compare_bodies:
+            assert client.post('/api/compare', json=body).status_code == 200
+
+    def search():
+        assert client.post('/api/search', json=search_body).status_code == 200
+
+    compare()
+    return {
+        'api_compare_ms': best_of(repeats, compare, len(compare_bodies)) * 1e3,
+        'api_search_1000_ms': best_of(repeats, search) * 1e3,
+    }
+
+
+def environment():
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'scikit-learn': sklearn.__version__,
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Names of benchmarks more than tolerance slower than the baseline, with their ratios."""
+    regressions = []
+    for name, value in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference:
+            ratio = value / reference
+            if ratio > 1 + tolerance:
+                regressions.append((name, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for the matcher and API.")
+    parser.add_argument('--model', default="hindi_name_matcher.forest")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help="Write the results JSON here")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="Allowed slowdown before a benchmark counts as a regression (0.3 = 30%%)")
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the baseline")
+    args = parser.parse_args()
+
+    results = {}
+    results.update(matcher_benchmarks(args.model, args.repeats))
+    results.update(load_benchmarks(args.repeats))
+    results.update(api_benchmarks(args.model, args.repeats))
+    report = {
+        'model': args.model,
+        'seed': SEED,
+        'repeats': args.repeats,
+        'environment': environment(),
+        'results': results
+    }
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    print(f"{'benchmark':<32}{'value':>12}{'baseline':>12}{'ratio':>8}")
+    for name, value in sorted(results.items()):
+        reference = baseline.get(name)
+        ratio = f"{value / reference:.2f}" if reference else '-'
+        reference = f"{reference:.2f}" if reference else '-'
+        print(f"{name:<32}{value:>12.2f}{reference:>12}{ratio:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} benchmark(s) more than {args.tolerance:.0%} slower than baseline:")
+        for name, ratio in regressions:
+            print(f"  {name}: {ratio:.2f}x baseline")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.tolerance:.0%} of baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark the TF-IDF first stage of registry search at registry scale.
+
+For each size, builds a TfidfIndex over that many synthetic names and
+times, per query: the sparse mat-vec plus argpartition shortlist, the
+classifier on the shortlist (HindiNameMatcher.top_matches), and, up to
+--pairwise-limit names, the pairwise common_ngrams scan that a pure-Python
+first stage would need. The synthetic generator repeats names, so larger
+sizes contain duplicates; the matrix still has one column per name.
+
+Run from the repository root:
+    python -m benchmarks.tfidf_search
+    python -m benchmarks.tfidf_search --sizes 100000 1000000 --top-n 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.suite import synthetic_names
+from matcher import HindiNameMatcher, common_ngrams, load_model
+from tfidf import TfidfIndex
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TF-IDF first-stage search benchmark.")
+    parser.add_argument('--model', default="hindi_name_matcher.forest")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--top-n', type=int, default=100, help="Shortlist passed to the classifier")
+    parser.add_argument('--pairwise-limit', type=int, default=100000,
+                        help="Largest size for the pairwise common_ngrams scan")
+    args = parser.parse_args()
+
+    matcher = HindiNameMatcher(load_model(args.model))
+    names = synthetic_names(max(args.sizes))
+    queries = synthetic_names(args.queries, seed=7)
+
+    print(f"{'names':>9}{'build s':>9}{'MB':>7}{'tfidf p50':>11}{'tfidf p99':>11}"
+          f"{'classify p50':>14}{'pairwise ms':>13}")
+    for size in args.sizes:
+        index, build_ms = timed(TfidfIndex, names[:size])
+        matrix = index.matrix
+        megabytes = (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 1e6
+
+        shortlist_ms, classify_ms = [], []
+        for query in queries:
+            ids, elapsed = timed(index.top_ids, query, args.top_n)
+            shortlist_ms.append(elapsed)
+            _, elapsed = timed(matcher.top_matches, query, [index.names[i] for i in ids], 10)
+            classify_ms.append(elapsed)
+
+        pairwise = '-'
+        if size <= args.pairwise_limit:
+            query = queries[0].lower()
+            _, elapsed = timed(lambda: [common_ngrams(query, name.lower(), 2) + common_ngrams(query, name.lower(), 3)
+                                        for name in index.names])
+            pairwise = f"{elapsed:.1f}"
+
+        print(f"{size:>9}{build_ms / 1e3:>9.1f}{megabytes:>7.0f}{np.percentile(shortlist_ms, 50):>11.2f}"
+              f"{np.percentile(shortlist_ms, 99):>11.2f}{np.percentile(classify_ms, 50):>14.2f}{pairwise:>13}")
+
+
+if __name__ == '__main__':
+    main()
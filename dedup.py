@@ -0,0 +1,343 @@
+"""Offline deduplication of a names dataset into entity groups.
+
+Names are blocked with the same keys as the registry search, candidate
+pairs inside each block are scored in batches with HindiNameMatcher, and
+matches are merged transitively with union-find. Progress is
+checkpointed after every batch so an interrupted run can be resumed.
+
+Transitive merging chains similar names of different people ("Aarav
+Mishra" ~ "Aarav Misra" ~ "Aarav Singh"), so matches are merged strongest
+first, only at or above --merge-threshold, and never into a group of more
+than --max-group-size records. Groups that a refused merge would have
+grown are not written as a person; they go to the review file
+(<output>.review.jsonl) for a person to split.
+
+Usage:
+    python dedup.py hindi_names_dataset.csv groups.jsonl
+    python dedup.py records.csv groups.csv --format csv --workers 8 --resume
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from matcher import BlockingIndex, blocking_keys, load_model
+from parallel_features import extract_feature_matrix
+from registry import record_fields
+
+
+class UnionFind:
+    """Disjoint sets over integer ids with path halving and union by size.
+
+    Each id weighs one unless weights are given; size holds the total
+    weight of each set at its root.
+    """
+
+    def __init__(self, size, weights=None):
+        self.parent = np.arange(size)
+        self.size = np.ones(size, dtype=np.int64) if weights is None else np.array(weights, dtype=np.int64)
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b, max_size=None):
+        """Merge the sets of a and b; returns False if the merged set would weigh more than max_size."""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return True
+        if max_size is not None and self.size[a] + self.size[b] > max_size:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return True
+
+
+def block_pairs(blocks, name_keys, max_block_size, start_block=0):
+    """Yield (block_number, i, j) candidate pairs, each pair exactly once.
+
+    Blocks over max_block_size are skipped. A pair sharing several keys is
+    only emitted by its smallest shared key among the blocks that are not
+    skipped, so it is scored once without keeping a set of seen pairs.
+    Blocks before start_block (already scored by a resumed run) are not
+    enumerated.
+    """
+    oversized = {key for key, ids in blocks.items() if len(ids) > max_block_size}
+    for block_number, key in enumerate(sorted(blocks)):
+        if block_number < start_block or key in oversized:
+            continue
+        ids = sorted(blocks[key])
+        for a, i in enumerate(ids):
+            for j in ids[a + 1:]:
+                if min((name_keys[i] & name_keys[j]) - oversized) == key:
+                    yield block_number, i, j
+
+
+class Checkpoint:
+    """Progress of a run: blocks fully scored plus an append-only file of matched pairs."""
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.edges_path = path + '.edges'
+        self.signature = signature
+        self.blocks_done = 0
+        self.pairs_scored = 0
+
+    def load(self):
+        """Restore progress from a previous run with the same input and settings."""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        if state['signature'] != self.signature:
+            raise SystemExit(f"Checkpoint {self.path} belongs to a different input or settings")
+        self.blocks_done = state['blocks_done']
+        self.pairs_scored = state['pairs_scored']
+        return True
+
+    def reset(self):
+        for path in (self.path, self.edges_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def append_edges(self, edges):
+        with open(self.edges_path, 'a') as f:
+            for i, j, confidence in edges:
+                f.write(f"{i}\t{j}\t{confidence:.6f}\n")
+
+    def save(self, blocks_done, pairs_scored):
+        self.blocks_done = blocks_done
+        self.pairs_scored = pairs_scored
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'signature': self.signature, 'blocks_done': blocks_done,
+                       'pairs_scored': pairs_scored}, f)
+        os.replace(tmp_path, self.path)
+
+    def edges(self):
+        """(i, j, confidence) arrays of the matched pairs, strongest first."""
+        if not os.path.exists(self.edges_path) or not os.path.getsize(self.edges_path):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        edges = np.loadtxt(self.edges_path, delimiter='\t', ndmin=2)
+        order = np.argsort(-edges[:, 2], kind='stable')
+        return edges[order, 0].astype(np.int64), edges[order, 1].astype(np.int64), edges[order, 2]
+
+
+def score_batch(model, names, batch, threshold, executor=None):
+    """Score (i, j) name id pairs and return the ones at or above threshold.
+
+    Features are extracted in the calling process, or across executor's
+    worker processes when one is given.
+    """
+    ids = np.array(batch)
+    X = extract_feature_matrix([names[i] for i in ids[:, 0]], [names[j] for j in ids[:, 1]],
+                               workers=1, executor=executor)
+    probabilities = model.predict_proba(X)[:, 1]
+    keep = probabilities >= threshold
+    return zip(ids[keep, 0].tolist(), ids[keep, 1].tolist(), probabilities[keep].tolist())
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def merge_groups(name_count, record_counts, edges, merge_threshold, max_group_size):
+    """Group id of every name, from matched (i, j, confidence) edges sorted strongest first.
+
+    Returns (name_groups, capped, refused): capped marks the groups that
+    hold more than max_group_size records on their own or were the larger
+    side of a merge refused for exceeding it, and refused is the number of
+    merges refused.
+    """
+    union_find = UnionFind(name_count, record_counts)
+    refused = []
+    for i, j, confidence in zip(*edges):
+        if confidence < merge_threshold:
+            break
+        if not union_find.union(i, j, max_group_size):
+            refused.append((i, j))
+    name_groups = np.array([union_find.find(i) for i in range(name_count)], dtype=np.int64)
+    # The larger side of a refused merge is the group that ran into the cap
+    group_sizes = np.bincount(name_groups, weights=record_counts, minlength=name_count)
+    capped = group_sizes > max_group_size
+    for i, j in refused:
+        a, b = name_groups[i], name_groups[j]
+        capped[a if group_sizes[a] >= group_sizes[b] else b] = True
+    return name_groups, capped, len(refused)
+
+
+def write_review(records, group_of_record, capped_groups, path):
+    """Write the capped groups as JSONL for manual review; returns how many were written."""
+    rows = records.to_dict('records')
+    order = np.argsort(group_of_record, kind='stable')
+    boundaries = np.flatnonzero(np.diff(group_of_record[order])) + 1
+    written = 0
+    with open(path, 'w') as f:
+        for members in np.split(order, boundaries):
+            if not len(members) or not capped_groups[group_of_record[members[0]]]:
+                continue
+            group_records = [rows[i] for i in members]
+            f.write(json.dumps({
+                'size': len(group_records),
+                'names': sorted({record['name'] for record in group_records}),
+                'records': group_records
+            }) + '\n')
+            written += 1
+    return written
+
+
+def write_groups(records, group_of_record, output, output_format, min_group_size, skip_groups=None):
+    """Stream entity groups out as JSONL (one group per line) or CSV (one record per line).
+
+    Groups marked in skip_groups (indexed by group id) are left out.
+    """
+    rows = records.to_dict('records')
+    order = np.argsort(group_of_record, kind='stable')
+    boundaries = np.flatnonzero(np.diff(group_of_record[order])) + 1
+    groups_written = 0
+
+    with open(output, 'w', newline='') as f:
+        writer = None
+        if output_format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['group_id'] + record_fields)
+
+        for members in np.split(order, boundaries):
+            if len(members) < min_group_size:
+                continue
+            if skip_groups is not None and skip_groups[group_of_record[members[0]]]:
+                continue
+            group_records = [rows[i] for i in members]
+            if writer:
+                for record in group_records:
+                    writer.writerow([groups_written] + [record[field] for field in record_fields])
+            else:
+                f.write(json.dumps({
+                    'group_id': groups_written,
+                    'size': len(group_records),
+                    'names': sorted({record['name'] for record in group_records}),
+                    'records': group_records
+                }) + '\n')
+            groups_written += 1
+    return groups_written
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Group records of the same person across cases.")
+    parser.add_argument('input', help="CSV with person_id, name, case_id and role columns")
+    parser.add_argument('output', help="Where to write the entity groups")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default=None,
+                        help="Output format (default: from the output extension)")
+    parser.add_argument('--model', default="hindi_name_matcher.pkl")
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--batch-size', type=int, default=20000, help="Pairs per model call")
+    parser.add_argument('--workers', type=int, default=1, help="Feature extraction processes")
+    parser.add_argument('--max-block-size', type=int, default=2000,
+                        help="Skip blocks with more names than this (other keys still pair them)")
+    parser.add_argument('--min-group-size', type=int, default=2,
+                        help="Only write groups with at least this many records")
+    parser.add_argument('--merge-threshold', type=float, default=0.9,
+                        help="Minimum match confidence for merging two groups (at least --threshold)")
+    parser.add_argument('--max-group-size', type=int, default=50,
+                        help="Refuse merges that would make a group of more records than this; "
+                             "such groups go to the review file")
+    parser.add_argument('--review', default=None,
+                        help="Where to write groups that hit --max-group-size (default: <output>.review.jsonl)")
+    parser.add_argument('--checkpoint', default=None,
+                        help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument('--resume', action='store_true', help="Continue an interrupted run")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output_format = args.format or ('csv' if args.output.endswith('.csv') else 'jsonl')
+    start = time.perf_counter()
+
+    records = pd.read_csv(args.input, usecols=record_fields, dtype=str).fillna('')
+    names, record_name_ids = np.unique(records['name'].to_numpy(), return_inverse=True)
+    names = names.tolist()
+    log(f"Loaded {len(records)} records with {len(names)} distinct names")
+
+    index = BlockingIndex(names)
+    name_keys = [blocking_keys(name) for name in names]
+    oversized = sum(len(ids) > args.max_block_size for ids in index.blocks.values())
+    log(f"Built {len(index.blocks)} blocks ({oversized} over --max-block-size skipped) "
+        f"in {time.perf_counter() - start:.1f}s")
+
+    stat = os.stat(args.input)
+    checkpoint = Checkpoint(args.checkpoint or args.output + '.checkpoint', {
+        'input': os.path.abspath(args.input), 'size': stat.st_size, 'mtime': stat.st_mtime,
+        'model': os.path.abspath(args.model), 'threshold': args.threshold,
+        'max_block_size': args.max_block_size
+    })
+    if args.resume and checkpoint.load():
+        log(f"Resuming after block {checkpoint.blocks_done} ({checkpoint.pairs_scored} pairs already scored)")
+    else:
+        checkpoint.reset()
+
+    model = load_model(args.model)
+    pairs_scored = checkpoint.pairs_scored
+    scoring_start = time.perf_counter()
+    resumed_pairs = pairs_scored
+
+    # One pool for the whole run, so worker processes are not respawned per batch
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+
+    def flush(batch, blocks_done):
+        nonlocal pairs_scored
+        checkpoint.append_edges(score_batch(model, names, batch, args.threshold, executor))
+        pairs_scored += len(batch)
+        checkpoint.save(blocks_done, pairs_scored)
+        rate = (pairs_scored - resumed_pairs) / (time.perf_counter() - scoring_start)
+        log(f"Scored {pairs_scored} pairs, {blocks_done}/{len(index.blocks)} blocks ({rate:,.0f} pairs/s)")
+
+    try:
+        batch = []
+        current_block = checkpoint.blocks_done
+        pairs = block_pairs(index.blocks, name_keys, args.max_block_size, start_block=checkpoint.blocks_done)
+        for block_number, i, j in pairs:
+            # Only checkpoint on block boundaries, so a resumed run restarts whole blocks
+            if block_number != current_block and len(batch) >= args.batch_size:
+                flush(batch, block_number)
+                batch = []
+            current_block = block_number
+            batch.append((i, j))
+        if batch:
+            flush(batch, len(index.blocks))
+    finally:
+        if executor:
+            executor.shutdown()
+
+    # Records with the same name share a name id, so groups are built over names
+    name_groups, capped, refused = merge_groups(len(names), np.bincount(record_name_ids, minlength=len(names)),
+                                                checkpoint.edges(), max(args.merge_threshold, args.threshold),
+                                                args.max_group_size)
+    group_of_record = name_groups[record_name_ids]
+    groups_written = write_groups(records, group_of_record, args.output, output_format,
+                                  args.min_group_size, skip_groups=capped)
+    review_path = args.review or args.output + '.review.jsonl'
+    reviewed = write_review(records, group_of_record, capped, review_path)
+
+    elapsed = time.perf_counter() - start
+    log(f"Wrote {groups_written} groups to {args.output}")
+    if reviewed:
+        log(f"{reviewed} groups reached --max-group-size {args.max_group_size} ({refused} merges refused); "
+            f"written to {review_path} for review instead")
+    log(f"Total {elapsed:.1f}s: {len(records) / elapsed:,.0f} records/s, "
+        f"{pairs_scored} pairs scored instead of {len(names) * (len(names) - 1) // 2} all-pairs")
+
+
+if __name__ == '__main__':
+    main()
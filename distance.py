@@ -0,0 +1,158 @@
+"""Levenshtein distance with a cutoff, for discarding candidates before feature extraction.
+
+bounded_distance compares one pair and gives up once the cutoff is
+exceeded. EncodedNames compares one query with many names at once using
+the bit-parallel algorithm of Myers (1999) in Hyyrö's (2003) formulation
+for edit distance: the query's DP column is held as bit vectors in a
+uint64, and each name character is a dozen bitwise operations, applied to
+every name together with NumPy. Encoding the names is the expensive part,
+so a fixed name list (such as the registry's) should be encoded once.
+"""
+import Levenshtein
+import numpy as np
+
+# The query's DP column must fit in one uint64; longer queries fall back to bounded_distance
+MAX_QUERY_LENGTH = 64
+
+_ONE = np.uint64(1)
+
+
+def bounded_distance(a, b, max_distance=None):
+    """Levenshtein distance of a and b, or max_distance + 1 once it is known to be larger."""
+    if max_distance is None:
+        return Levenshtein.distance(a, b)
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    return Levenshtein.distance(a, b, score_cutoff=max_distance)
+
+
+class EncodedNames:
+    """Names encoded for repeated one-query-against-all distance scans.
+
+    Names are stored longest first as a padded (character, name) matrix of
+    alphabet indices, so the names still running at character j, and the
+    names within a length window, are both contiguous ranges of a row.
+    """
+
+    def __init__(self, names):
+        self.names = [str(name) for name in names]
+        lengths = np.fromiter(map(len, self.names), dtype=np.int64, count=len(self.names))
+        self.order = np.argsort(-lengths, kind='stable')
+        self.lengths = lengths[self.order]
+        width = int(self.lengths[0]) if len(self.lengths) else 0
+
+        # Alphabet index of every character; the extra last index pads short names
+        sorted_names = [self.names[i] for i in self.order]
+        codes = np.frombuffer(''.join(sorted_names).encode('utf-32-le'), dtype=np.uint32)
+        self.alphabet, flat = np.unique(codes, return_inverse=True)
+        self.codes = np.full((width, len(self.names)), len(self.alphabet), dtype=np.int32)
+        columns = np.repeat(np.arange(len(self.names)), self.lengths)
+        starts = np.cumsum(self.lengths) - self.lengths
+        self.codes[np.arange(len(codes)) - np.repeat(starts, self.lengths), columns] = flat
+
+    def __len__(self):
+        return len(self.names)
+
+    def distances(self, query, max_distance=None):
+        """Levenshtein distance from query to every name, in the original name order.
+
+        With max_distance, distances above it are reported as max_distance + 1:
+        names whose length difference alone exceeds it are never scanned, and
+        the scan stops as soon as no remaining name can end within it.
+        """
+        query = str(query)
+        m = len(query)
+        if m > MAX_QUERY_LENGTH:
+            result = np.array([bounded_distance(query, name, max_distance) for name in self.names],
+                              dtype=np.int64)
+            return result
+
+        sorted_result = self.lengths.copy() if m == 0 else self._scan(query, max_distance)
+        if max_distance is not None:
+            np.minimum(sorted_result, max_distance + 1, out=sorted_result)
+        result = np.empty_like(sorted_result)
+        result[self.order] = sorted_result
+        return result
+
+    def within(self, query, max_distance):
+        """Indices of the names within max_distance edits of query."""
+        return np.flatnonzero(self.distances(query, max_distance) <= max_distance)
+
+    def _scan(self, query, max_distance):
+        m = len(query)
+        result = np.full(len(self.names), (max_distance if max_distance is not None else 0) + 1, dtype=np.int64)
+
+        # Names are sorted by decreasing length, so the length window is a column range
+        lo, hi = 0, len(self.names)
+        if max_distance is not None:
+            lo = np.searchsorted(-self.lengths, -(m + max_distance), side='left')
+            hi = np.searchsorted(-self.lengths, -(m - max_distance), side='right')
+        if lo >= hi:
+            return result
+        lengths = self.lengths[lo:hi]
+
+        # Match mask of every alphabet index for this query; padding matches nothing
+        table = np.zeros(len(self.alphabet) + 1, dtype=np.uint64)
+        for i, char in enumerate(query):
+            index = np.searchsorted(self.alphabet, ord(char))
+            if index < len(self.alphabet) and self.alphabet[index] == ord(char):
+                table[index] |= _ONE << np.uint64(i)
+        width = int(lengths[0])
+        masks = table[self.codes[:width, lo:hi]]
+        running = np.searchsorted(-lengths, -np.arange(width), side='left')
+
+        last_bit = _ONE << np.uint64(m - 1)
+        vp = np.full(hi - lo, ~np.uint64(0), dtype=np.uint64)
+        vn = np.zeros(hi - lo, dtype=np.uint64)
+        dist = np.full(hi - lo, m, dtype=np.int64)
+        d0_buffer = np.empty(hi - lo, dtype=np.uint64)
+        hp_buffer = np.empty(hi - lo, dtype=np.uint64)
+        hn_buffer = np.empty(hi - lo, dtype=np.uint64)
+        for j in range(width):
+            n = running[j]
+            x = masks[j, :n]
+            p = vp[:n]
+            q = vn[:n]
+            d0 = d0_buffer[:n]
+            hp = hp_buffer[:n]
+            hn = hn_buffer[:n]
+
+            # d0 = (((x & p) + p) ^ p) | x | q
+            np.bitwise_and(x, p, out=d0)
+            d0 += p
+            d0 ^= p
+            d0 |= x
+            d0 |= q
+            # hp = q | ~(d0 | p), hn = d0 & p
+            np.bitwise_or(d0, p, out=hp)
+            np.invert(hp, out=hp)
+            hp |= q
+            np.bitwise_and(d0, p, out=hn)
+
+            dist[:n] += (hp & last_bit) != 0
+            dist[:n] -= (hn & last_bit) != 0
+
+            # hp = (hp << 1) | 1, hn <<= 1, then the next vertical deltas
+            hp <<= _ONE
+            hp |= _ONE
+            hn <<= _ONE
+            np.bitwise_or(d0, hp, out=p)
+            np.invert(p, out=p)
+            p |= hn
+            np.bitwise_and(hp, d0, out=q)
+
+            # Each remaining character lowers the distance by at most one
+            if max_distance is not None and (dist[:n] - (lengths[:n] - j - 1)).min() > max_distance:
+                break
+        result[lo:hi] = dist
+        return result
+
+
+def distances(query, candidates, max_distance=None):
+    """Levenshtein distance from query to each candidate, as an int64 array (see EncodedNames.distances)."""
+    return EncodedNames(candidates).distances(query, max_distance)
+
+
+def within(query, candidates, max_distance):
+    """Indices of the candidates within max_distance edits of query."""
+    return EncodedNames(candidates).within(query, max_distance)
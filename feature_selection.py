@@ -0,0 +1,136 @@
+"""Choose a reduced feature set for the fast model by importance versus compute cost.
+
+Features are computed in groups (feature_groups in matcher.py), so the
+cost of each group is measured, and a feature costs nothing more once
+its group is computed. Features are added greedily by importance per
+microsecond of extra cost until a forest trained on them is within the
+accuracy budget of the full model.
+
+The training script runs this after training the full model. To build a
+fast model for an existing full model, run:
+    python feature_selection.py --model hindi_name_matcher.pkl --budget 0.003
+"""
+import argparse
+import time
+
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from forest import export_forest
+from matcher import NameProfile, feature_group_columns, feature_groups, feature_names, load_model
+
+FAST_MODEL_PATH = "hindi_name_matcher_fast.forest"
+
+# Pairs timed per feature group when measuring costs
+COST_SAMPLE_SIZE = 2000
+
+# Feature group of every feature
+group_of_feature = {feature: group for group, features in feature_group_columns.items() for feature in features}
+
+
+def measure_group_costs(names1, names2, repeats=3):
+    """Microseconds per pair to compute each feature group (fastest of repeats).
+
+    Every repeat starts from fresh name profiles, so a group's cost includes
+    the profile parts it reads, as for names the server has not seen yet.
+    """
+    names = list(zip(list(names1)[:COST_SAMPLE_SIZE], list(names2)[:COST_SAMPLE_SIZE]))
+    costs = {}
+    for group, function in feature_groups:
+        best = float('inf')
+        for _ in range(repeats):
+            profiles = [(NameProfile(name1), NameProfile(name2)) for name1, name2 in names]
+            start = time.perf_counter()
+            for p1, p2 in profiles:
+                function(p1, p2)
+            best = min(best, time.perf_counter() - start)
+        costs[group] = best / len(names) * 1e6
+    return costs
+
+
+def feature_set_cost(features, group_costs):
+    """Microseconds per pair to compute the groups holding features."""
+    return sum(group_costs[group] for group in {group_of_feature[feature] for feature in features})
+
+
+def select_fast_features(X_train, y_train, X_test, y_test, importances, group_costs, full_accuracy,
+                         budget=0.003, n_estimators=100, random_state=42):
+    """Smallest prefix, by importance per microsecond of extra cost, whose model is within budget of full_accuracy.
+
+    X_* hold all features in feature_names order. Returns (features, model,
+    accuracy, history), where history lists (features, accuracy, cost in
+    microseconds) for every prefix tried. If no prefix is within budget the
+    full feature set is returned.
+    """
+    order, remaining = [], list(range(len(feature_names)))
+    while remaining:
+        chosen = [feature_names[i] for i in order]
+        base = feature_set_cost(chosen, group_costs)
+        best = max(remaining, key=lambda i: importances[i] / max(
+            feature_set_cost(chosen + [feature_names[i]], group_costs) - base, 1e-3))
+        order.append(best)
+        remaining.remove(best)
+    history = []
+    for k in range(1, len(order) + 1):
+        columns = order[:k]
+        model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+        model.fit(X_train[:, columns], y_train)
+        accuracy = accuracy_score(y_test, model.predict(X_test[:, columns]))
+        features = [feature_names[i] for i in columns]
+        history.append((features, accuracy, feature_set_cost(features, group_costs)))
+        if accuracy >= full_accuracy - budget:
+            return features, model, accuracy, history
+    return features, model, accuracy, history
+
+
+def build_fast_model(full_model, X_train, y_train, X_test, y_test, names1, names2, budget,
+                     path=FAST_MODEL_PATH):
+    """Measure costs, select features, print the trade-off and export the fast model to path."""
+    group_costs = measure_group_costs(names1, names2)
+    full_accuracy = accuracy_score(y_test, full_model.predict(X_test))
+    features, model, accuracy, history = select_fast_features(
+        X_train, y_train, X_test, y_test, full_model.feature_importances_, group_costs, full_accuracy, budget)
+
+    print("\nFeature group cost (us/pair):")
+    for group, cost in group_costs.items():
+        print(f"  {group:<30}{cost:>8.2f}")
+    print("\nFeature importance:")
+    for name, importance in sorted(zip(feature_names, full_model.feature_importances_), key=lambda x: -x[1]):
+        print(f"  {name:<30}{group_of_feature[name]:<18}{importance:>8.4f}")
+    print("\nFeatures  accuracy  cost us/pair")
+    for prefix, prefix_accuracy, cost in history:
+        print(f"  {len(prefix):>6}  {prefix_accuracy:>8.4f}  {cost:>12.2f}")
+    print(f"\nFast model: {len(features)} features, accuracy {accuracy:.4f} "
+          f"(full {full_accuracy:.4f}, budget {budget}), "
+          f"{feature_set_cost(features, group_costs):.2f} vs {sum(group_costs.values()):.2f} us/pair")
+    print(f"Features: {', '.join(features)}")
+
+    export_forest(model, path, features)
+    print(f"Fast model exported as {path}")
+    return features, model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the reduced-feature fast model.")
+    parser.add_argument('--model', default="hindi_name_matcher.pkl", help="Trained full model")
+    parser.add_argument('--data', default="hindi_names_pairs_dataset.csv",
+                        help="CSV of name1,name2,is_match training pairs (the model's training data)")
+    parser.add_argument('--budget', type=float, default=0.003, help="Accuracy the fast model may lose")
+    parser.add_argument('--output', default=FAST_MODEL_PATH)
+    args = parser.parse_args()
+
+    from parallel_features import extract_feature_matrix
+
+    pairs_df = pd.read_csv(args.data)
+    X = extract_feature_matrix(pairs_df['name1'], pairs_df['name2'])
+    y = pairs_df['is_match'].values
+    # Same split as the training script, so the test rows are unseen by the full model
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    build_fast_model(load_model(args.model), X_train, y_train, X_test, y_test,
+                     pairs_df['name1'].astype(str), pairs_df['name2'].astype(str), args.budget, args.output)
+
+
+if __name__ == '__main__':
+    main()
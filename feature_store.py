@@ -0,0 +1,187 @@
+"""On-disk store of extracted feature matrices, memory-mapped as .npy files.
+
+A matrix is stored per dataset and feature code version:
+
+    feature_store/<dataset>-<version>.npy        float32, one row per pair in feature_names order
+    feature_store/<dataset>-<version>.keys.npy   uint64 digest of each (name1, name2) pair
+
+The dataset id is a digest of the pair digests, so the same pairs in the
+same order always map to the same file. The version (feature_code_version)
+covers feature_names, the source of the feature code in matcher.py and the
+versions of the libraries it calls, so any change to how features are
+computed starts new files. When a dataset is not stored yet, rows for
+pairs already present in another matrix of the same version are copied
+from it, and only new pairs are extracted.
+
+    python feature_store.py --data hindi_names_pairs_dataset.csv   # extract or load, and report
+    python feature_store.py --list
+    python feature_store.py --prune                                # delete other versions
+"""
+import argparse
+import glob
+import hashlib
+import inspect
+import os
+import time
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+import matcher
+from parallel_features import DEFAULT_CHUNK_SIZE, extract_feature_matrix
+
+FEATURE_STORE_DIR = "feature_store"
+
+# Distributions whose results feed the features (Levenshtein runs on rapidfuzz)
+FEATURE_LIBRARIES = ('Levenshtein', 'rapidfuzz', 'jellyfish')
+
+# matcher.py code whose output ends up in extract_features
+FEATURE_CODE = (
+    matcher.normalize_hindi_transliterations, matcher.get_ngrams, matcher.common_ngrams,
+    matcher.has_transposition, matcher.NameProfile, matcher.extract_profile_features
+) + tuple(features for _, features in matcher.feature_groups)
+
+
+def feature_code_version():
+    """Digest of feature_names, the feature code and the libraries it calls."""
+    digest = hashlib.sha256()
+    digest.update('\x1f'.join(matcher.feature_names).encode('utf-8'))
+    digest.update(repr(sorted(matcher.transliteration_replacements.items())).encode('utf-8'))
+    for code in FEATURE_CODE:
+        digest.update(inspect.getsource(code).encode('utf-8'))
+    for library in FEATURE_LIBRARIES:
+        try:
+            digest.update(f"{library} {metadata.version(library)}".encode('utf-8'))
+        except metadata.PackageNotFoundError:
+            digest.update(library.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def pair_digests(names1, names2):
+    """uint64 digest of every ordered (name1, name2) pair."""
+    pairs = np.array([f"{name1}\x1f{name2}" for name1, name2 in zip(names1, names2)], dtype=object)
+    return pd.util.hash_array(pairs)
+
+
+class FeatureStore:
+    """Feature matrices of name pair datasets under one directory."""
+
+    def __init__(self, directory=FEATURE_STORE_DIR):
+        self.directory = directory
+        self.version = feature_code_version()
+
+    def path(self, dataset):
+        return os.path.join(self.directory, f"{dataset}-{self.version}.npy")
+
+    def _keys_path(self, matrix_path):
+        return matrix_path[:-len('.npy')] + '.keys.npy'
+
+    def entries(self):
+        """Stored matrices, newest first, as dicts of path, dataset, version, rows and bytes."""
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*-*.npy')):
+            if path.endswith('.keys.npy'):
+                continue
+            dataset, _, version = os.path.basename(path)[:-len('.npy')].partition('-')
+            entries.append({
+                'path': path,
+                'dataset': dataset,
+                'version': version,
+                'rows': np.load(path, mmap_mode='r').shape[0],
+                'bytes': os.path.getsize(path) + os.path.getsize(self._keys_path(path)),
+                'modified': os.path.getmtime(path)
+            })
+        return sorted(entries, key=lambda entry: -entry['modified'])
+
+    def features(self, names1, names2, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Feature matrix for name pairs as a read-only memory map, extracting only unknown pairs.
+
+        Returns (X, report), where report gives the dataset id and how many
+        rows were loaded, reused from other datasets or extracted.
+        """
+        names1 = [str(name) for name in names1]
+        names2 = [str(name) for name in names2]
+        keys = pair_digests(names1, names2)
+        dataset = hashlib.sha256(keys.tobytes()).hexdigest()[:16]
+        path = self.path(dataset)
+        report = {'dataset': dataset, 'path': path, 'loaded': 0, 'reused': 0, 'extracted': 0}
+        if os.path.exists(path):
+            X = np.load(path, mmap_mode='r')
+            report['loaded'] = len(X)
+            return X, report
+
+        os.makedirs(self.directory, exist_ok=True)
+        # Written under a temporary name and renamed, so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        X = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                      shape=(len(keys), len(matcher.feature_names)))
+        missing = np.ones(len(keys), dtype=bool)
+        for entry in self.entries():
+            if not missing.any():
+                break
+            if entry['version'] != self.version or not entry['rows']:
+                continue
+            old_keys = np.load(self._keys_path(entry['path']))
+            order = np.argsort(old_keys, kind='stable')
+            wanted = np.flatnonzero(missing)
+            positions = np.minimum(np.searchsorted(old_keys[order], keys[wanted]), len(order) - 1)
+            found = old_keys[order[positions]] == keys[wanted]
+            X[wanted[found]] = np.load(entry['path'], mmap_mode='r')[order[positions[found]]]
+            missing[wanted[found]] = False
+            report['reused'] += int(found.sum())
+
+        rows = np.flatnonzero(missing)
+        if len(rows):
+            X[rows] = extract_feature_matrix([names1[i] for i in rows], [names2[i] for i in rows],
+                                             workers=workers, chunk_size=chunk_size)
+            report['extracted'] = len(rows)
+        X.flush()
+        del X
+
+        keys_tmp_path = f"{self._keys_path(path)}.{os.getpid()}.tmp"
+        with open(keys_tmp_path, 'wb') as f:
+            np.save(f, keys)
+        os.replace(keys_tmp_path, self._keys_path(path))
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode='r'), report
+
+    def prune(self):
+        """Delete matrices of other feature code versions; returns the bytes freed."""
+        freed = 0
+        for entry in self.entries():
+            if entry['version'] != self.version:
+                os.remove(entry['path'])
+                os.remove(self._keys_path(entry['path']))
+                freed += entry['bytes']
+        return freed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and store feature matrices of training pairs.")
+    parser.add_argument('--store', default=FEATURE_STORE_DIR)
+    parser.add_argument('--data', help="CSV of name1,name2 pairs to extract or load")
+    parser.add_argument('--workers', type=int, default=None, help="Feature extraction processes")
+    parser.add_argument('--list', action='store_true', help="List stored matrices")
+    parser.add_argument('--prune', action='store_true', help="Delete matrices of other feature code versions")
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store)
+    print(f"Feature code version {store.version}")
+    if args.data:
+        pairs_df = pd.read_csv(args.data)
+        start = time.perf_counter()
+        X, report = store.features(pairs_df['name1'], pairs_df['name2'], workers=args.workers)
+        print(f"{len(X)} rows in {time.perf_counter() - start:.2f}s: {report['loaded']} loaded, "
+              f"{report['reused']} reused, {report['extracted']} extracted ({report['path']})")
+    if args.prune:
+        print(f"Pruned {store.prune() / 1e6:.1f} MB")
+    if args.list:
+        for entry in store.entries():
+            current = '*' if entry['version'] == store.version else ' '
+            print(f"{current} {entry['dataset']}  {entry['version']}  {entry['rows']:>10} rows  "
+                  f"{entry['bytes'] / 1e6:>8.1f} MB  {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['modified']))}")
+
+
+if __name__ == '__main__':
+    main()
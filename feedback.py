@@ -0,0 +1,224 @@
+"""Adjudicated match feedback and incremental retraining.
+
+Officers' confirm/reject decisions are stored in a SQLite file. Feature
+vectors of the base training pairs and of the feedback come from the
+feature store (feature_store.py), shared with the training script, so a
+retrain only extracts features for pairs it has not seen before, and any
+change to the feature code or its libraries invalidates them.
+
+A retrain either adds trees, fitted on the base training split plus all
+feedback, to the existing forest (warm start), or refits the whole forest.
+The pickle and the .forest export are replaced by atomic rename, and a
+running server switches to the new model on its next model check
+(MODEL_CHECK_INTERVAL in server.py) without a restart. The fast model is
+not retrained; rebuild it with feature_selection.py.
+
+    python feedback.py --ingest adjudicated.csv      # name1,name2,is_match[,source]
+    python feedback.py --mode add-trees --trees 20
+    python feedback.py --mode refresh
+"""
+import argparse
+import numbers
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from feature_store import FEATURE_STORE_DIR, FeatureStore
+from forest import export_forest
+from matcher import HindiNameMatcher, feature_names, load_model
+from result_cache import pair_key
+
+FEEDBACK_PATH = "feedback.sqlite3"
+TRAINING_DATA_PATH = "hindi_names_pairs_dataset.csv"
+PICKLE_PATH = "hindi_name_matcher.pkl"
+FOREST_PATH = "hindi_name_matcher.forest"
+
+RETRAIN_MODES = ('add-trees', 'refresh')
+
+
+def parse_is_match(value):
+    """1 or 0 for a boolean or the integer 1 or 0; ValueError for anything else.
+
+    Strings are rejected rather than coerced, since bool("false") is True.
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, numbers.Integral) and value in (0, 1):
+        return int(value)
+    raise ValueError(f"is_match must be true, false, 1 or 0, got {value!r}")
+
+
+class FeedbackStore:
+    """Adjudicated pairs in a SQLite file.
+
+    A pair is stored once in either order (pair_key); adjudicating it again
+    replaces the earlier decision.
+    """
+
+    def __init__(self, path=FEEDBACK_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._connection()
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS feedback (
+                pair TEXT PRIMARY KEY, name1 TEXT, name2 TEXT, is_match INTEGER,
+                source TEXT, created REAL)""")
+
+    def _connection(self):
+        # One connection per thread, never reused by a process forked from this one
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+
+    def add(self, name1, name2, is_match, source=''):
+        """Record an adjudicated pair."""
+        name1, name2, is_match = str(name1), str(name2), parse_is_match(is_match)
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO feedback VALUES (?, ?, ?, ?, ?, ?)",
+                         (pair_key(name1, name2), name1, name2, is_match, str(source), time.time()))
+
+    def add_many(self, rows):
+        """Record (name1, name2, is_match, source) rows in one transaction; returns the count."""
+        rows = [(str(row[0]), str(row[1]), parse_is_match(row[2]), str(row[3]) if len(row) > 3 else '')
+                for row in rows]
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("BEGIN")
+            conn.executemany("INSERT OR REPLACE INTO feedback VALUES (?, ?, ?, ?, ?, ?)",
+                             ((pair_key(name1, name2), name1, name2, is_match, source, now)
+                              for name1, name2, is_match, source in rows))
+        return len(rows)
+
+    def pairs(self):
+        """DataFrame of name1, name2, is_match for every adjudicated pair, oldest first."""
+        rows = self._connection().execute(
+            "SELECT name1, name2, is_match FROM feedback ORDER BY created, rowid").fetchall()
+        return pd.DataFrame(rows, columns=['name1', 'name2', 'is_match'])
+
+    def stats(self):
+        conn = self._connection()
+        counts = dict(conn.execute("SELECT is_match, COUNT(*) FROM feedback GROUP BY is_match").fetchall())
+        return {
+            'pairs': counts.get(0, 0) + counts.get(1, 0),
+            'matches': counts.get(1, 0),
+            'non_matches': counts.get(0, 0)
+        }
+
+
+def _save_pickle(matcher, path):
+    # Write then rename, so a concurrent reader never sees a partial file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(matcher, f)
+    os.replace(tmp_path, path)
+
+
+def retrain(store, mode='add-trees', trees=20, feedback_weight=1.0, data_path=TRAINING_DATA_PATH,
+            pickle_path=PICKLE_PATH, forest_path=FOREST_PATH, workers=None, feature_store=FEATURE_STORE_DIR):
+    """Retrain on the base training split plus all feedback and publish the model.
+
+    mode 'add-trees' fits `trees` new trees and appends them to the model in
+    pickle_path (warm start; existing trees are kept as they are), 'refresh'
+    fits a new forest of the same size from scratch. Feedback rows get
+    sample weight feedback_weight. Accuracy before and after is measured on
+    the base test split, which the training script also held out. Features
+    are loaded from, and new ones stored in, the feature store directory
+    feature_store.
+    """
+    if mode not in RETRAIN_MODES:
+        raise ValueError(f"Unknown retrain mode {mode!r}, expected one of {RETRAIN_MODES}")
+    start = time.perf_counter()
+
+    features = FeatureStore(feature_store)
+    base = pd.read_csv(data_path)
+    X_base, base_report = features.features(base['name1'], base['name2'], workers)
+    # Same split as the training script, so the test rows stay unseen
+    X_train, X_test, y_train, y_test = train_test_split(X_base, base['is_match'].values,
+                                                        test_size=0.2, random_state=42)
+    pairs = store.pairs()
+    X_feedback, feedback_report = features.features(pairs['name1'], pairs['name2'], workers)
+    X = np.vstack([X_train, X_feedback])
+    y = np.concatenate([y_train, pairs['is_match'].values.astype(y_train.dtype)])
+    weights = np.concatenate([np.ones(len(X_train)), np.full(len(X_feedback), feedback_weight)])
+
+    old_model = load_model(pickle_path)
+    accuracy_before = accuracy_score(y_test, old_model.predict(X_test))
+    if mode == 'add-trees':
+        model = old_model
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + trees)
+    else:
+        model = RandomForestClassifier(n_estimators=len(old_model.estimators_), random_state=42)
+    model.fit(X, y, sample_weight=weights)
+    model.set_params(warm_start=False)
+    accuracy_after = accuracy_score(y_test, model.predict(X_test))
+
+    _save_pickle(HindiNameMatcher(model), pickle_path)
+    export_forest(model, forest_path, feature_names)
+    return {
+        'mode': mode,
+        'trees': len(model.estimators_),
+        'feedback_pairs': len(pairs),
+        'extracted_rows': base_report['extracted'] + feedback_report['extracted'],
+        'cached_rows': len(X_base) + len(X_feedback) - base_report['extracted'] - feedback_report['extracted'],
+        'feature_version': features.version,
+        'accuracy_before': accuracy_before,
+        'accuracy_after': accuracy_after,
+        'seconds': time.perf_counter() - start
+    }
+
+
+def retrain_store(path, **options):
+    """retrain() on the FeedbackStore at path, for running in another process."""
+    return retrain(FeedbackStore(path), **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest adjudicated pairs and retrain the matcher.")
+    parser.add_argument('--store', default=FEEDBACK_PATH)
+    parser.add_argument('--ingest', help="CSV of name1,name2,is_match[,source] adjudications to store first")
+    parser.add_argument('--mode', choices=RETRAIN_MODES, help="Retrain after ingesting")
+    parser.add_argument('--trees', type=int, default=20, help="Trees added in add-trees mode")
+    parser.add_argument('--feedback-weight', type=float, default=1.0, help="Sample weight of feedback pairs")
+    parser.add_argument('--data', default=TRAINING_DATA_PATH)
+    parser.add_argument('--pickle', default=PICKLE_PATH)
+    parser.add_argument('--forest', default=FOREST_PATH)
+    parser.add_argument('--workers', type=int, default=None, help="Feature extraction processes")
+    parser.add_argument('--feature-store', default=FEATURE_STORE_DIR,
+                        help="Directory of stored feature matrices (see feature_store.py)")
+    args = parser.parse_args()
+
+    store = FeedbackStore(args.store)
+    if args.ingest:
+        df = pd.read_csv(args.ingest, dtype={'name1': str, 'name2': str}).fillna('')
+        columns = ['name1', 'name2', 'is_match'] + (['source'] if 'source' in df.columns else [])
+        print(f"Stored {store.add_many(df[columns].itertuples(index=False))} adjudicated pairs")
+    print(f"Feedback store: {store.stats()}")
+
+    if args.mode:
+        report = retrain(store, args.mode, args.trees, args.feedback_weight, args.data,
+                         args.pickle, args.forest, args.workers, args.feature_store)
+        print(f"Retrained ({report['mode']}): {report['trees']} trees, {report['feedback_pairs']} feedback pairs, "
+              f"{report['extracted_rows']} rows extracted, {report['cached_rows']} from cache, "
+              f"{report['seconds']:.1f}s")
+        print(f"Test accuracy {report['accuracy_before']:.4f} -> {report['accuracy_after']:.4f}")
+        print(f"Model written to {args.pickle} and {args.forest}")
+
+
+if __name__ == '__main__':
+    main()
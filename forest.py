@@ -0,0 +1,282 @@
+"""Flat, memory-mappable storage and NumPy inference for the random forest.
+
+A .forest file holds every tree of a trained RandomForestClassifier as
+packed node arrays, so loading it needs neither pickle nor scikit-learn:
+
+    magic (8 bytes) | header length (uint64) | JSON header | arrays
+
+The JSON header records the format version, feature names and, for each
+array, its dtype, shape and byte offset. Arrays are 64-byte aligned and
+read through np.memmap, so nothing is paged in until it is used and
+forked server workers share the same physical pages.
+
+Usage:
+    python forest.py export hindi_name_matcher.pkl hindi_name_matcher.forest
+"""
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'HNMFORST'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Child index stored for leaves
+LEAF = -1
+
+
+def _pack_forest(model):
+    """Packed node arrays for a fitted RandomForestClassifier.
+
+    Nodes of all trees are concatenated; children hold global node indexes
+    and roots holds the index of each tree's root. value is the class-1
+    probability of each node, normalised the same way sklearn does.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        is_leaf = left == LEAF
+
+        counts = tree.value[:, 0, :]
+        proba = counts / counts.sum(axis=1, keepdims=True)
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(is_leaf, LEAF, left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, LEAF, right + offset).astype(np.int32))
+        values.append(proba[:, 1].astype(np.float64))
+        offset += tree.node_count
+
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+        'feature_importances': np.asarray(model.feature_importances_, dtype=np.float64),
+    }
+
+
+def export_forest(model, path, feature_names=None):
+    """Write a fitted RandomForestClassifier to a .forest file (atomically)."""
+    if list(model.classes_) != [0, 1]:
+        raise ValueError("Only binary classifiers with classes [0, 1] can be exported")
+    arrays = _pack_forest(model)
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'n_features': int(model.n_features_in_),
+        'n_trees': len(model.estimators_),
+        'feature_names': list(feature_names) if feature_names is not None else None,
+        'arrays': {}
+    }
+    # Offsets are relative to the end of the header block, which is padded to ALIGNMENT
+    position = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': position}
+        position += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix_len = len(MAGIC) + 8 + len(header_bytes)
+    header_bytes += b' ' * (-prefix_len % ALIGNMENT)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for array in arrays.values():
+            data = np.ascontiguousarray(array).tobytes()
+            f.write(data)
+            f.write(b'\0' * (-len(data) % ALIGNMENT))
+    os.replace(tmp_path, path)
+
+
+def load_forest(path):
+    """Memory-map a .forest file and return a ForestModel over it."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a forest file")
+        header_len, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len))
+    if header['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported forest format version {header['format_version']}")
+
+    data_start = len(MAGIC) + 8 + header_len
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        start = data_start + spec['offset']
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+    return ForestModel(arrays, header)
+
+
+class ForestModel:
+    """Random forest evaluated with NumPy over packed node arrays.
+
+    Provides the parts of the RandomForestClassifier interface the matcher
+    uses: predict_proba, predict, classes_ and feature_importances_.
+
+    All trees are walked at once: each step advances every (row, tree)
+    cursor one level with a handful of gathers. Leaves point to themselves
+    with an infinite threshold, so finished cursors need no masking and
+    are only dropped from the working set every few levels.
+
+    That wins on the few rows of a single comparison, where scikit-learn's
+    per-call overhead dominates, but each gather costs more than a compiled
+    tree walk, so batches of NATIVE_MIN_ROWS rows or more are scored by
+    scikit-learn Tree objects rebuilt from the same arrays (when
+    scikit-learn is installed). benchmarks/forest_inference.py measures
+    the crossover.
+    """
+
+    # Levels walked between compactions of the working set
+    COMPACT_EVERY = 4
+    # Rows evaluated together; keeps the per-step arrays cache-sized
+    CHUNK_ROWS = 1024
+    # Smallest batch scored by the rebuilt scikit-learn trees
+    NATIVE_MIN_ROWS = 48
+
+    def __init__(self, arrays, header):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.feature_importances_ = arrays['feature_importances']
+        self.n_features_in_ = header['n_features']
+        self.feature_names = header.get('feature_names')
+        self.classes_ = np.array([0, 1])
+        self._compiled = None
+        self._native = None
+
+    @classmethod
+    def from_sklearn(cls, model, feature_names=None):
+        """Compile a fitted RandomForestClassifier in memory, without writing a file."""
+        header = {'n_features': int(model.n_features_in_), 'feature_names': feature_names}
+        return cls(_pack_forest(model), header)
+
+    def _compile(self):
+        """Traversal layout, built on first use so loading stays a plain mmap."""
+        if self._compiled is None:
+            n_nodes = len(self.feature)
+            is_leaf = np.asarray(self.left) == LEAF
+            node_ids = np.arange(n_nodes)
+
+            # children[2 * node + go_right] is the next node; leaves loop on themselves
+            children = np.empty(2 * n_nodes, dtype=np.intp)
+            children[0::2] = np.where(is_leaf, node_ids, self.left)
+            children[1::2] = np.where(is_leaf, node_ids, self.right)
+
+            self._compiled = (
+                np.asarray(self.feature, dtype=np.intp),
+                np.where(is_leaf, np.inf, self.threshold),
+                children,
+                is_leaf,
+                np.asarray(self.value, dtype=np.float64),
+                np.asarray(self.roots, dtype=np.intp)
+            )
+        return self._compiled
+
+    def _native_trees(self):
+        """scikit-learn Tree objects equal to the packed trees, built on first use; None without scikit-learn."""
+        if self._native is None:
+            try:
+                from sklearn.tree._tree import NODE_DTYPE, Tree
+            except ImportError:
+                self._native = []
+                return None
+            left = np.asarray(self.left)
+            right = np.asarray(self.right)
+            bounds = np.append(self.roots, len(left))
+            trees = []
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                is_leaf = left[start:end] == LEAF
+                # Fields the prediction does not read (impurity, sample counts) stay zero
+                nodes = np.zeros(end - start, dtype=NODE_DTYPE)
+                nodes['left_child'] = np.where(is_leaf, LEAF, left[start:end] - start)
+                nodes['right_child'] = np.where(is_leaf, LEAF, right[start:end] - start)
+                nodes['feature'] = np.where(is_leaf, -2, self.feature[start:end])
+                nodes['threshold'] = np.where(is_leaf, -2.0, self.threshold[start:end])
+                proba = np.asarray(self.value[start:end], dtype=np.float64)
+                tree = Tree(self.n_features_in_, np.array([2], dtype=np.intp), 1)
+                tree.__setstate__({
+                    'max_depth': 0, 'node_count': end - start, 'nodes': nodes,
+                    'values': np.ascontiguousarray(np.column_stack([1 - proba, proba])[:, None, :])
+                })
+                trees.append(tree)
+            self._native = trees
+        return self._native or None
+
+    def _tree_sums(self, X):
+        """Sum over trees of the class-1 leaf probability for each row of X."""
+        feature, threshold, children, is_leaf, value, roots = self._compile()
+        n_rows, n_features = X.shape
+        n_trees = len(roots)
+
+        X_flat = X.ravel()
+        nodes = np.tile(roots, n_rows)
+        row_offsets = np.repeat(np.arange(n_rows) * n_features, n_trees)
+        active = np.arange(len(nodes))
+        level = 0
+        while len(active):
+            current = nodes[active]
+            go_right = X_flat.take(row_offsets[active] + feature.take(current)) > threshold.take(current)
+            following = children.take(2 * current + go_right)
+            nodes[active] = following
+            level += 1
+            if level % self.COMPACT_EVERY == 0:
+                active = active[~is_leaf.take(following)]
+        return value.take(nodes).reshape(n_rows, n_trees).sum(axis=1)
+
+    def predict_proba(self, X):
+        # Like sklearn, round features to float32 before comparing with the thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected a 2-D array with {self.n_features_in_} features")
+        trees = self._native_trees() if len(X) >= self.NATIVE_MIN_ROWS else None
+        if trees:
+            X = np.ascontiguousarray(X)
+            proba = np.zeros(len(X))
+            for tree in trees:
+                proba += tree.predict(X)[:, 1]
+            proba /= len(trees)
+            return np.column_stack([1 - proba, proba])
+        X = X.astype(np.float64)
+
+        proba = np.empty(len(X))
+        for start in range(0, len(X), self.CHUNK_ROWS):
+            proba[start:start + self.CHUNK_ROWS] = self._tree_sums(X[start:start + self.CHUNK_ROWS])
+        proba /= len(self.roots)
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a pickled model to the .forest format.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export = subparsers.add_parser('export', help="Export a pickled model")
+    export.add_argument('pickle_path')
+    export.add_argument('forest_path')
+    args = parser.parse_args()
+
+    from matcher import feature_names, load_model
+    export_forest(load_model(args.pickle_path), args.forest_path, feature_names)
+    print(f"Wrote {args.forest_path}")
+
+
+if __name__ == '__main__':
+    main()
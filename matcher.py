@@ -1,7 +1,14 @@
 import Levenshtein
 import jellyfish
 import re
+import heapq
+import pickle
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
 import numpy as np
+from scipy import sparse
+import metrics
 
 # Define feature names for model
 feature_names = [
@@ -18,19 +25,29 @@ feature_names = [
     'has_first_transposition', 'has_last_transposition'
 ]
 
+# Maximum number of per-name profiles kept in memory
+PROFILE_CACHE_SIZE = 100000
+
+# Common Hindi transliteration variations, shared by training and serving
+transliteration_replacements = {
+    'aa': 'a', 'ee': 'i', 'oo': 'u',
+    'sh': 's', 'ph': 'f', 'th': 't',
+    'kh': 'k', 'v': 'w'
+}
+
+# None of the patterns overlap, so one left-to-right pass over the
+# alternation gives the same result as applying them one after another
+_transliteration_pattern = re.compile(
+    '|'.join(re.escape(old) for old in transliteration_replacements), re.IGNORECASE
+)
+
+def _replace_transliteration(match):
+    return transliteration_replacements[match.group(0).lower()]
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
 def normalize_hindi_transliterations(text):
     """Normalize common Hindi transliteration variations."""
-    replacements = [
-        ('aa', 'a'), ('ee', 'i'), ('oo', 'u'),
-        ('sh', 's'), ('ph', 'f'), ('th', 't'),
-        ('kh', 'k'), ('v', 'w')
-    ]
-    
-    result = text
-    for old, new in replacements:
-        result = re.sub(old, new, result, flags=re.IGNORECASE)
-    
-    return result
+    return _transliteration_pattern.sub(_replace_transliteration, text)
 
 def get_ngrams(text, n):
     """Extract n-grams from text."""
@@ -55,105 +72,702 @@ def has_transposition(str1, str2):
     
     return 0
 
-def extract_features(name1, name2):
-    """Extract features for comparing two names."""
-    name1 = str(name1).lower()
-    name2 = str(name2).lower()
-    
-    # Split into first name and last name
-    name1_parts = name1.split()
-    name2_parts = name2.split()
-    
-    # Get first and last names
-    name1_first = name1_parts[0] if name1_parts else ''
-    name1_last = name1_parts[-1] if len(name1_parts) > 1 else ''
-    
-    name2_first = name2_parts[0] if name2_parts else ''
-    name2_last = name2_parts[-1] if len(name2_parts) > 1 else ''
-    
-    # Basic distance features
-    levenshtein_dist = Levenshtein.distance(name1, name2)
-    levenshtein_ratio = Levenshtein.ratio(name1, name2)
-    
-    # First name distance features
-    first_levenshtein_dist = Levenshtein.distance(name1_first, name2_first)
-    first_levenshtein_ratio = Levenshtein.ratio(name1_first, name2_first)
-    
-    # Last name distance features
-    last_levenshtein_dist = Levenshtein.distance(name1_last, name2_last)
-    last_levenshtein_ratio = Levenshtein.ratio(name1_last, name2_last)
-    
-    # Phonetic features
-    soundex_match_first = int(jellyfish.soundex(name1_first) == jellyfish.soundex(name2_first)) if name1_first and name2_first else 0
-    soundex_match_last = int(jellyfish.soundex(name1_last) == jellyfish.soundex(name2_last)) if name1_last and name2_last else 0
-    
-    metaphone_match_first = int(jellyfish.metaphone(name1_first) == jellyfish.metaphone(name2_first)) if name1_first and name2_first else 0
-    metaphone_match_last = int(jellyfish.metaphone(name1_last) == jellyfish.metaphone(name2_last)) if name1_last and name2_last else 0
-    
-    nysiis_match_first = int(jellyfish.nysiis(name1_first) == jellyfish.nysiis(name2_first)) if name1_first and name2_first else 0
-    nysiis_match_last = int(jellyfish.nysiis(name1_last) == jellyfish.nysiis(name2_last)) if name1_last and name2_last else 0
-    
-    # Normalize transliterations
-    normalized_name1 = normalize_hindi_transliterations(name1)
-    normalized_name2 = normalize_hindi_transliterations(name2)
-    
-    normalized_levenshtein_ratio = Levenshtein.ratio(normalized_name1, normalized_name2)
-    
+class NameProfile:
+    """Everything extract_features derives from a single name, computed once.
+
+    The normalized name, n-grams and phonetic codes are computed on first
+    use, so a reduced feature set only pays for the parts it reads.
+    """
+
+    __slots__ = (
+        'name', 'first', 'last', 'normalized', 'chars', 'bigrams', 'trigrams',
+        'soundex_first', 'soundex_last', 'metaphone_first', 'metaphone_last',
+        'nysiis_first', 'nysiis_last'
+    )
+
+    # Attributes set by each lazy step, with the group it is timed as
+    _steps = (
+        ('profile_normalize', '_set_normalized', ('normalized',)),
+        ('profile_ngrams', '_set_ngrams', ('chars', 'bigrams', 'trigrams')),
+        ('profile_phonetic', '_set_phonetic', ('soundex_first', 'soundex_last', 'metaphone_first',
+                                               'metaphone_last', 'nysiis_first', 'nysiis_last'))
+    )
+    _step_of = {attribute: (group, step) for group, step, attributes in _steps for attribute in attributes}
+
+    def __init__(self, name):
+        name = str(name).lower()
+        parts = name.split()
+
+        self.name = name
+        self.first = parts[0] if parts else ''
+        self.last = parts[-1] if len(parts) > 1 else ''
+
+    def __getattr__(self, attribute):
+        # Only called for slots that are not set yet
+        if attribute not in NameProfile._step_of:
+            raise AttributeError(attribute)
+        group, step = NameProfile._step_of[attribute]
+        if metrics.feature_timing:
+            start = time.perf_counter()
+            getattr(self, step)()
+            metrics.feature_group_seconds.observe_many([(group, time.perf_counter() - start)])
+        else:
+            getattr(self, step)()
+        return object.__getattribute__(self, attribute)
+
+    def _set_normalized(self):
+        self.normalized = normalize_hindi_transliterations(self.name)
+
+    def _set_ngrams(self):
+        self.chars = Counter(self.name)
+        self.bigrams = frozenset(get_ngrams(self.name, 2))
+        self.trigrams = frozenset(get_ngrams(self.name, 3))
+
+    def _set_phonetic(self):
+        # Phonetic codes are only compared when both name parts are present
+        self.soundex_first = jellyfish.soundex(self.first) if self.first else ''
+        self.soundex_last = jellyfish.soundex(self.last) if self.last else ''
+        self.metaphone_first = jellyfish.metaphone(self.first) if self.first else ''
+        self.metaphone_last = jellyfish.metaphone(self.last) if self.last else ''
+        self.nysiis_first = jellyfish.nysiis(self.first) if self.first else ''
+        self.nysiis_last = jellyfish.nysiis(self.last) if self.last else ''
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def name_profile(name):
+    """Cached NameProfile for a name."""
+    return NameProfile(name)
+
+def _levenshtein_features(p1, p2):
+    # Full, first and last name distance and ratio, then the ratio of the normalized transliterations
+    return [
+        Levenshtein.distance(p1.name, p2.name), Levenshtein.ratio(p1.name, p2.name),
+        Levenshtein.distance(p1.first, p2.first), Levenshtein.ratio(p1.first, p2.first),
+        Levenshtein.distance(p1.last, p2.last), Levenshtein.ratio(p1.last, p2.last),
+        Levenshtein.ratio(p1.normalized, p2.normalized)
+    ]
+
+def _phonetic_features(p1, p2):
+    both_first = bool(p1.first and p2.first)
+    both_last = bool(p1.last and p2.last)
+    return [
+        int(both_first and p1.soundex_first == p2.soundex_first),
+        int(both_last and p1.soundex_last == p2.soundex_last),
+        int(both_first and p1.metaphone_first == p2.metaphone_first),
+        int(both_last and p1.metaphone_last == p2.metaphone_last),
+        int(both_first and p1.nysiis_first == p2.nysiis_first),
+        int(both_last and p1.nysiis_last == p2.nysiis_last)
+    ]
+
+def _ngram_features(p1, p2):
     # Common character sequences
-    common_bigrams_count = common_ngrams(name1, name2, 2)
-    common_trigrams_count = common_ngrams(name1, name2, 3)
-    
-    # Starting letters match
-    first_letter_match = int(name1_first and name2_first and name1_first[0] == name2_first[0])
-    last_first_letter_match = int(name1_last and name2_last and name1_last[0] == name2_last[0])
-    
-    # Length-based features
-    len_diff = abs(len(name1) - len(name2))
-    len_ratio = min(len(name1), len(name2)) / max(len(name1), len(name2)) if max(len(name1), len(name2)) > 0 else 0
-    
-    # Transpositions
-    has_first_transposition_val = has_transposition(name1_first, name2_first)
-    has_last_transposition_val = has_transposition(name1_last, name2_last)
-    
-    # Return features as a list in the order defined in feature_names
-    features = [
-        levenshtein_dist, levenshtein_ratio,
-        first_levenshtein_dist, first_levenshtein_ratio,
-        last_levenshtein_dist, last_levenshtein_ratio,
-        soundex_match_first, soundex_match_last,
-        metaphone_match_first, metaphone_match_last,
-        nysiis_match_first, nysiis_match_last,
-        normalized_levenshtein_ratio,
-        common_bigrams_count, common_trigrams_count,
-        first_letter_match, last_first_letter_match,
-        len_diff, len_ratio,
-        has_first_transposition_val, has_last_transposition_val
+    return [len(p1.bigrams & p2.bigrams), len(p1.trigrams & p2.trigrams)]
+
+def _length_initials_features(p1, p2):
+    len1 = len(p1.name)
+    len2 = len(p2.name)
+    return [
+        # Starting letters match
+        int(bool(p1.first and p2.first) and p1.first[0] == p2.first[0]),
+        int(bool(p1.last and p2.last) and p1.last[0] == p2.last[0]),
+        abs(len1 - len2),
+        min(len1, len2) / max(len1, len2) if max(len1, len2) > 0 else 0
     ]
-    
-    return features
+
+def _transposition_features(p1, p2):
+    return [has_transposition(p1.first, p2.first), has_transposition(p1.last, p2.last)]
+
+# Feature groups in computation order, timed one by one when metrics.feature_timing is on
+feature_groups = (
+    ('levenshtein', _levenshtein_features),
+    ('phonetic_match', _phonetic_features),
+    ('ngram_overlap', _ngram_features),
+    ('length_initials', _length_initials_features),
+    ('transposition', _transposition_features)
+)
+
+# Features each group returns, in order
+feature_group_columns = {
+    'levenshtein': feature_names[:6] + ['normalized_levenshtein_ratio'],
+    'phonetic_match': feature_names[6:12],
+    'ngram_overlap': ['common_bigrams', 'common_trigrams'],
+    'length_initials': ['first_letter_match', 'last_first_letter_match', 'len_diff', 'len_ratio'],
+    'transposition': ['has_first_transposition', 'has_last_transposition']
+}
+
+def extract_profile_features(p1, p2):
+    """Extract features for comparing two name profiles (the pairwise work only)."""
+    if metrics.feature_timing:
+        groups, timings = [], []
+        for group, features in feature_groups:
+            start = time.perf_counter()
+            groups.append(features(p1, p2))
+            timings.append((group, time.perf_counter() - start))
+        metrics.feature_group_seconds.observe_many(timings)
+    else:
+        groups = [features(p1, p2) for _, features in feature_groups]
+    levenshtein, phonetic, ngrams, length_initials, transpositions = groups
+
+    # Return features as a list in the order defined in feature_names
+    return levenshtein[:6] + phonetic + levenshtein[6:] + ngrams + length_initials + transpositions
+
+def levenshtein_ratio_bound(p1, p2):
+    """Cheap upper bound on Levenshtein.ratio of two profiles' names.
+
+    The ratio is 2 * LCS / (len1 + len2), and the longest common subsequence
+    can be no longer than the shorter name or than the characters the two
+    names have in common.
+    """
+    total = len(p1.name) + len(p2.name)
+    if total == 0:
+        return 1.0
+    common = min(len(p1.name), len(p2.name), sum((p1.chars & p2.chars).values()))
+    return 2 * common / total
+
+def extract_features(name1, name2):
+    """Extract features for comparing two names."""
+    return extract_profile_features(name_profile(str(name1)), name_profile(str(name2)))
+
+class CandidateEncoding:
+    """Candidate names encoded as arrays, for extracting features against one query column by column.
+
+    Name parts are kept as lists for the Levenshtein columns. Phonetic keys
+    are integer codes into a vocabulary shared with the query, initials
+    and padded name parts are code points, and each candidate's distinct
+    bigrams and trigrams are a row of a sparse candidate-by-gram matrix.
+    Encoding costs more than scalar extraction saves on a single query, so
+    encode a fixed candidate set (such as a registry) once, and use take()
+    for the rows a query needs.
+    """
+
+    phonetic_keys = ('soundex_first', 'soundex_last', 'metaphone_first', 'metaphone_last',
+                     'nysiis_first', 'nysiis_last')
+
+    def __init__(self, names):
+        profiles = [name_profile(str(name)) for name in names]
+        self.names = [profile.name for profile in profiles]
+        self.firsts = [profile.first for profile in profiles]
+        self.lasts = [profile.last for profile in profiles]
+        self.normalized = [profile.normalized for profile in profiles]
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.int64)
+
+        self.vocabulary = {}
+        self.keys = {
+            key: np.array([self.vocabulary.setdefault(getattr(profile, key), len(self.vocabulary))
+                           for profile in profiles], dtype=np.int32)
+            for key in self.phonetic_keys
+        }
+        self.grams = {}
+        self.gram_ids = {}
+        for size, attribute in ((2, 'bigrams'), (3, 'trigrams')):
+            vocabulary = self.gram_ids.setdefault(size, {})
+            ids = [[vocabulary.setdefault(gram, len(vocabulary)) for gram in getattr(profile, attribute)]
+                   for profile in profiles]
+            indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+            np.cumsum([len(row) for row in ids], out=indptr[1:])
+            indices = np.fromiter((i for row in ids for i in row), dtype=np.int64, count=int(indptr[-1]))
+            self.grams[size] = sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr),
+                                                 shape=(len(ids), len(vocabulary)))
+        self.parts = {'first': self._part_codes(self.firsts), 'last': self._part_codes(self.lasts)}
+
+    @staticmethod
+    def _part_codes(parts):
+        """(lengths, initials, padded code point matrix) of a name part; -1 marks no character."""
+        lengths = np.array([len(part) for part in parts], dtype=np.int64)
+        codes = np.full((len(parts), int(lengths.max()) if len(parts) else 0), -1, dtype=np.int32)
+        for i, part in enumerate(parts):
+            codes[i, :len(part)] = [ord(char) for char in part]
+        initials = codes[:, 0] if codes.shape[1] else np.full(len(parts), -1, dtype=np.int32)
+        return lengths, initials, codes
+
+    def __len__(self):
+        return len(self.names)
+
+    def take(self, rows):
+        """Encoding of the candidates at rows, sharing this encoding's vocabularies."""
+        rows = np.asarray(rows, dtype=np.int64)
+        subset = object.__new__(CandidateEncoding)
+        for attribute in ('names', 'firsts', 'lasts', 'normalized'):
+            column = getattr(self, attribute)
+            setattr(subset, attribute, [column[i] for i in rows])
+        subset.lengths = self.lengths[rows]
+        subset.vocabulary = self.vocabulary
+        subset.keys = {key: codes[rows] for key, codes in self.keys.items()}
+        subset.gram_ids = self.gram_ids
+        subset.grams = {size: matrix[rows] for size, matrix in self.grams.items()}
+        subset.parts = {part: (lengths[rows], initials[rows], codes[rows])
+                        for part, (lengths, initials, codes) in self.parts.items()}
+        return subset
+
+    def _common_grams(self, query_grams, size):
+        vocabulary = self.gram_ids[size]
+        member = np.zeros(len(vocabulary), dtype=np.int32)
+        member[[vocabulary[gram] for gram in query_grams if gram in vocabulary]] = 1
+        return self.grams[size] @ member
+
+    def _transpositions(self, query_part, part):
+        """has_transposition(query_part, candidate part) for every candidate."""
+        lengths, _, codes = self.parts[part]
+        m = len(query_part)
+        if m < 2 or m > codes.shape[1]:
+            return np.zeros(len(self), dtype=np.int64)
+        query = np.full(codes.shape[1], -1, dtype=np.int64)
+        query[:m] = [ord(char) for char in query_part]
+        differs = codes != query
+        differing = differs.sum(axis=1)
+        # Exactly the adjacent pair i, i+1 differs, with the two characters swapped
+        swapped = (differs[:, :-1] & differs[:, 1:]
+                   & (codes[:, :-1] == query[1:]) & (codes[:, 1:] == query[:-1])).any(axis=1)
+        # Swapping a doubled letter leaves the name unchanged, so identical parts count too
+        doubled = any(a == b for a, b in zip(query_part, query_part[1:]))
+        return ((lengths == m) & (((differing == 2) & swapped) | ((differing == 0) & doubled))).astype(np.int64)
+
+    def features(self, query_name, columns=None):
+        """Feature matrix of query_name against every candidate, equal to extract_features row by row.
+
+        columns is an optional list of feature names; only those are computed,
+        in that order.
+        """
+        query = name_profile(str(query_name))
+        first_lengths, first_initials, _ = self.parts['first']
+        last_lengths, last_initials, _ = self.parts['last']
+        both_first = (first_lengths > 0) & bool(query.first)
+        both_last = (last_lengths > 0) & bool(query.last)
+
+        def key_match(key, both):
+            code = self.vocabulary.get(getattr(query, key), -1)
+            return (both & (self.keys[key] == code)).astype(np.int64)
+
+        def initial_match(part, initials, both):
+            return (both & (initials == (ord(part[0]) if part else -2))).astype(np.int64)
+
+        def edit(function, a, column):
+            return np.fromiter((function(a, b) for b in column), dtype=np.float64, count=len(column))
+
+        length = len(query.name)
+        longer = np.maximum(self.lengths, length)
+        # One function per column in feature_names order, so only the requested columns are computed
+        column_functions = [
+            lambda: edit(Levenshtein.distance, query.name, self.names),
+            lambda: edit(Levenshtein.ratio, query.name, self.names),
+            lambda: edit(Levenshtein.distance, query.first, self.firsts),
+            lambda: edit(Levenshtein.ratio, query.first, self.firsts),
+            lambda: edit(Levenshtein.distance, query.last, self.lasts),
+            lambda: edit(Levenshtein.ratio, query.last, self.lasts),
+            lambda: key_match('soundex_first', both_first), lambda: key_match('soundex_last', both_last),
+            lambda: key_match('metaphone_first', both_first), lambda: key_match('metaphone_last', both_last),
+            lambda: key_match('nysiis_first', both_first), lambda: key_match('nysiis_last', both_last),
+            lambda: edit(Levenshtein.ratio, query.normalized, self.normalized),
+            lambda: self._common_grams(query.bigrams, 2), lambda: self._common_grams(query.trigrams, 3),
+            lambda: initial_match(query.first, first_initials, both_first),
+            lambda: initial_match(query.last, last_initials, both_last),
+            lambda: np.abs(self.lengths - length),
+            lambda: np.divide(np.minimum(self.lengths, length), longer, out=np.zeros(len(self)), where=longer > 0),
+            lambda: self._transpositions(query.first, 'first'), lambda: self._transpositions(query.last, 'last')
+        ]
+        if columns is None:
+            columns = feature_names
+        if not len(self):
+            return np.empty((0, len(columns)))
+        return np.column_stack([column_functions[feature_names.index(column)]() for column in columns]
+                               ).astype(np.float64)
+
+def extract_feature_columns(query_name, candidates):
+    """Feature matrix of one query against many candidates, computed column by column.
+
+    candidates is a sequence of names (a list or NumPy array) or a
+    CandidateEncoding of them. Rows equal extract_features(query_name,
+    candidate) exactly.
+    """
+    if not isinstance(candidates, CandidateEncoding):
+        candidates = CandidateEncoding(candidates)
+    return candidates.features(query_name)
+
+def subset_feature_extractor(names):
+    """extract_profile_features restricted to the given feature names, in that order.
+
+    Only the feature groups holding those features are computed, so the
+    profiles' lazy parts that no selected feature reads are never built.
+    """
+    groups, positions = [], {}
+    for group, features in feature_groups:
+        columns = feature_group_columns[group]
+        if any(column in names for column in columns):
+            positions.update((column, (len(groups), i)) for i, column in enumerate(columns))
+            groups.append(features)
+    picks = [positions[name] for name in names]
+
+    def extract(p1, p2):
+        values = [features(p1, p2) for features in groups]
+        return [values[group][i] for group, i in picks]
+    return extract
+
+def blocking_keys(name):
+    """Phonetic block keys of the first and last name, the normalized full name and the initials."""
+    profile = name_profile(str(name))
+
+    keys = set()
+    if profile.first:
+        keys.add(('soundex_first', profile.soundex_first))
+        keys.add(('metaphone_first', profile.metaphone_first))
+        keys.add(('nysiis_first', profile.nysiis_first))
+    if profile.last:
+        keys.add(('soundex_last', profile.soundex_last))
+        keys.add(('metaphone_last', profile.metaphone_last))
+        keys.add(('nysiis_last', profile.nysiis_last))
+    keys.add(('normalized', profile.normalized))
+
+    # Initials catch double typos that change every phonetic code
+    if profile.first and profile.last:
+        keys.add(('initials', profile.first[0] + profile.last[0]))
+    return keys
+
+class BlockingIndex:
+    """Inverted index from block keys to names, used to prune candidates before scoring."""
+
+    def __init__(self, names=()):
+        self.names = []
+        self.blocks = defaultdict(set)
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """Index a name and return its id."""
+        name_id = len(self.names)
+        self.names.append(name)
+        for key in blocking_keys(name):
+            self.blocks[key].add(name_id)
+        return name_id
+
+    def remove(self, name_id):
+        """Drop a name from the index; its id is not reused."""
+        name = self.names[name_id]
+        if name is None:
+            return
+        for key in blocking_keys(name):
+            block = self.blocks[key]
+            block.discard(name_id)
+            if not block:
+                del self.blocks[key]
+        self.names[name_id] = None
+
+    def candidate_ids(self, query_name):
+        """Ids of indexed names sharing at least one block key with the query."""
+        ids = set()
+        for key in blocking_keys(query_name):
+            ids.update(self.blocks.get(key, ()))
+        return sorted(ids)
+
+    def candidates(self, query_name):
+        """Indexed names sharing at least one block key with the query."""
+        return [self.names[i] for i in self.candidate_ids(query_name)]
+
+def blocking_recall(pairs):
+    """Recall and pruning statistics of blocking over labelled (name1, name2, is_match) pairs.
+
+    Every name in the pairs is indexed; each distinct name1 is used as a query
+    and its true matches are checked against the blocked candidate set.
+    """
+    pairs = [(str(n1), str(n2), int(label)) for n1, n2, label in pairs]
+    index = BlockingIndex(sorted({n for n1, n2, _ in pairs for n in (n1, n2)}))
+    name_ids = {name: i for i, name in enumerate(index.names)}
+
+    blocked = {}
+    true_matches = 0
+    kept_matches = 0
+    for name1, name2, label in pairs:
+        if name1 not in blocked:
+            blocked[name1] = set(index.candidate_ids(name1))
+        if label:
+            true_matches += 1
+            kept_matches += name_ids[name2] in blocked[name1]
+
+    candidates_scored = sum(len(ids) for ids in blocked.values())
+    candidates_total = len(blocked) * len(index.names)
+    return {
+        'queries': len(blocked),
+        'indexed_names': len(index.names),
+        'true_matches': true_matches,
+        'recall': kept_matches / true_matches if true_matches else 1.0,
+        'candidates_scored': candidates_scored,
+        'candidates_total': candidates_total,
+        'mean_candidates_per_query': candidates_scored / len(blocked) if blocked else 0.0,
+        'reduction_ratio': 1 - candidates_scored / candidates_total if candidates_total else 0.0
+    }
+
+def name_ngrams(name, sizes=(2, 3)):
+    """Set of character n-grams of a lowercased name, as used by common_ngrams."""
+    name = str(name).lower()
+    return {gram for n in sizes for gram in get_ngrams(name, n)}
 
 class HindiNameMatcher:
-    def __init__(self, model):
+    def __init__(self, model, model_features=None):
+        """model_features names the features a reduced model was trained on, in order."""
         self.model = model
-        self.feature_names = feature_names
+        self.feature_names = list(model_features) if model_features else feature_names
+        self._extract = None if self.feature_names == feature_names else subset_feature_extractor(self.feature_names)
+
+    @staticmethod
+    def _within_rows(query_name, candidate_names, max_distance):
+        """Positions of the candidates within max_distance edits of the query, compared lowercased like levenshtein_dist.
+
+        Candidates whose length differs by more than max_distance are
+        dropped with one array comparison, and the rest are compared with
+        Levenshtein.distance, which stops at the cutoff. An EncodedNames
+        scan only pays for its encoding when a fixed name list is searched
+        many times (see NameRegistry), not for one list and one query.
+        """
+        query = str(query_name).lower()
+        with metrics.stage_seconds.time('distance_filter'):
+            names = [str(candidate).lower() for candidate in candidate_names]
+            lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+            rows = np.flatnonzero(np.abs(lengths - len(query)) <= max_distance).tolist()
+            return [i for i in rows if Levenshtein.distance(query, names[i], score_cutoff=max_distance) <= max_distance]
+
+    @staticmethod
+    def _within(query_name, candidate_names, max_distance):
+        """Candidates within max_distance edits of the query (see _within_rows)."""
+        candidate_names = list(candidate_names)
+        if max_distance is None:
+            return candidate_names
+        return [candidate_names[i] for i in HindiNameMatcher._within_rows(query_name, candidate_names, max_distance)]
+
+    def _extract_rows(self, pairs):
+        """Feature rows for (name1, name2) pairs, timed as the feature_extraction stage."""
+        extract = self._extract or extract_profile_features
+        with metrics.stage_seconds.time('feature_extraction'):
+            return [extract(name_profile(str(name1)), name_profile(str(name2))) for name1, name2 in pairs]
+
+    def _match_probabilities(self, X):
+        """Class-1 column of predict_proba, timed as the inference stage."""
+        with metrics.stage_seconds.time('inference'):
+            return self.model.predict_proba(X)[:, 1]
 
     def predict_match(self, name1, name2, threshold=0.5):
-        features = extract_features(name1, name2)
-        probability = self.model.predict_proba([features])[0][1]
+        features = self._extract_rows([(name1, name2)])[0]
+        probability = float(self._match_probabilities([features])[0])
         return {
             'is_match': probability >= threshold,
             'confidence': probability,
-            'features': dict(zip(feature_names, features))
+            'features': dict(zip(self.feature_names, features))
+        }
+
+    def predict_matches(self, pairs, threshold=0.5):
+        """predict_match for several (name1, name2) pairs with one predict_proba call."""
+        pairs = list(pairs)
+        if not pairs:
+            return []
+        rows = self._extract_rows(pairs)
+        probabilities = self._match_probabilities(np.array(rows, dtype=np.float64))
+        return [
+            {
+                'is_match': float(probability) >= threshold,
+                'confidence': float(probability),
+                'features': dict(zip(self.feature_names, features))
+            }
+            for features, probability in zip(rows, probabilities)
+        ]
+
+    def score_pairs(self, pairs):
+        """Match probabilities for (name1, name2) pairs with one predict_proba call."""
+        pairs = list(pairs)
+        if not pairs:
+            return np.empty(0)
+        X = np.array(self._extract_rows(pairs), dtype=np.float64)
+        return self._match_probabilities(X)
+
+    def score_batch(self, query_name, candidate_names, max_distance=None):
+        """Score all candidates with one predict_proba call, best match first.
+
+        With max_distance, candidates more than max_distance edits from the
+        query are dropped before feature extraction.
+        """
+        candidate_names = self._within(query_name, candidate_names, max_distance)
+        if not candidate_names:
+            return []
+
+        # One row per candidate, in feature_names order
+        X = np.array(self._extract_rows((query_name, candidate) for candidate in candidate_names),
+                     dtype=np.float64)
+        probabilities = self._match_probabilities(X)
+
+        # Stable sort keeps the input order for equal confidences
+        order = np.argsort(-probabilities, kind='stable')
+        return [
+            {'name': candidate_names[i], 'confidence': float(probabilities[i])}
+            for i in order
+        ]
+
+    def find_matches(self, query_name, candidate_names, threshold=0.5, top_k=None, max_distance=None):
+        if top_k is not None:
+            return self.top_matches(query_name, candidate_names, top_k, threshold,
+                                    max_distance=max_distance)['matches']
+        return [match for match in self.score_batch(query_name, candidate_names, max_distance)
+                if match['confidence'] >= threshold]
+
+    def top_matches(self, query_name, candidate_names, top_k, threshold=0.5, batch_size=64, max_distance=None,
+                    encoding=None):
+        """The top_k matches kept in a bounded heap, skipping candidates that cannot enter it.
+
+        Matches are ranked by confidence, then by levenshtein_ratio. Confidence
+        is at most 1.0 and levenshtein_ratio is bounded by length and character
+        overlap (levenshtein_ratio_bound), so once the heap holds top_k matches
+        at confidence 1.0, a candidate whose bound does not exceed the k-th
+        best ratio cannot enter it. Candidates are scored in batches in
+        decreasing bound order, so everything after the first such candidate
+        is skipped without extracting features.
+
+        With max_distance, candidates more than max_distance edits from the
+        query are dropped first. encoding is an optional CandidateEncoding of
+        candidate_names (in the same order); batches are then extracted
+        column by column from it, computing only the model's features. Returns {'matches',
+        'scored', 'pruned', 'filtered'}, where filtered counts the candidates
+        dropped by distance and pruned the remaining ones that were never
+        scored. A top_k below 1 returns no matches.
+        """
+        candidate_names = list(candidate_names)
+        total = len(candidate_names)
+        if max_distance is not None:
+            rows = self._within_rows(query_name, candidate_names, max_distance)
+            candidate_names = [candidate_names[i] for i in rows]
+            if encoding is not None:
+                encoding = encoding.take(rows)
+        if top_k <= 0:
+            return {'matches': [], 'scored': 0, 'pruned': len(candidate_names),
+                    'filtered': total - len(candidate_names)}
+        query = name_profile(str(query_name))
+        profiles = [name_profile(str(candidate)) for candidate in candidate_names]
+        bounds = np.array([levenshtein_ratio_bound(query, profile) for profile in profiles])
+        order = np.argsort(-bounds, kind='stable')
+
+        # levenshtein_ratio breaks confidence ties; it is read from X when the model uses it
+        ratio_column = self.feature_names.index('levenshtein_ratio') if 'levenshtein_ratio' in self.feature_names else None
+
+        # Min-heap of (confidence, levenshtein_ratio, -position, name); heap[0] is the k-th best
+        heap = []
+        scored = 0
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            if len(heap) == top_k and heap[0][0] >= 1.0:
+                # Bounds are sorted, so the first candidate that cannot beat heap[0] ends the search
+                beatable = bounds[batch] > heap[0][1]
+                if not beatable.all():
+                    batch = batch[:np.argmin(beatable)]
+                if not len(batch):
+                    break
+
+            with metrics.stage_seconds.time('feature_extraction'):
+                if encoding is not None:
+                    X = encoding.take(batch).features(query.name, None if self._extract is None else self.feature_names)
+                else:
+                    extract = self._extract or extract_profile_features
+                    X = np.array([extract(query, profiles[i]) for i in batch], dtype=np.float64)
+                if ratio_column is not None:
+                    ratios = X[:, ratio_column]
+                else:
+                    ratios = [Levenshtein.ratio(query.name, profiles[i].name) for i in batch]
+            probabilities = self._match_probabilities(X)
+            scored += len(batch)
+
+            for i, probability, ratio in zip(batch, probabilities, ratios):
+                if probability < threshold:
+                    continue
+                entry = (float(probability), float(ratio), -int(i), candidate_names[i])
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+
+        return {
+            'matches': [{'name': name, 'confidence': confidence}
+                        for confidence, _, _, name in sorted(heap, reverse=True)],
+            'scored': scored,
+            'pruned': len(candidate_names) - scored,
+            'filtered': total - len(candidate_names)
         }
 
-    def find_matches(self, query_name, candidate_names, threshold=0.5):
-        matches = []
-        for candidate in candidate_names:
-            result = self.predict_match(query_name, candidate, threshold)
-            if result['is_match']:
-                matches.append({
-                    'name': candidate,
-                    'confidence': result['confidence']
-                })
-        matches.sort(key=lambda x: x['confidence'], reverse=True)
-        return matches
\ No newline at end of file
+
+class CascadeMatcher:
+    """Scores with a fast matcher and re-scores only uncertain pairs with the full one.
+
+    A pair is uncertain when its fast confidence is within band of the
+    threshold; every other pair keeps the fast model's confidence.
+    """
+
+    def __init__(self, fast, full, band=0.1):
+        self.fast = fast
+        self.full = full
+        self.band = band
+        self.feature_names = full.feature_names
+
+    def _uncertain(self, confidences, threshold):
+        return np.flatnonzero(np.abs(np.asarray(confidences, dtype=np.float64) - threshold) < self.band)
+
+    def predict_match(self, name1, name2, threshold=0.5):
+        result = self.fast.predict_match(name1, name2, threshold)
+        if abs(result['confidence'] - threshold) < self.band:
+            result = self.full.predict_match(name1, name2, threshold)
+        return result
+
+    def predict_matches(self, pairs, threshold=0.5):
+        pairs = list(pairs)
+        results = self.fast.predict_matches(pairs, threshold)
+        uncertain = self._uncertain([result['confidence'] for result in results], threshold)
+        for i, result in zip(uncertain, self.full.predict_matches([pairs[i] for i in uncertain], threshold)):
+            results[i] = result
+        return results
+
+    def score_pairs(self, pairs, threshold=0.5):
+        pairs = list(pairs)
+        probabilities = self.fast.score_pairs(pairs)
+        uncertain = self._uncertain(probabilities, threshold)
+        if len(uncertain):
+            probabilities[uncertain] = self.full.score_pairs([pairs[i] for i in uncertain])
+        return probabilities
+
+    def find_matches(self, query_name, candidate_names, threshold=0.5, top_k=None, max_distance=None):
+        candidate_names = HindiNameMatcher._within(query_name, candidate_names, max_distance)
+        probabilities = self.score_pairs([(query_name, candidate) for candidate in candidate_names], threshold)
+        order = np.argsort(-probabilities, kind='stable')
+        matches = [{'name': candidate_names[i], 'confidence': float(probabilities[i])}
+                   for i in order if probabilities[i] >= threshold]
+        return matches[:max(top_k, 0)] if top_k is not None else matches
+
+    def top_matches(self, query_name, candidate_names, top_k, threshold=0.5, max_distance=None, encoding=None):
+        """find_matches with top_k in the result format of HindiNameMatcher.top_matches (nothing is pruned).
+
+        encoding is accepted for compatibility with HindiNameMatcher.top_matches and not used.
+        """
+        candidate_names = list(candidate_names)
+        within = HindiNameMatcher._within(query_name, candidate_names, max_distance)
+        return {
+            'matches': self.find_matches(query_name, within, threshold, top_k),
+            'scored': len(within),
+            'pruned': 0,
+            'filtered': len(candidate_names) - len(within)
+        }
+
+
+class _ModelUnpickler(pickle.Unpickler):
+    """Resolve matchers pickled by the training script, where the class lives in __main__."""
+
+    def find_class(self, module, name):
+        if module == '__main__' and name == 'HindiNameMatcher':
+            return HindiNameMatcher
+        return super().find_class(module, name)
+
+
+def load_model(path):
+    """Load the trained classifier from a .forest file or a pickle.
+
+    .forest files are memory-mapped (see forest.py). Pickles may hold the
+    classifier itself or a HindiNameMatcher wrapping it.
+    """
+    if str(path).endswith('.forest'):
+        from forest import load_forest
+        return load_forest(path)
+
+    with open(path, 'rb') as f:
+        model = _ModelUnpickler(f).load()
+    if isinstance(model, HindiNameMatcher):
+        model = model.model
+    return model
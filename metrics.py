@@ -0,0 +1,303 @@
+"""Timing histograms, Prometheus text output and a sampling profiler.
+
+Histograms are kept per process. When METRICS_DIR is set (asgi.py sets it
+for its worker pool), every process writes a snapshot of its histograms
+and profiler samples to METRICS_DIR/<pid>.json at most once per
+FLUSH_INTERVAL, and render() adds up all snapshots. The runtime settings
+(feature timing and the profiler) are shared through the same directory.
+"""
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from single feature groups up to slow requests
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Seconds between snapshot writes and settings reloads under METRICS_DIR
+FLUSH_INTERVAL = 1.0
+
+# Frames kept per sampled stack, innermost last
+MAX_STACK_DEPTH = 64
+
+# Innermost frames of threads blocked waiting for work; such samples are dropped
+IDLE_FRAMES = {
+    'threading.py:wait', 'selectors.py:select', 'queue.py:get', 'thread.py:_worker',
+    'socket.py:accept', 'socketserver.py:serve_forever', 'connection.py:wait',
+    'connection.py:_recv', 'synchronize.py:__enter__'
+}
+
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+# Per-feature-group timing costs a few microseconds per pair, so it is off
+# unless METRICS_FEATURE_TIMING=1 or it is switched on at runtime
+feature_timing = os.environ.get('METRICS_FEATURE_TIMING', '') == '1'
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, safe to share between threads."""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (last is +Inf), sum]
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def _series(self, label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        return series
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self._series(label_values)
+            series[0][index] += 1
+            series[1] += value
+
+    def observe_many(self, observations):
+        """Record (label value, seconds) pairs under one lock; single-label histograms only."""
+        with self.lock:
+            for label, value in observations:
+                series = self._series((label,))
+                series[0][bisect.bisect_left(self.buckets, value)] += 1
+                series[1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(labels), list(counts), total] for labels, (counts, total) in self.series.items()]
+
+    def render(self, snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for labels, counts, total in snapshot:
+                series = merged.setdefault(tuple(labels), [[0] * len(counts), 0.0])
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(merged.items()):
+            pairs = [f'{name}="{value}"' for name, value in zip(self.labels, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="{}"'.format('+Inf' if bound == float('inf') else repr(bound))
+                lines.append(f"{self.name}_bucket{{{','.join(pairs + [le])}}} {cumulative}")
+            suffix = f"{{{','.join(pairs)}}}" if pairs else ''
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+stage_seconds = Histogram(
+    'hnm_stage_seconds', 'Time spent per processing stage (one observation per call)', ('stage',))
+feature_group_seconds = Histogram(
+    'hnm_feature_group_seconds', 'Time spent per feature group and name pair or profile', ('group',))
+request_seconds = Histogram(
+    'hnm_request_seconds', 'Request handling time by endpoint and status', ('endpoint', 'status'))
+
+histograms = [stage_seconds, feature_group_seconds, request_seconds]
+
+
+class SamplingProfiler:
+    """Samples the stacks of every other thread in the process at a fixed interval.
+
+    Samples are counted as folded stacks ("module:function;..." outermost
+    first), the input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self.samples = Counter()
+        self.interval = 0.005
+        self.lock = threading.Lock()
+        self._stop = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=0.005):
+        if self.running:
+            return
+        self.interval = interval
+        with self.lock:
+            self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack[0] in IDLE_FRAMES:
+                    continue
+                stacks.append(';'.join(reversed(stack)))
+            with self.lock:
+                self.samples.update(stacks)
+
+    def counts(self):
+        with self.lock:
+            return dict(self.samples)
+
+
+profiler = SamplingProfiler()
+
+
+def settings():
+    return {
+        'feature_timing': feature_timing,
+        'profiler': profiler.running,
+        'profiler_interval_ms': profiler.interval * 1000
+    }
+
+
+def apply_settings(changes, share=True):
+    """Apply runtime settings: feature_timing, profiler and profiler_interval_ms.
+
+    Under METRICS_DIR the result is written to settings.json so other
+    processes pick it up on their next flush.
+    """
+    global feature_timing
+    if 'feature_timing' in changes:
+        feature_timing = bool(changes['feature_timing'])
+    interval = float(changes.get('profiler_interval_ms', profiler.interval * 1000)) / 1000
+    if 'profiler' in changes:
+        if changes['profiler']:
+            if profiler.running and interval != profiler.interval:
+                profiler.stop()
+            profiler.start(interval)
+        else:
+            profiler.stop()
+    if share and METRICS_DIR:
+        _write_json(os.path.join(METRICS_DIR, 'settings.json'), settings())
+    return settings()
+
+
+def _write_json(path, data):
+    # Write then rename, so readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def snapshot():
+    return {
+        'histograms': {histogram.name: histogram.snapshot() for histogram in histograms},
+        'profile': profiler.counts()
+    }
+
+
+_last_flush = 0.0
+
+
+def flush_if_due():
+    """Publish this process's snapshot and reload shared settings, at most once per FLUSH_INTERVAL."""
+    global _last_flush
+    if not METRICS_DIR or time.monotonic() - _last_flush < FLUSH_INTERVAL:
+        return
+    _last_flush = time.monotonic()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    _write_json(os.path.join(METRICS_DIR, f"{os.getpid()}.json"), snapshot())
+    try:
+        with open(os.path.join(METRICS_DIR, 'settings.json')) as f:
+            shared = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return
+    if shared != settings():
+        apply_settings(shared, share=False)
+
+
+def clear_snapshots():
+    """Remove snapshots and shared settings left in METRICS_DIR by earlier runs."""
+    if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+        return
+    for filename in os.listdir(METRICS_DIR):
+        if filename.endswith('.json'):
+            os.remove(os.path.join(METRICS_DIR, filename))
+
+
+def _snapshots():
+    """This process's snapshot plus the latest one written by every other process."""
+    snapshots = [snapshot()]
+    if METRICS_DIR and os.path.isdir(METRICS_DIR):
+        own = f"{os.getpid()}.json"
+        for filename in os.listdir(METRICS_DIR):
+            if filename == own or not filename[:-5].isdigit() or not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(METRICS_DIR, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return snapshots
+
+
+def render():
+    """All histograms in the Prometheus text exposition format."""
+    snapshots = _snapshots()
+    lines = []
+    for histogram in histograms:
+        lines.extend(histogram.render([s['histograms'].get(histogram.name, []) for s in snapshots]))
+    return '\n'.join(lines) + '\n'
+
+
+def _reset_after_fork():
+    # A forked worker starts with copies of its parent's counts and a
+    # profiler thread that does not exist in the child; both would be
+    # counted twice or block the profiler from starting
+    global _last_flush
+    for histogram in histograms:
+        histogram.lock = threading.Lock()
+        histogram.series = {}
+    profiler.lock = threading.Lock()
+    profiler.samples = Counter()
+    profiler._thread = None
+    _last_flush = 0.0
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def folded_profile():
+    """Profiler samples from every process as folded stacks, most frequent first."""
+    samples = Counter()
+    for s in _snapshots():
+        samples.update(s['profile'])
+    return ''.join(f"{stack} {count}\n" for stack, count in samples.most_common())
@@ -0,0 +1,193 @@
+"""Parallel model search reporting the accuracy versus latency Pareto front.
+
+Trains every combination of model family, tree count, depth and leaf size
+on the stored training features (feature_store.py), using the training
+script's split, in a process pool. Every worker maps the same .npy file
+instead of receiving a copy. Each trial returns its test accuracy and the
+compiled ForestModel the server would load. Latency is then measured
+serially in this process, so trials do not slow each other's timings:
+  - single: milliseconds per predict_proba call on one row, which is what
+    /api/compare costs beyond feature extraction;
+  - batch: microseconds per row for CHUNK_ROWS-row calls, as in search.
+
+A trial is on the Pareto front if no other trial is at least as accurate
+and as fast (single-row latency) and strictly better in one of them.
+With --slo-ms, the most accurate front model within the latency objective
+is refitted and can be exported with --export.
+
+    python model_search.py
+    python model_search.py --trees 25 50 100 --depths 0 12 --slo-ms 0.5 --export hindi_name_matcher.forest
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from feature_store import FEATURE_STORE_DIR, FeatureStore
+from forest import ForestModel, export_forest
+from matcher import feature_names
+
+MODEL_FAMILIES = {
+    'forest': RandomForestClassifier,
+    'extra-trees': ExtraTreesClassifier
+}
+
+# Single-row predictions timed per trial
+LATENCY_SAMPLES = 200
+
+# Split of the process that runs trials, set by _load_split
+_split = None
+
+
+def _load_split(path, y):
+    global _split
+    X = np.load(path, mmap_mode='r')
+    # Same split as the training script (splitting row numbers gives the same permutation)
+    train, test = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42)
+    _split = (X[train], X[test], y[train], y[test])
+
+
+def build_model(config):
+    """Unfitted classifier for a trial config; depth 0 means unlimited."""
+    return MODEL_FAMILIES[config['family']](
+        n_estimators=config['trees'],
+        max_depth=config['depth'] or None,
+        min_samples_leaf=config['min_leaf'],
+        random_state=42,
+        n_jobs=1
+    )
+
+
+def run_trial(config):
+    """Fit one config on the loaded split; returns (config, accuracy, fit seconds, ForestModel)."""
+    X_train, X_test, y_train, y_test = _split
+    model = build_model(config)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    accuracy = accuracy_score(y_test, model.predict(X_test))
+    return config, accuracy, fit_seconds, ForestModel.from_sklearn(model, feature_names)
+
+
+def measure_latency(model, X_test):
+    """(median ms per single-row call, us per row in CHUNK_ROWS-row calls) on test rows."""
+    rows = [X_test[i:i + 1] for i in range(min(LATENCY_SAMPLES, len(X_test)))]
+    model.predict_proba(rows[0])
+    single = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict_proba(row)
+        single.append(time.perf_counter() - start)
+
+    batch = X_test[:ForestModel.CHUNK_ROWS]
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        model.predict_proba(batch)
+        best = min(best, time.perf_counter() - start)
+    return float(np.median(single)) * 1e3, best / len(batch) * 1e6
+
+
+def pareto_front(results):
+    """Results no other result beats on both accuracy and single-row latency."""
+    front = []
+    for result in results:
+        dominated = any(
+            other['accuracy'] >= result['accuracy'] and other['single_ms'] <= result['single_ms']
+            and (other['accuracy'] > result['accuracy'] or other['single_ms'] < result['single_ms'])
+            for other in results
+        )
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda result: result['single_ms'])
+
+
+def search(X_path, y, configs, workers=None):
+    """Run all configs across a process pool and time them here; returns one dict per config."""
+    _load_split(X_path, y)
+    X_test = np.ascontiguousarray(_split[1])
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_load_split, initargs=(X_path, y)) as pool:
+        for config, accuracy, fit_seconds, model in pool.map(run_trial, configs):
+            single_ms, batch_us = measure_latency(model, X_test)
+            results.append(dict(config, accuracy=accuracy, fit_seconds=fit_seconds,
+                                nodes=len(model.feature), single_ms=single_ms, batch_us=batch_us))
+            print(f"  {config['family']:<12}{config['trees']:>6}{config['depth'] or '-':>6}{config['min_leaf']:>6}"
+                  f"{accuracy:>10.4f}{single_ms:>10.3f}{batch_us:>10.2f}{fit_seconds:>8.1f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search model configs for the accuracy/latency trade-off.")
+    parser.add_argument('--data', default="hindi_names_pairs_dataset.csv",
+                        help="CSV of name1,name2,is_match training pairs")
+    parser.add_argument('--store', default=FEATURE_STORE_DIR)
+    parser.add_argument('--families', nargs='+', choices=sorted(MODEL_FAMILIES), default=sorted(MODEL_FAMILIES))
+    parser.add_argument('--trees', type=int, nargs='+', default=[10, 25, 50, 100, 200])
+    parser.add_argument('--depths', type=int, nargs='+', default=[0, 8, 12, 16], help="Max depths (0: unlimited)")
+    parser.add_argument('--min-leaf', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--workers', type=int, default=None, help="Trials trained at once (default: all CPUs)")
+    parser.add_argument('--slo-ms', type=float, help="Single-prediction latency objective in milliseconds")
+    parser.add_argument('--export', help="Refit the best model within --slo-ms and export it to this .forest path")
+    parser.add_argument('--output', help="Write all results as JSON")
+    args = parser.parse_args()
+    if args.export and args.slo_ms is None:
+        parser.error("--export needs --slo-ms")
+
+    pairs_df = pd.read_csv(args.data)
+    store = FeatureStore(args.store)
+    _, report = store.features(pairs_df['name1'], pairs_df['name2'])
+    print(f"Features: {report['loaded']} loaded, {report['reused']} reused, {report['extracted']} extracted "
+          f"({report['path']})")
+    y = pairs_df['is_match'].values
+
+    configs = [{'family': family, 'trees': trees, 'depth': depth, 'min_leaf': min_leaf}
+               for family, trees, depth, min_leaf
+               in itertools.product(args.families, args.trees, args.depths, args.min_leaf)]
+    print(f"\n{len(configs)} trials on {args.workers or os.cpu_count()} workers")
+    print(f"  {'family':<12}{'trees':>6}{'depth':>6}{'leaf':>6}{'accuracy':>10}{'single ms':>10}"
+          f"{'batch us':>10}{'fit':>9}")
+    start = time.perf_counter()
+    results = search(report['path'], y, configs, args.workers)
+    print(f"Searched in {time.perf_counter() - start:.1f}s")
+
+    front = pareto_front(results)
+    print("\nPareto front (accuracy vs single-prediction latency):")
+    for result in front:
+        print(f"  {result['family']:<12}{result['trees']:>6}{result['depth'] or '-':>6}{result['min_leaf']:>6}"
+              f"{result['accuracy']:>10.4f}{result['single_ms']:>10.3f}{result['batch_us']:>10.2f}")
+
+    if args.output:
+        for result in results:
+            result['pareto'] = result in front
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.slo_ms is not None:
+        within = [result for result in front if result['single_ms'] <= args.slo_ms]
+        if not within:
+            print(f"\nNo model meets {args.slo_ms} ms; the fastest takes {front[0]['single_ms']:.3f} ms")
+            return
+        best = max(within, key=lambda result: result['accuracy'])
+        print(f"\nBest within {args.slo_ms} ms: {best['family']}, {best['trees']} trees, depth {best['depth'] or '-'}, "
+              f"min leaf {best['min_leaf']} (accuracy {best['accuracy']:.4f}, {best['single_ms']:.3f} ms)")
+        if args.export:
+            _load_split(report['path'], y)
+            X_train, _, y_train, _ = _split
+            model = build_model(best)
+            model.fit(X_train, y_train)
+            export_forest(model, args.export, feature_names)
+            print(f"Exported to {args.export}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from matcher import extract_features, feature_names
+
+# Pairs handed to a worker at a time
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def extract_chunk(names1, names2):
+    """Serial feature extraction for a chunk of name pairs."""
+    X = np.empty((len(names1), len(feature_names)), dtype=np.float32)
+    for i, (name1, name2) in enumerate(zip(names1, names2)):
+        X[i] = extract_features(name1, name2)
+    return X
+
+
+def extract_feature_matrix(names1, names2, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor=None):
+    """Extract features for name pairs across a process pool.
+
+    Returns a contiguous float32 array with one row per pair in
+    feature_names order. Rows are computed by the same extract_features
+    call as the serial path, so the result is identical to
+    extract_chunk(names1, names2). workers defaults to os.cpu_count();
+    workers=1 runs in the calling process. Callers extracting many batches
+    can pass a ProcessPoolExecutor as executor to reuse its processes;
+    workers is then ignored.
+    """
+    names1 = [str(name) for name in names1]
+    names2 = [str(name) for name in names2]
+    if len(names1) != len(names2):
+        raise ValueError("names1 and names2 must have the same length")
+
+    workers = workers or os.cpu_count() or 1
+    if (executor is None and workers == 1) or len(names1) <= chunk_size:
+        return extract_chunk(names1, names2)
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return extract_feature_matrix(names1, names2, chunk_size=chunk_size, executor=pool)
+
+    X = np.empty((len(names1), len(feature_names)), dtype=np.float32)
+    starts = range(0, len(names1), chunk_size)
+    chunks = executor.map(
+        extract_chunk,
+        (names1[start:start + chunk_size] for start in starts),
+        (names2[start:start + chunk_size] for start in starts)
+    )
+    for start, chunk in zip(starts, chunks):
+        X[start:start + len(chunk)] = chunk
+    return X
@@ -0,0 +1,291 @@
+import os
+import sqlite3
+import threading
+
+import Levenshtein
+import numpy as np
+import pandas as pd
+
+from distance import EncodedNames
+from matcher import BlockingIndex, CandidateEncoding
+from tfidf import TfidfIndex
+
+# Columns kept for every registered record
+record_fields = ['person_id', 'name', 'case_id', 'role']
+
+# Names added or removed since the last build, as a fraction of the names
+# then, after which the search indexes are rebuilt in the background
+REBUILD_FRACTION = 0.1
+REBUILD_MIN_CHANGES = 1000
+
+
+def csv_records(path):
+    """Records of a hindi_names_dataset.csv-style file, as dicts of record_fields."""
+    df = pd.read_csv(path, usecols=record_fields, dtype=str).fillna('')
+    return df.to_dict('records')
+
+
+def sqlite_records(path, table='names'):
+    """Records of a SQLite table with the record_fields columns."""
+    with sqlite3.connect(path) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f"SELECT {', '.join(record_fields)} FROM {table}").fetchall()
+    return [dict(row) for row in rows]
+
+
+def read_records(path):
+    """Records from SQLite for .db/.sqlite files, CSV otherwise."""
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return sqlite_records(path)
+    return csv_records(path)
+
+
+class NameIndexes:
+    """TF-IDF matrix, feature encoding and distance encoding of a snapshot of the registry names.
+
+    The encodings cover the first size name ids, and removals is how many
+    names the registry had removed when the snapshot was taken. The TF-IDF
+    index follows later additions and removals itself (see TfidfIndex.add).
+    """
+
+    def __init__(self, names, removals=0):
+        self.size = len(names)
+        self.removals = removals
+        self.tfidf = TfidfIndex(names)
+        self.encoding = CandidateEncoding(name if name is not None else '' for name in names)
+        # Lowercased names encoded for distance scans; names removed later are filtered out by the registry
+        self.encoded_ids = np.array([i for i, name in enumerate(names) if name is not None], dtype=np.int64)
+        self.encoded = EncodedNames(names[i].lower() for i in self.encoded_ids)
+
+
+class NameRegistry:
+    """Server-side registry of names with their person and case metadata.
+
+    Records are indexed by distinct name, so a name that appears in many
+    cases is scored once per query and then expanded back to its records.
+    Only names sharing a block key with the query, or among the top
+    shortlist_size names by TF-IDF cosine similarity of their character
+    n-grams, reach the classifier.
+    A search with max_distance instead scores every name within that many
+    edits, found with one bit-parallel scan of all names.
+
+    The indexes are built at load. Later additions and removals update
+    them in place, and once enough names have changed they are rebuilt in
+    a background thread, replacing the old ones when ready.
+    """
+
+    def __init__(self, records, shortlist_size=100):
+        self.records = []
+        self.names = []
+        self.name_ids = {}
+        self.name_records = []
+        self.shortlist_size = shortlist_size
+        # Bumped on every change, so cached search results can be keyed on it
+        self.version = 0
+        self.blocking = BlockingIndex()
+        # Name ids removed so far, replayed onto indexes built from an older snapshot
+        self.removed_names = []
+        self._indexes = None
+        # Background rebuild: (thread, pid of the process that started it), and its NameIndexes once done
+        self._rebuild = None
+        self._rebuilt = None
+        # Exception raised by the last background rebuild, if it failed
+        self.rebuild_error = None
+        # Distance encoding of the names added since the indexes were built, by version
+        self._added_encoded = None
+        self._added_encoded_version = None
+        for record in records:
+            self.add_record(record)
+        # Built up front, so the first search is not slow and forked workers share them
+        self._indexes = NameIndexes(self.names, len(self.removed_names))
+
+    @classmethod
+    def from_csv(cls, path):
+        """Load a registry from a hindi_names_dataset.csv-style file."""
+        return cls(csv_records(path))
+
+    @classmethod
+    def from_sqlite(cls, path, table='names'):
+        """Load a registry from a SQLite table with the record_fields columns."""
+        return cls(sqlite_records(path, table))
+
+    @classmethod
+    def load(cls, path):
+        """Load from SQLite for .db/.sqlite files, CSV otherwise."""
+        return cls(read_records(path))
+
+    def save_sqlite(self, path, table='names'):
+        """Persist the registry records to a SQLite table."""
+        with sqlite3.connect(path) as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"CREATE TABLE {table} ({', '.join(f + ' TEXT' for f in record_fields)})")
+            conn.executemany(
+                f"INSERT INTO {table} VALUES ({', '.join('?' for _ in record_fields)})",
+                ([record[f] for f in record_fields] for record in self.records)
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_name ON {table} (name)")
+
+    def __len__(self):
+        return len(self.records) - self.records.count(None)
+
+    def add_record(self, record):
+        """Register a record and index its name."""
+        record = {field: str(record.get(field, '')) for field in record_fields}
+        record_id = len(self.records)
+        self.version += 1
+        self.records.append(record)
+
+        name_id = self.name_ids.get(record['name'])
+        if name_id is None:
+            name_id = len(self.names)
+            self.name_ids[record['name']] = name_id
+            self.names.append(record['name'])
+            self.name_records.append([])
+            self.blocking.add(record['name'])
+            if self._indexes is not None:
+                self._indexes.tfidf.add(record['name'])
+                self._maybe_rebuild()
+        self.name_records[name_id].append(record_id)
+        return record_id
+
+    def remove_record(self, record_id):
+        """Remove a record, unindexing its name once no other record uses it."""
+        record = self.records[record_id]
+        if record is None:
+            return
+        self.records[record_id] = None
+        self.version += 1
+
+        name_id = self.name_ids[record['name']]
+        self.name_records[name_id].remove(record_id)
+        if not self.name_records[name_id]:
+            del self.name_ids[record['name']]
+            self.names[name_id] = None
+            self.blocking.remove(name_id)
+            self.removed_names.append(name_id)
+            if self._indexes is not None:
+                self._indexes.tfidf.remove(name_id)
+                self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        """Start a background rebuild of the indexes once enough names changed since the last one."""
+        if self._rebuild is not None and self._rebuild[1] == os.getpid():
+            return
+        indexes = self._indexes
+        changes = len(self.names) - indexes.size + len(self.removed_names) - indexes.removals
+        if changes < max(REBUILD_MIN_CHANGES, REBUILD_FRACTION * indexes.size):
+            return
+
+        def build(names, removals):
+            try:
+                self._rebuilt = NameIndexes(names, removals)
+                self.rebuild_error = None
+            except Exception as e:
+                # Searches keep the current indexes; the next change starts another rebuild
+                print(f"Error rebuilding registry indexes: {e}")
+                self.rebuild_error = e
+
+        # The snapshot is copied here, so the registry can keep changing while it is indexed
+        thread = threading.Thread(target=build, args=(list(self.names), len(self.removed_names)), daemon=True)
+        self._rebuilt = None
+        self._rebuild = (thread, os.getpid())
+        thread.start()
+
+    def indexes(self):
+        """Current NameIndexes, switching to a finished background rebuild first."""
+        if self._rebuild is not None:
+            thread, pid = self._rebuild
+            if pid != os.getpid():
+                # The rebuilding thread did not survive a fork
+                self._rebuild = None
+            elif not thread.is_alive() and self._rebuilt is None:
+                # The rebuild failed; keep the current indexes
+                self._rebuild = None
+            elif not thread.is_alive():
+                # Replay the changes made while the snapshot was being indexed
+                indexes = self._rebuilt
+                for name_id in range(indexes.size, len(self.names)):
+                    indexes.tfidf.add(self.names[name_id])
+                for name_id in self.removed_names[indexes.removals:]:
+                    indexes.tfidf.remove(name_id)
+                self._indexes, self._rebuild, self._rebuilt = indexes, None, None
+        return self._indexes
+
+    def tfidf(self):
+        """TfidfIndex over the names, by name id."""
+        return self.indexes().tfidf
+
+    def encoding(self, ids):
+        """CandidateEncoding of the names at ids, or None when some were added since the last build."""
+        indexes = self.indexes()
+        if ids and max(ids) >= indexes.size:
+            return None
+        return indexes.encoding.take(ids)
+
+    def _within(self, query_name, max_distance):
+        """Ids of the live names within max_distance edits of the lowercased query."""
+        indexes = self.indexes()
+        query_name = str(query_name).lower()
+        ids = [indexes.encoded_ids[indexes.encoded.within(query_name, max_distance)]]
+        if len(self.names) > indexes.size:
+            if self._added_encoded_version != self.version:
+                added_ids = np.array([i for i in range(indexes.size, len(self.names)) if self.names[i] is not None],
+                                     dtype=np.int64)
+                self._added_encoded = (EncodedNames(self.names[i].lower() for i in added_ids), added_ids)
+                self._added_encoded_version = self.version
+            encoded, added_ids = self._added_encoded
+            ids.append(added_ids[encoded.within(query_name, max_distance)])
+        return [i for i in np.concatenate(ids).tolist() if self.names[i] is not None]
+
+    def candidate_ids(self, query_name, max_distance=None):
+        """Ids of the names worth scoring for the query, in id order.
+
+        These are the blocked names plus the TF-IDF shortlist, or with
+        max_distance every name within max_distance edits of the query
+        (compared lowercased, like the levenshtein_dist feature).
+        """
+        if max_distance is not None:
+            return sorted(self._within(query_name, max_distance))
+        ids = set(self.blocking.candidate_ids(query_name))
+        ids.update(self.tfidf().top_ids(query_name, self.shortlist_size))
+        return sorted(ids)
+
+    def candidates(self, query_name, max_distance=None):
+        """Names of candidate_ids."""
+        return [self.names[i] for i in self.candidate_ids(query_name, max_distance)]
+
+    def search(self, matcher, query_name, top_k=10, threshold=0.5, max_distance=None):
+        """Top_k records whose name matches query_name, best first.
+
+        Every name has at least one record, so the top_k records always come
+        from the top_k names. Returns {'matches', 'candidates', 'scored',
+        'pruned'}, where candidates counts the names left after blocking
+        (or within max_distance).
+        """
+        ids = self.candidate_ids(query_name, max_distance)
+        candidates = [self.names[i] for i in ids]
+        result = matcher.top_matches(query_name, candidates, top_k, threshold, encoding=self.encoding(ids))
+
+        matches = []
+        for match in result['matches']:
+            for record_id in self.name_records[self.name_ids[match['name']]]:
+                matches.append(dict(self.records[record_id], confidence=match['confidence']))
+        return {
+            'matches': matches[:top_k],
+            'candidates': len(candidates),
+            'scored': result['scored'],
+            'pruned': result['pruned']
+        }
+
+    def levenshtein_search(self, query_name, top_k=10, threshold=0.5):
+        """Top_k records by plain Levenshtein similarity, for when no model is loaded."""
+        query_name = str(query_name).lower()
+        matches = []
+        for record in self.records:
+            if record is None:
+                continue
+            similarity = Levenshtein.ratio(query_name, record['name'].lower())
+            if similarity >= threshold:
+                matches.append(dict(record, confidence=similarity))
+        matches.sort(key=lambda x: x['confidence'], reverse=True)
+        return {'matches': matches[:top_k]}
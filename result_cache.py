@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Eviction order used when the cache is over max_entries
+EVICTION_POLICIES = {
+    'lru': 'accessed',  # least recently read first
+    'fifo': 'created',  # oldest insert first
+}
+
+# Inserts between checks of the cache size
+EVICTION_INTERVAL = 100
+
+
+def model_version(path):
+    """Content hash of a model artifact, so any change to the file changes the version."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def pair_key(name1, name2):
+    """Cache key for a name pair.
+
+    Names are only lowercased, which is the one normalisation
+    extract_features applies itself. Every feature is symmetric in its two
+    names, so the pair is stored in sorted order.
+    """
+    return '\x1f'.join(sorted((str(name1).lower(), str(name2).lower())))
+
+
+def list_key(names):
+    """Short digest of a candidate list (order matters for tie-breaking)."""
+    digest = hashlib.sha256()
+    for name in names:
+        digest.update(str(name).lower().encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Result cache in a SQLite file shared by every worker process.
+
+    Entries are keyed on (namespace, key, model_version) and expire after
+    ttl seconds. Every EVICTION_INTERVAL inserts, expired entries and the
+    oldest entries beyond max_entries (by the eviction policy) are removed. Entries written for any other model
+    version are dropped when the cache is opened, and never returned, so a
+    new model artifact invalidates everything computed by the old one.
+    Hit and miss counters are kept per process and in the database.
+    """
+
+    def __init__(self, path, model_version, max_entries=100000, ttl=3600, policy='lru'):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r}, expected one of {sorted(EVICTION_POLICIES)}")
+        self.path = path
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        conn = self._connection()
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS results (
+                namespace TEXT, key TEXT, model_version TEXT, value TEXT,
+                created REAL, accessed REAL,
+                PRIMARY KEY (namespace, key, model_version))""")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("DELETE FROM results WHERE model_version != ?", (model_version,))
+
+    def _connection(self):
+        # One connection per thread, never reused by a process forked from this one
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, conn, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+        conn.execute("INSERT INTO counters VALUES (?, 1) "
+                     "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, namespace, key):
+        """Cached value, or None on a miss or an expired entry."""
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, created FROM results WHERE namespace = ? AND key = ? AND model_version = ?",
+            (namespace, key, self.model_version)
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            self._count(conn, 'misses')
+            return None
+        if self.policy == 'lru':
+            conn.execute("UPDATE results SET accessed = ? WHERE namespace = ? AND key = ? AND model_version = ?",
+                         (now, namespace, key, self.model_version))
+        self._count(conn, 'hits')
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value):
+        conn = self._connection()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                     (namespace, key, self.model_version, json.dumps(value), now, now))
+        with self._lock:
+            self._inserts += 1
+            check = self._inserts % EVICTION_INTERVAL == 0
+        if check:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones beyond max_entries."""
+        conn = self._connection()
+        order = EVICTION_POLICIES[self.policy]
+        with conn:
+            conn.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl,))
+            conn.execute(f"""DELETE FROM results WHERE rowid IN (
+                SELECT rowid FROM results ORDER BY {order}
+                LIMIT max(0, (SELECT COUNT(*) FROM results) - ?))""", (self.max_entries,))
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM results")
+
+    def stats(self):
+        """Hit/miss counters for this process and across all processes sharing the file."""
+        conn = self._connection()
+        shared = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        total = shared.get('hits', 0) + shared.get('misses', 0)
+        return {
+            'entries': conn.execute("SELECT COUNT(*) FROM results").fetchone()[0],
+            'model_version': self.model_version,
+            'policy': self.policy,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'process': {'hits': self.hits, 'misses': self.misses, 'pid': os.getpid()},
+            'shared': {'hits': shared.get('hits', 0), 'misses': shared.get('misses', 0),
+                       'hit_rate': shared.get('hits', 0) / total if total else 0.0}
+        }
@@ -1,21 +1,100 @@
-from flask import Flask, request, jsonify, send_from_directory
-import pickle
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context, g
+import json
 import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from matcher import HindiNameMatcher, extract_features, feature_names
+from matcher import HindiNameMatcher, CascadeMatcher, extract_features, feature_names, load_model
+from registry import NameRegistry
+from sharded_registry import ShardedRegistry
+from result_cache import ResultCache, model_version, pair_key, list_key
+from batching import MicroBatcher
+from feedback import FeedbackStore, RETRAIN_MODES, retrain_store
+import metrics
 
 print(os.listdir('static'))
 
 app = Flask(__name__, static_url_path='/static', static_folder='static')
 
+# Pairs scored per model call by /api/compare/bulk
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 1000))
 
-# Load the model
+# Micro-batching of concurrent /api/compare requests; a wait of 0 ms turns it off
+COMPARE_BATCH_SIZE = int(os.environ.get('COMPARE_BATCH_SIZE', 64))
+COMPARE_BATCH_WAIT_MS = float(os.environ.get('COMPARE_BATCH_WAIT_MS', 0))
+
+# Model used when a request has no "mode": full, fast or cascade
+DEFAULT_MODE = os.environ.get('MATCH_MODE', 'full')
+# Cascade mode re-scores with the full model when the fast confidence is this close to the threshold
+CASCADE_BAND = float(os.environ.get('CASCADE_BAND', 0.1))
+
+
+# Load the model, preferring the memory-mapped .forest export over the pickle
+model_path = os.environ.get('MODEL_PATH')
+if not model_path:
+    model_path = "hindi_name_matcher.forest" if os.path.exists("hindi_name_matcher.forest") else "hindi_name_matcher.pkl"
+fast_model_path = os.environ.get('FAST_MODEL_PATH', 'hindi_name_matcher_fast.forest')
+
+# Seconds between checks for a replaced model file (see reload_models_if_changed)
+MODEL_CHECK_INTERVAL = float(os.environ.get('MODEL_CHECK_INTERVAL', 2.0))
+
+def load_matchers():
+    """Matchers by request mode, and the model version for the result cache.
+    
+    fast and cascade need the reduced-feature model and are left out when it
+    is missing. Raises FileNotFoundError when the full model is missing.
+    """
+    full = HindiNameMatcher(load_model(model_path))
+    loaded = {'full': full}
+    version = model_version(model_path)
+    try:
+        fast_model = load_model(fast_model_path)
+        loaded['fast'] = HindiNameMatcher(fast_model, fast_model.feature_names)
+        loaded['cascade'] = CascadeMatcher(loaded['fast'], full, CASCADE_BAND)
+        version += '+' + model_version(fast_model_path)
+        print(f"Fast model loaded from {fast_model_path} ({len(fast_model.feature_names)} features)")
+    except FileNotFoundError:
+        print("Fast model file not found. Only mode=full is available.")
+    return loaded, version
+
+# Result cache shared by all workers through a SQLite file; RESULT_CACHE_PATH='' disables it
+result_cache_path = os.environ.get('RESULT_CACHE_PATH', 'result_cache.sqlite3')
+
+def open_result_cache(version):
+    if not result_cache_path:
+        return None
+    cache = ResultCache(
+        result_cache_path,
+        version,
+        max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 100000)),
+        ttl=float(os.environ.get('RESULT_CACHE_TTL', 3600)),
+        policy=os.environ.get('RESULT_CACHE_POLICY', 'lru')
+    )
+    print(f"Result cache at {result_cache_path} for model version {cache.model_version}")
+    return cache
+
+def model_files_stamp():
+    """Identity of the model files; os.replace gives a new inode, so a swapped-in file changes it."""
+    stamp = []
+    for path in (model_path, fast_model_path):
+        try:
+            info = os.stat(path)
+            stamp.append((info.st_ino, info.st_mtime_ns, info.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return stamp
+
+matchers = {}
+matcher = None
+result_cache = None
+model_stamp = model_files_stamp()
 try:
-    with open("hindi_name_matcher.pkl", 'rb') as f:
-        model = pickle.load(f)
-    matcher = HindiNameMatcher(model)
+    matchers, version = load_matchers()
+    matcher = matchers['full']
     model_loaded = True
-    print("Model loaded successfully!")
+    print(f"Model loaded successfully from {model_path}!")
+    result_cache = open_result_cache(version)
 except FileNotFoundError:
     print("Model file not found. API will operate in demo mode.")
     model_loaded = False
@@ -23,26 +102,165 @@ except Exception as e:
     print(f"Error loading model: {e}")
     model_loaded = False
 
+model_reload_lock = threading.Lock()
+last_model_check = time.monotonic()
+
+def reload_models_if_changed():
+    """Swap in new model files, checking at most once per MODEL_CHECK_INTERVAL.
+    
+    Retraining (feedback.py) replaces the model files by atomic rename.
+    Requests already running keep the matcher they started with, and the old
+    files stay readable through their open memory maps. A request that
+    straddles the swap may cache an old-model result under the new version
+    until it expires (RESULT_CACHE_TTL). If the new files fail to load, the
+    old models keep serving.
+    """
+    global matchers, matcher, result_cache, model_loaded, model_stamp, last_model_check
+    if time.monotonic() - last_model_check < MODEL_CHECK_INTERVAL:
+        return False
+    if not model_reload_lock.acquire(blocking=False):
+        return False
+    try:
+        last_model_check = time.monotonic()
+        stamp = model_files_stamp()
+        if stamp == model_stamp:
+            return False
+        model_stamp = stamp
+        try:
+            loaded, version = load_matchers()
+        except Exception as e:
+            print(f"Error reloading model: {e}")
+            return False
+        result_cache = open_result_cache(version)
+        matchers = loaded
+        matcher = loaded['full']
+        model_loaded = True
+        print(f"Model reloaded from {model_path} (version {version})")
+        return True
+    finally:
+        model_reload_lock.release()
+
+def cached(namespace, key, compute, cacheable=None):
+    """Return compute() through the result cache when it is enabled.
+    
+    Values for which cacheable(value) is false are returned but not stored.
+    """
+    if result_cache is None:
+        return compute()
+    value = result_cache.get(namespace, key)
+    if value is None:
+        value = compute()
+        if cacheable is None or cacheable(value):
+            result_cache.set(namespace, key, value)
+    return value
+
+def select_matcher(data):
+    """(mode, matcher) for a request's "mode" field; matcher is None if the mode is unavailable."""
+    mode = data.get('mode', DEFAULT_MODE)
+    return mode, matchers.get(mode)
+
+def mode_error(mode):
+    return {'error': f"Mode '{mode}' is not available; choose from {', '.join(matchers)}"}, 400
+
+def mode_namespace(namespace, mode):
+    """Result cache namespace for a mode; full mode keeps the plain namespace."""
+    return namespace if mode == 'full' else f"{namespace}_{mode}"
+
+# Adjudicated pairs for retraining; FEEDBACK_PATH='' disables the feedback endpoints
+feedback_path = os.environ.get('FEEDBACK_PATH', 'feedback.sqlite3')
+feedback_store = FeedbackStore(feedback_path) if feedback_path else None
+
+# One background retrain at a time, in its own process so serving keeps its CPU time and GIL
+retrain_executor = None
+retrain_future = None
+retrain_lock = threading.Lock()
+
+# Load the name registry used by server-side search
+registry_path = os.environ.get('REGISTRY_PATH', 'hindi_names_dataset.csv')
+# Registry shards (see sharded_registry.py): REGISTRY_SHARDS > 0 starts that many shard
+# processes, REGISTRY_SHARD_ADDRESSES (comma-separated) connects to shards already running
+REGISTRY_SHARDS = int(os.environ.get('REGISTRY_SHARDS', 0))
+REGISTRY_SHARD_ADDRESSES = [address for address in os.environ.get('REGISTRY_SHARD_ADDRESSES', '').split(',')
+                            if address]
+# Shards that have not answered after this long are left out of a partial result
+REGISTRY_SHARD_TIMEOUT_MS = float(os.environ.get('REGISTRY_SHARD_TIMEOUT_MS', 1000))
+try:
+    if REGISTRY_SHARD_ADDRESSES:
+        registry = ShardedRegistry(REGISTRY_SHARD_ADDRESSES, os.environ.get('REGISTRY_SHARD_AUTHKEY', ''),
+                                   REGISTRY_SHARD_TIMEOUT_MS / 1000)
+        registry_path = ','.join(REGISTRY_SHARD_ADDRESSES)
+    elif REGISTRY_SHARDS > 0:
+        if not os.path.exists(registry_path):
+            raise FileNotFoundError(registry_path)
+        registry = ShardedRegistry.start(registry_path, REGISTRY_SHARDS, model_path, fast_model_path, CASCADE_BAND,
+                                         REGISTRY_SHARD_TIMEOUT_MS / 1000)
+    else:
+        registry = NameRegistry.load(registry_path)
+    if isinstance(registry, ShardedRegistry):
+        print(f"Registry loaded with {len(registry)} records in {len(registry.addresses)} shards")
+    else:
+        print(f"Registry loaded with {len(registry)} records ({len(registry.names)} distinct names)")
+except FileNotFoundError:
+    print("Registry file not found. Registry search will be unavailable.")
+    registry = None
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    reload_models_if_changed()
+
+@app.after_request
+def record_request_time(response):
+    # Streamed responses are timed up to the first byte
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.request_seconds.observe(time.perf_counter() - g.request_start, endpoint, str(response.status_code))
+    metrics.flush_if_due()
+    return response
+
+def json_response(body, status):
+    """jsonify a response body, timed as the serialization stage."""
+    with metrics.stage_seconds.time('serialization'):
+        return jsonify(body), status
+
 # Serve the main page
 @app.route('/')
 def index():
     return send_from_directory('static', 'index.html') 
 
-@app.route('/api/compare', methods=['POST'])
-def compare_names():
-    """API endpoint to compare two names."""
-    data = request.json
-    name1 = data.get('name1', '')
-    name2 = data.get('name2', '')
+def compare_request_error(data):
+    """Error response for a compare request that cannot be scored, or None."""
+    if not isinstance(data, dict):
+        return {'error': 'Request body must be a JSON object'}, 400
+    if not data.get('name1') or not data.get('name2'):
+        return {'error': 'Both names are required'}, 400
+    try:
+        float(data.get('threshold', 0.5))
+    except (TypeError, ValueError):
+        return {'error': 'threshold must be a number'}, 400
+    return None
+
+def compare_response(data):
+    """Response body and status for a compare request."""
+    error = compare_request_error(data)
+    if error:
+        return error
+    name1 = data['name1']
+    name2 = data['name2']
     threshold = float(data.get('threshold', 0.5))
     
-    if not name1 or not name2:
-        return jsonify({'error': 'Both names are required'}), 400
-    
     if model_loaded:
-        # Use the actual model
-        result = matcher.predict_match(name1, name2, threshold)
-        return jsonify(result)
+        mode, mode_matcher = select_matcher(data)
+        if mode_matcher is None:
+            return mode_error(mode)
+        # Use the actual model; the cached result does not depend on the threshold,
+        # except in cascade mode where the threshold decides which model scores the pair
+        key = pair_key(name1, name2)
+        if mode == 'cascade':
+            key += f"|{threshold}"
+        result = cached(mode_namespace('compare', mode), key,
+                        lambda: mode_matcher.predict_match(name1, name2, threshold))
+        result['is_match'] = result['confidence'] >= threshold
+        return result, 200
     else:
         # Demo mode - use placeholder results
         import random
@@ -53,30 +271,180 @@ def compare_names():
         # Add some randomness for demo purposes
         confidence = min(1.0, max(0.0, similarity + random.uniform(-0.1, 0.1)))
         
-        return jsonify({
+        return {
             'is_match': confidence >= threshold,
             'confidence': confidence,
             'features': {
                 'levenshtein_ratio': similarity,
                 'note': 'This is a demo result. Features are simulated.'
             }
-        })
+        }, 200
 
-@app.route('/api/search', methods=['POST'])
-def search_names():
-    """API endpoint to search for matching names."""
-    data = request.json
+def compare_batch_response(batch):
+    """Response bodies and statuses for several compare requests, scored with one model call.
+    
+    Invalid requests, cascade mode, demo mode and cache hits are answered
+    one by one, so an invalid request only gets its own 400; the remaining
+    pairs go through one predict_matches call per mode.
+    """
+    if not model_loaded:
+        return [compare_response(data) for data in batch]
+    
+    responses = [None] * len(batch)
+    to_score = {}
+    for i, data in enumerate(batch):
+        error = compare_request_error(data)
+        if error:
+            responses[i] = error
+            continue
+        name1 = data['name1']
+        name2 = data['name2']
+        mode = data.get('mode', DEFAULT_MODE)
+        if mode not in matchers or mode == 'cascade':
+            responses[i] = compare_response(data)
+            continue
+        namespace = mode_namespace('compare', mode)
+        result = result_cache.get(namespace, pair_key(name1, name2)) if result_cache else None
+        if result is None:
+            to_score.setdefault(mode, []).append(i)
+        else:
+            result['is_match'] = result['confidence'] >= float(data.get('threshold', 0.5))
+            responses[i] = (result, 200)
+    
+    for mode, indices in to_score.items():
+        pairs = [(batch[i]['name1'], batch[i]['name2']) for i in indices]
+        for i, pair, result in zip(indices, pairs, matchers[mode].predict_matches(pairs)):
+            if result_cache:
+                result_cache.set(mode_namespace('compare', mode), pair_key(*pair), result)
+            result['is_match'] = result['confidence'] >= float(batch[i].get('threshold', 0.5))
+            responses[i] = (result, 200)
+    return responses
+
+compare_batcher = None
+compare_batcher_lock = threading.Lock()
+
+def get_compare_batcher():
+    """The /api/compare micro-batcher, started on first use; None when batching is off."""
+    global compare_batcher
+    if COMPARE_BATCH_WAIT_MS <= 0:
+        return None
+    with compare_batcher_lock:
+        if compare_batcher is None:
+            compare_batcher = MicroBatcher(compare_batch_response, COMPARE_BATCH_SIZE, COMPARE_BATCH_WAIT_MS)
+    return compare_batcher
+
+@app.route('/api/compare', methods=['POST'])
+def compare_names():
+    """API endpoint to compare two names."""
+    batcher = get_compare_batcher()
+    error = compare_request_error(request.json)
+    if error:
+        body, status = error
+    elif batcher is not None:
+        body, status = batcher.submit(request.json).result()
+    else:
+        body, status = compare_response(request.json)
+    return json_response(body, status)
+
+def score_bulk_batch(batch, threshold):
+    """Score a batch of parsed bulk pairs and return their NDJSON result lines."""
+    pairs = [(item['name1'], item['name2']) for item in batch]
+    if model_loaded:
+        confidences = matcher.score_pairs(pairs).tolist()
+    else:
+        # Demo mode - plain Levenshtein similarity
+        import Levenshtein
+        confidences = [Levenshtein.ratio(name1.lower(), name2.lower()) for name1, name2 in pairs]
+    
+    lines = []
+    for item, confidence in zip(batch, confidences):
+        result = {'name1': item['name1'], 'name2': item['name2'],
+                  'is_match': confidence >= threshold, 'confidence': confidence}
+        if 'id' in item:
+            result['id'] = item['id']
+        lines.append(json.dumps(result) + '\n')
+    return ''.join(lines)
+
+@app.route('/api/compare/bulk', methods=['POST'])
+def compare_names_bulk():
+    """API endpoint to compare a stream of NDJSON name pairs.
+    
+    Each request line is {"name1": ..., "name2": ...} with an optional "id".
+    Lines are read lazily and scored in batches of BULK_BATCH_SIZE, and each
+    batch's results are streamed back as NDJSON as soon as it is scored, so
+    memory stays bounded whatever the size of the upload.
+    """
+    threshold = float(request.args.get('threshold', 0.5))
+    
+    def generate():
+        batch = []
+        for line_number, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                if not item.get('name1') or not item.get('name2'):
+                    raise ValueError('Both names are required')
+            except (ValueError, AttributeError) as e:
+                # Keep output in input order: flush pending pairs before the error line
+                if batch:
+                    yield score_bulk_batch(batch, threshold)
+                    batch = []
+                yield json.dumps({'line': line_number, 'error': str(e)}) + '\n'
+                continue
+            batch.append(item)
+            if len(batch) >= BULK_BATCH_SIZE:
+                yield score_bulk_batch(batch, threshold)
+                batch = []
+        if batch:
+            yield score_bulk_batch(batch, threshold)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def integer_field(data, field, default=None, minimum=0):
+    """JSON integer field of a request, or default when absent; ValueError when invalid."""
+    value = data.get(field)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise ValueError(f"{field} must be an integer of at least {minimum}")
+    return value
+
+def search_response(data):
+    """Response body and status for a search request.
+    
+    With top_k, only the best top_k matches are returned, and the response
+    reports how many candidates were scored and how many were pruned. With
+    max_distance, candidates more than that many edits from the query are
+    dropped before scoring.
+    """
     query_name = data.get('query_name', '')
     candidate_names = data.get('candidate_names', [])
     threshold = float(data.get('threshold', 0.5))
+    try:
+        top_k = integer_field(data, 'top_k', minimum=1)
+        max_distance = integer_field(data, 'max_distance')
+    except ValueError as e:
+        return {'error': str(e)}, 400
     
     if not query_name or not candidate_names:
-        return jsonify({'error': 'Query name and candidate names are required'}), 400
+        return {'error': 'Query name and candidate names are required'}, 400
     
     if model_loaded:
         # Use the actual model
-        matches = matcher.find_matches(query_name, candidate_names, threshold)
-        return jsonify({'matches': matches})
+        mode, mode_matcher = select_matcher(data)
+        if mode_matcher is None:
+            return mode_error(mode)
+        namespace = mode_namespace('search', mode)
+        key = f"{query_name.lower()}|{threshold}|{top_k}|{max_distance}|{list_key(candidate_names)}"
+        if top_k is not None:
+            result = cached(namespace, key, lambda: mode_matcher.top_matches(
+                query_name, candidate_names, top_k, threshold, max_distance=max_distance))
+            return result, 200
+        matches = cached(namespace, key, lambda: mode_matcher.find_matches(
+            query_name, candidate_names, threshold, max_distance=max_distance))
+        return {'matches': matches}, 200
     else:
         # Demo mode - use placeholder results
         import random
@@ -98,7 +466,147 @@ def search_names():
         # Sort by confidence
         matches.sort(key=lambda x: x['confidence'], reverse=True)
         
-        return jsonify({'matches': matches})
+        return {'matches': matches[:top_k] if top_k is not None else matches}, 200
+
+@app.route('/api/search', methods=['POST'])
+def search_names():
+    """API endpoint to search for matching names."""
+    body, status = search_response(request.json)
+    return json_response(body, status)
+
+def registry_search_response(data):
+    """Response body and status for a registry search request."""
+    query_name = data.get('query_name', '')
+    threshold = float(data.get('threshold', 0.5))
+    try:
+        top_k = integer_field(data, 'top_k', 10, minimum=1)
+        max_distance = integer_field(data, 'max_distance')
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    
+    if not query_name:
+        return {'error': 'Query name is required'}, 400
+    
+    if registry is None:
+        return {'error': 'Name registry is not loaded'}, 503
+    
+    if model_loaded:
+        mode, mode_matcher = select_matcher(data)
+        if mode_matcher is None:
+            return mode_error(mode)
+        key = f"{query_name.lower()}|{threshold}|{top_k}|{max_distance}|{registry_path}|{registry.version}"
+        if isinstance(registry, ShardedRegistry):
+            # Results missing a shard are not cached, so the next search asks every shard again
+            result = cached(mode_namespace('registry_top_matches', mode), key,
+                            lambda: registry.search(mode, query_name, top_k, threshold, max_distance),
+                            lambda value: not value['partial'])
+        else:
+            result = cached(mode_namespace('registry_top_matches', mode), key,
+                            lambda: registry.search(mode_matcher, query_name, top_k, threshold, max_distance))
+        return result, 200
+    else:
+        # Demo mode - rank registry records by plain Levenshtein similarity
+        return registry.levenshtein_search(query_name, top_k, threshold), 200
+
+@app.route('/api/registry/search', methods=['POST'])
+def search_registry():
+    """API endpoint to search the server-side name registry."""
+    body, status = registry_search_response(request.json)
+    return json_response(body, status)
+
+@app.route('/api/feedback', methods=['GET', 'POST'])
+def feedback():
+    """API endpoint to record an officer's decision on a name pair, or get feedback counts.
+    
+    POST {"name1": ..., "name2": ..., "is_match": true, "source": "officer id"};
+    is_match must be a JSON boolean or 0/1.
+    """
+    if feedback_store is None:
+        return jsonify({'error': 'Feedback is disabled'}), 503
+    if request.method == 'POST':
+        data = request.json or {}
+        name1 = data.get('name1', '')
+        name2 = data.get('name2', '')
+        if not name1 or not name2 or 'is_match' not in data:
+            return jsonify({'error': 'name1, name2 and is_match are required'}), 400
+        try:
+            feedback_store.add(name1, name2, data['is_match'], data.get('source', ''))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(feedback_store.stats())
+
+def retrain_status():
+    if retrain_future is None:
+        return {'running': False}
+    if not retrain_future.done():
+        return {'running': True}
+    error = retrain_future.exception()
+    if error is not None:
+        return {'running': False, 'error': str(error)}
+    return {'running': False, 'last': retrain_future.result()}
+
+@app.route('/api/feedback/retrain', methods=['GET', 'POST'])
+def retrain_model():
+    """API endpoint to retrain on the feedback in the background, or get the retrain status.
+    
+    POST {"mode": "add-trees", "trees": 20, "feedback_weight": 1.0} starts a
+    retrain (mode "refresh" refits every tree). The new model files replace
+    the served ones by atomic rename and every process switches to them
+    within MODEL_CHECK_INTERVAL seconds.
+    """
+    global retrain_executor, retrain_future
+    if feedback_store is None:
+        return jsonify({'error': 'Feedback is disabled'}), 503
+    if request.method == 'GET':
+        return jsonify(retrain_status())
+    
+    data = request.json or {}
+    mode = data.get('mode', 'add-trees')
+    if mode not in RETRAIN_MODES:
+        return jsonify({'error': f"Unknown mode '{mode}'; choose from {', '.join(RETRAIN_MODES)}"}), 400
+    base_path = os.path.splitext(model_path)[0]
+    options = {
+        'mode': mode,
+        'trees': int(data.get('trees', 20)),
+        'feedback_weight': float(data.get('feedback_weight', 1.0)),
+        'pickle_path': base_path + '.pkl',
+        'forest_path': base_path + '.forest'
+    }
+    with retrain_lock:
+        if retrain_future is not None and not retrain_future.done():
+            return jsonify(dict(retrain_status(), error='A retrain is already running')), 409
+        if retrain_executor is None:
+            retrain_executor = ProcessPoolExecutor(max_workers=1)
+        retrain_future = retrain_executor.submit(retrain_store, feedback_path, **options)
+    return jsonify(retrain_status()), 202
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """API endpoint to get result cache hit/miss counters."""
+    if result_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(result_cache.stats(), enabled=True))
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """API endpoint exposing timing histograms in the Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/settings', methods=['GET', 'POST'])
+def metrics_settings():
+    """API endpoint to read or change feature timing and the sampling profiler at runtime.
+    
+    POST {"feature_timing": true, "profiler": true, "profiler_interval_ms": 5}
+    with any subset of the keys.
+    """
+    if request.method == 'POST':
+        return jsonify(metrics.apply_settings(request.json or {}))
+    return jsonify(metrics.settings())
+
+@app.route('/api/metrics/profile', methods=['GET'])
+def metrics_profile():
+    """API endpoint returning profiler samples as folded stacks (flamegraph.pl input)."""
+    return Response(metrics.folded_profile(), mimetype='text/plain')
 
 @app.route('/api/feature-importance', methods=['GET'])
 def feature_importance():
@@ -0,0 +1,443 @@
+"""Name registry partitioned across shard processes, searched by scatter-gather.
+
+Each shard process owns the records whose name hashes to it (shard_of),
+with its own NameRegistry indexes and its own copy of the models, and
+serves search requests over a multiprocessing.connection socket: a Unix
+socket path on one machine, or host:port for shards on other nodes. A
+ShardedRegistry sends the query to every shard at once, waits for their
+top_k lists until the shard timeout and merges them by confidence.
+Shards that miss the deadline, or cannot be reached, are left out and the
+result is marked partial with the missing shard numbers.
+
+A name lives in exactly one shard, so the merged top_k is the top_k of
+the shards' answers. Blocked candidates split across the shards with
+their names; the TF-IDF shortlist is split too, each shard taking its
+share of shortlist_size by its own document frequencies, so the classifier
+scores about as many names in total as with one registry. The shortlisted
+names can therefore differ slightly from a single registry's; searches
+with max_distance find exactly the same names.
+
+Shards are started by the server (REGISTRY_SHARDS) or run on their own:
+    REGISTRY_SHARD_AUTHKEY=secret python sharded_registry.py serve --registry hindi_names_dataset.csv \\
+        --shard 0 --shards 4 --address 0.0.0.0:7100
+"""
+import argparse
+import atexit
+import math
+import itertools
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import (Connection, Listener, address_type, answer_challenge, deliver_challenge,
+                                        wait)
+
+from matcher import CascadeMatcher, HindiNameMatcher, load_model
+from registry import NameRegistry, read_records
+
+# Names shortlisted by TF-IDF across all shards, as NameRegistry's default
+SHORTLIST_SIZE = 100
+
+# Seconds a starting coordinator waits for every shard to load and answer
+SHARD_STARTUP_TIMEOUT = 300.0
+
+# Seconds between checks of a shard's model files for a retrained model
+MODEL_CHECK_INTERVAL = float(os.environ.get('MODEL_CHECK_INTERVAL', 2.0))
+
+
+def shard_of(name, shards):
+    """Shard owning a name; stable across processes and machines, unlike hash()."""
+    return zlib.crc32(str(name).encode('utf-8')) % shards
+
+
+def parse_address(address):
+    """('host', port) for host:port, otherwise the address as a Unix socket path."""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return (host, int(port))
+    return address
+
+
+def _set_socket_timeouts(sock, seconds):
+    # Kernel send and receive timeouts; Connection uses the raw descriptor, so sock.settimeout would not apply
+    timeval = struct.pack('ll', int(seconds), int(seconds % 1 * 1e6))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeval)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, timeval)
+
+
+def connect(address, authkey, deadline):
+    """Authenticated connection to a shard, like multiprocessing.connection.Client.
+
+    Raises OSError when connecting or the authentication handshake is not
+    done by deadline (a time.monotonic() value), so a shard that does not
+    answer, or accepts the connection and then stalls, costs at most the
+    time left until the deadline.
+    """
+    def remaining():
+        seconds = deadline - time.monotonic()
+        if seconds <= 0:
+            raise TimeoutError(f"No time left to connect to {address}")
+        return seconds
+
+    with socket.socket(getattr(socket, address_type(address))) as sock:
+        sock.settimeout(remaining())
+        sock.connect(address)
+        sock.setblocking(True)
+        _set_socket_timeouts(sock, remaining())
+        conn = Connection(os.dup(sock.fileno()))
+        try:
+            answer_challenge(conn, authkey)
+            deliver_challenge(conn, authkey)
+        except BaseException:
+            conn.close()
+            raise
+        _set_socket_timeouts(sock, 0)
+    return conn
+
+
+# Shard process
+
+class ShardServer:
+    """One shard of the registry with the matchers to search it."""
+
+    def __init__(self, registry_path, shard, shards, model_path=None, fast_model_path=None, cascade_band=0.1,
+                 shortlist_size=SHORTLIST_SIZE):
+        self.shard = shard
+        self.shards = shards
+        self.registry = NameRegistry((record for record in read_records(registry_path)
+                                      if shard_of(record['name'], shards) == shard),
+                                     shortlist_size=math.ceil(shortlist_size / shards))
+        self.model_paths = (model_path, fast_model_path)
+        self.cascade_band = cascade_band
+        self.matchers = {}
+        self._model_stamp = None
+        self._last_model_check = 0.0
+        self._model_lock = threading.Lock()
+        self._reload_models_if_changed()
+
+    def _files_stamp(self):
+        stamp = []
+        for path in self.model_paths:
+            try:
+                info = os.stat(path)
+                stamp.append((info.st_ino, info.st_mtime_ns, info.st_size))
+            except (FileNotFoundError, TypeError):
+                stamp.append(None)
+        return stamp
+
+    def _reload_models_if_changed(self):
+        # Same rule as the server: retraining replaces the files by atomic rename
+        now = time.monotonic()
+        if self._model_stamp is not None and now - self._last_model_check < MODEL_CHECK_INTERVAL:
+            return
+        with self._model_lock:
+            self._last_model_check = now
+            stamp = self._files_stamp()
+            if stamp == self._model_stamp:
+                return
+            matchers = {}
+            model_path, fast_model_path = self.model_paths
+            if stamp[0] is not None:
+                matchers['full'] = HindiNameMatcher(load_model(model_path))
+                if stamp[1] is not None:
+                    fast_model = load_model(fast_model_path)
+                    matchers['fast'] = HindiNameMatcher(fast_model, fast_model.feature_names)
+                    matchers['cascade'] = CascadeMatcher(matchers['fast'], matchers['full'], self.cascade_band)
+            self.matchers = matchers
+            self._model_stamp = stamp
+
+    def handle(self, request):
+        """Reply to one request dict; every reply carries the request's id."""
+        op = request.get('op')
+        if op == 'info':
+            result = {'shard': self.shard, 'shards': self.shards, 'records': len(self.registry),
+                      'names': len(self.registry.names), 'version': self.registry.version,
+                      'modes': sorted(self.matchers)}
+        elif op == 'search':
+            self._reload_models_if_changed()
+            matcher = self.matchers.get(request.get('mode', 'full'))
+            if matcher is None:
+                return {'id': request.get('id'), 'error': f"Mode {request.get('mode')!r} is not available"}
+            start, cpu_start = time.perf_counter(), time.thread_time()
+            result = self.registry.search(matcher, request['query_name'], request['top_k'],
+                                          request['threshold'], request.get('max_distance'))
+            result['shard_ms'] = (time.perf_counter() - start) * 1e3
+            result['shard_cpu_ms'] = (time.thread_time() - cpu_start) * 1e3
+        elif op == 'levenshtein_search':
+            start, cpu_start = time.perf_counter(), time.thread_time()
+            result = self.registry.levenshtein_search(request['query_name'], request['top_k'], request['threshold'])
+            result['shard_ms'] = (time.perf_counter() - start) * 1e3
+            result['shard_cpu_ms'] = (time.thread_time() - cpu_start) * 1e3
+        else:
+            return {'id': request.get('id'), 'error': f"Unknown op {op!r}"}
+        return {'id': request.get('id'), 'result': result}
+
+    def _serve_client(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = self.handle(request)
+                except Exception as e:
+                    reply = {'id': request.get('id'), 'error': f"{type(e).__name__}: {e}"}
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+
+    def serve(self, address, authkey):
+        """Accept coordinator connections forever, one thread per connection."""
+        with Listener(parse_address(address), authkey=authkey) as listener:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    # A client that failed authentication or hung up while connecting
+                    continue
+                threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+
+def _exit_with_parent(parent_pid):
+    # Shards started by a server must not outlive it, even if it is killed
+    while os.getppid() == parent_pid:
+        time.sleep(1.0)
+    os._exit(0)
+
+
+def _stop_processes(processes, directory):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+# Coordinator
+
+class ShardedRegistry:
+    """Scatter-gather search over shard processes at the given addresses.
+
+    Safe to share between threads: each search takes a set of connections
+    (one per shard) from a pool, opening a new set when all are in use.
+    After a fork the child opens its own connections.
+    """
+
+    def __init__(self, addresses, authkey, timeout=1.0, startup_timeout=SHARD_STARTUP_TIMEOUT):
+        self.addresses = [parse_address(address) if isinstance(address, str) else address for address in addresses]
+        self.authkey = authkey.encode('utf-8') if isinstance(authkey, str) else authkey
+        self.timeout = timeout
+        # Shard processes started by start(), their socket directory and the process that owns them
+        self.processes = []
+        self._directory = None
+        self._owner = None
+        self._idle = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+
+        # Wait for every shard to have loaded its part of the registry
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            replies, missing = self._scatter({'op': 'info'}, max(deadline - time.monotonic(), 0))
+            if not missing:
+                break
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Registry shards {missing} did not answer within {startup_timeout}s")
+            time.sleep(0.2)
+        self.shard_info = [replies[i] for i in range(len(self.addresses))]
+        # Shards only change by restarting them, so the versions at connect time identify the contents
+        self.version = '.'.join(str(info['version']) for info in self.shard_info)
+
+    @classmethod
+    def start(cls, registry_path, shards, model_path=None, fast_model_path=None, cascade_band=0.1,
+              timeout=1.0):
+        """Start shards of registry_path as child processes on Unix sockets and connect to them."""
+        authkey = os.urandom(16).hex()
+        directory = tempfile.mkdtemp(prefix='hnm-shards-')
+        addresses = [os.path.join(directory, f"shard-{shard}.sock") for shard in range(shards)]
+        environment = dict(os.environ, REGISTRY_SHARD_AUTHKEY=authkey)
+        here = os.path.dirname(os.path.abspath(__file__))
+        processes = []
+        for shard, address in enumerate(addresses):
+            command = [sys.executable, os.path.join(here, 'sharded_registry.py'), 'serve',
+                       '--registry', registry_path, '--shard', str(shard), '--shards', str(shards),
+                       '--address', address, '--cascade-band', str(cascade_band), '--parent-pid', str(os.getpid())]
+            if model_path:
+                command += ['--model', model_path]
+            if fast_model_path:
+                command += ['--fast-model', fast_model_path]
+            processes.append(subprocess.Popen(command, env=environment))
+
+        try:
+            registry = cls(addresses, authkey, timeout)
+        except BaseException:
+            _stop_processes(processes, directory)
+            raise
+        registry.processes = processes
+        registry._directory = directory
+        registry._owner = os.getpid()
+        atexit.register(registry.stop)
+        return registry
+
+    def stop(self):
+        """Terminate the shard processes started by start()."""
+        # Forked server workers inherit the exit handler; only the starting process stops the shards
+        if os.getpid() != self._owner:
+            return
+        _stop_processes(self.processes, self._directory)
+        self.processes = []
+
+    def __len__(self):
+        return sum(info['records'] for info in self.shard_info)
+
+    def _checkout(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+            return self._idle.pop() if self._idle else [None] * len(self.addresses)
+
+    def _checkin(self, connections):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._idle.append(connections)
+
+    def _scatter(self, request, timeout):
+        """Send request to every shard; returns ({shard: result}, sorted shards without a result)."""
+        deadline = time.monotonic() + timeout
+        connections = self._checkout()
+        request = dict(request, id=next(self._request_ids))
+        replies, pending, missing = {}, {}, []
+
+        def send(shard):
+            try:
+                if connections[shard] is None:
+                    connections[shard] = connect(self.addresses[shard], self.authkey, deadline)
+                connections[shard].send(request)
+            except (OSError, EOFError, AuthenticationError):
+                if connections[shard] is not None:
+                    connections[shard].close()
+                connections[shard] = None
+
+        # Shards without a connection are connected to in parallel, each within the deadline
+        unconnected = [shard for shard, conn in enumerate(connections) if conn is None]
+        connecting = [threading.Thread(target=send, args=(shard,), daemon=True) for shard in unconnected]
+        for thread in connecting:
+            thread.start()
+        for shard in range(len(connections)):
+            if shard not in unconnected:
+                send(shard)
+        for thread in connecting:
+            thread.join()
+        for shard, conn in enumerate(connections):
+            if conn is None:
+                missing.append(shard)
+            else:
+                pending[conn] = shard
+
+        while pending:
+            # Replies already received are still read once the deadline has passed
+            ready = wait(list(pending), max(deadline - time.monotonic(), 0))
+            if not ready:
+                break
+            for conn in ready:
+                shard = pending[conn]
+                try:
+                    reply = conn.recv()
+                except (OSError, EOFError):
+                    conn.close()
+                    connections[shard] = None
+                    missing.append(pending.pop(conn))
+                    continue
+                # Only a reply to this request counts
+                if reply.get('id') != request['id']:
+                    continue
+                del pending[conn]
+                if 'error' in reply:
+                    missing.append(shard)
+                else:
+                    replies[shard] = reply['result']
+        # A connection still owing a reply is closed, so the next search connects afresh
+        # instead of waiting behind the late reply
+        for conn, shard in pending.items():
+            conn.close()
+            connections[shard] = None
+            missing.append(shard)
+        self._checkin(connections)
+        return replies, sorted(missing)
+
+    def _gather(self, request, top_k):
+        replies, missing = self._scatter(request, self.timeout)
+        # Merged in shard order, so equal confidences keep a stable order
+        matches = [match for shard in sorted(replies) for match in replies[shard]['matches']]
+        matches.sort(key=lambda match: match['confidence'], reverse=True)
+        result = {'matches': matches[:top_k]}
+        for field in ('candidates', 'scored', 'pruned'):
+            if any(field in reply for reply in replies.values()):
+                result[field] = sum(reply.get(field, 0) for reply in replies.values())
+        result['shards'] = len(self.addresses)
+        result['partial'] = bool(missing)
+        result['missing_shards'] = missing
+        # Wall and CPU time each shard spent searching, None for missing shards
+        for field in ('shard_ms', 'shard_cpu_ms'):
+            result[field] = [replies[shard][field] if shard in replies else None
+                             for shard in range(len(self.addresses))]
+        return result
+
+    def search(self, mode, query_name, top_k=10, threshold=0.5, max_distance=None):
+        """NameRegistry.search on every shard with the shards' matcher for mode, merged.
+
+        Adds 'shards', 'partial', 'missing_shards', and 'shard_ms' and
+        'shard_cpu_ms' (each shard's search time) to the result.
+        """
+        return self._gather({'op': 'search', 'mode': mode, 'query_name': query_name, 'top_k': top_k,
+                             'threshold': threshold, 'max_distance': max_distance}, top_k)
+
+    def levenshtein_search(self, query_name, top_k=10, threshold=0.5):
+        """NameRegistry.levenshtein_search on every shard, merged."""
+        return self._gather({'op': 'levenshtein_search', 'query_name': query_name, 'top_k': top_k,
+                             'threshold': threshold}, top_k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve one shard of the name registry.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help="Load a shard and answer coordinator requests")
+    serve.add_argument('--registry', default='hindi_names_dataset.csv', help="Registry CSV or SQLite file")
+    serve.add_argument('--shard', type=int, required=True)
+    serve.add_argument('--shards', type=int, required=True)
+    serve.add_argument('--address', required=True, help="host:port or Unix socket path to listen on")
+    serve.add_argument('--model', default='hindi_name_matcher.forest')
+    serve.add_argument('--fast-model', default='hindi_name_matcher_fast.forest')
+    serve.add_argument('--cascade-band', type=float, default=0.1)
+    serve.add_argument('--parent-pid', type=int, help="Exit when this process is no longer the parent")
+    args = parser.parse_args()
+
+    authkey = os.environ.get('REGISTRY_SHARD_AUTHKEY')
+    if not authkey:
+        parser.error("Set REGISTRY_SHARD_AUTHKEY to the key shared with the coordinator")
+    if not 0 <= args.shard < args.shards:
+        parser.error("--shard must be between 0 and --shards - 1")
+    if args.parent_pid:
+        threading.Thread(target=_exit_with_parent, args=(args.parent_pid,), daemon=True).start()
+
+    start = time.perf_counter()
+    server = ShardServer(args.registry, args.shard, args.shards, args.model, args.fast_model, args.cascade_band)
+    print(f"Registry shard {args.shard}/{args.shards}: {len(server.registry)} records, "
+          f"{len(server.registry.names)} names, modes {sorted(server.matchers)}, "
+          f"loaded in {time.perf_counter() - start:.1f}s; listening on {args.address}", flush=True)
+    server.serve(args.address, authkey.encode('utf-8'))
+
+
+if __name__ == '__main__':
+    main()
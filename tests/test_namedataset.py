@@ -0,0 +1,28 @@
+import sys
+
+import pandas as pd
+import pytest
+
+import Namedatasett
+
+
+def generate(monkeypatch, directory, file_format):
+    records = directory / f"records.{file_format}"
+    pairs = directory / f"pairs.{file_format}"
+    # Several chunks, so the Parquet writer appends row groups like it does for large corpora
+    monkeypatch.setattr(sys, 'argv', ['Namedatasett.py', '--people', '120', '--seed', '7', '--chunk-size', '50',
+                                      '--format', file_format, '--records', str(records), '--pairs', str(pairs)])
+    Namedatasett.main()
+    return records, pairs
+
+
+def test_parquet_output_matches_csv(monkeypatch, tmp_path):
+    pytest.importorskip('pyarrow')
+    csv_records, csv_pairs = generate(monkeypatch, tmp_path, 'csv')
+    parquet_records, parquet_pairs = generate(monkeypatch, tmp_path, 'parquet')
+
+    for csv_path, parquet_path in ((csv_records, parquet_records), (csv_pairs, parquet_pairs)):
+        from_parquet = pd.read_parquet(parquet_path)
+        from_csv = pd.read_csv(csv_path, dtype=from_parquet.dtypes.to_dict(), keep_default_na=False)
+        assert len(from_parquet) > 0
+        pd.testing.assert_frame_equal(from_parquet, from_csv)
@@ -0,0 +1,43 @@
+import registry
+from registry import NameRegistry
+
+
+def make_registry(count):
+    return NameRegistry({'person_id': f'P{i}', 'name': f'Name{i} Sharma', 'case_id': f'C{i}', 'role': 'victim'}
+                        for i in range(count))
+
+
+def wait_for_rebuild(reg):
+    if reg._rebuild is not None:
+        reg._rebuild[0].join()
+
+
+def test_failed_rebuild_keeps_indexes_and_retries(monkeypatch):
+    monkeypatch.setattr(registry, 'REBUILD_MIN_CHANGES', 2)
+    reg = make_registry(10)
+    indexes = reg.indexes()
+
+    build = registry.NameIndexes
+
+    def fail(names, removals=0):
+        raise MemoryError("no room for the rebuild")
+
+    monkeypatch.setattr(registry, 'NameIndexes', fail)
+    for i in range(10, 12):
+        reg.add_record({'person_id': f'P{i}', 'name': f'Name{i} Verma'})
+    wait_for_rebuild(reg)
+
+    assert reg.indexes() is indexes
+    assert reg._rebuild is None
+    assert isinstance(reg.rebuild_error, MemoryError)
+    # Names added since the last build are still found through the TF-IDF index
+    assert 'Name11 Verma' in reg.candidates('Name11 Verma')
+
+    # The next change starts a new rebuild, which succeeds
+    monkeypatch.setattr(registry, 'NameIndexes', build)
+    reg.add_record({'person_id': 'P12', 'name': 'Name12 Verma'})
+    wait_for_rebuild(reg)
+
+    assert reg.indexes() is not indexes
+    assert reg.indexes().size == 13
+    assert reg.rebuild_error is None
@@ -0,0 +1,151 @@
+"""Character n-gram TF-IDF vectors of names, for cosine scoring of one query against all names.
+
+Every name is described by its character bigrams and trigrams (as in
+common_ngrams) in two views: the lowercased name and its
+normalize_hindi_transliterations form, so "Shaym" and "Syam" share the
+grams of their normalised spellings. Gram weights are binary term
+frequency times smoothed inverse document frequency, and every name vector
+is L2-normalised.
+
+The vectors are stored as one SciPy CSR matrix with a row per gram and a
+column per name. A query touches only the rows of its own grams, so
+scoring all names is one sparse mat-vec whose cost depends on how many
+names share grams with the query; the best top_n then come from
+np.argpartition.
+
+Names added after the build are appended as extra columns weighted by the
+build's idf (grams no built name had get the idf of an unseen gram), and
+removed names are masked out, so the index follows a changing registry
+until it is rebuilt.
+"""
+from array import array
+
+import numpy as np
+from scipy import sparse
+
+from matcher import name_ngrams, normalize_hindi_transliterations
+
+# Prefix separating grams of the normalised view from grams of the name itself
+NORMALIZED_PREFIX = '\x1f'
+
+
+def name_terms(name, sizes=(2, 3)):
+    """Grams of the lowercased name plus, prefixed, those of its normalised form."""
+    name = str(name).lower()
+    terms = name_ngrams(name, sizes)
+    terms.update(NORMALIZED_PREFIX + gram for gram in name_ngrams(normalize_hindi_transliterations(name), sizes))
+    return terms
+
+
+class TfidfIndex:
+    """TF-IDF character n-gram matrix over a list of names, indexed by position.
+
+    None entries (removed names) get an empty column and never score.
+    add() and remove() change the index in place without recomputing the
+    idf; build a new index to refresh it.
+    """
+
+    def __init__(self, names, sizes=(2, 3)):
+        self.names = list(names)
+        self.sizes = sizes
+        self.vocabulary = {}
+        # Gram ids of every name back to back, packed to keep a million names small
+        rows, counts = array('i'), np.zeros(len(self.names), dtype=np.int64)
+        for name_id, name in enumerate(self.names):
+            if name is None:
+                continue
+            terms = name_terms(name, sizes)
+            rows.extend(self.vocabulary.setdefault(term, len(self.vocabulary)) for term in terms)
+            counts[name_id] = len(terms)
+
+        rows = np.frombuffer(rows, dtype=np.int32)
+        columns = np.repeat(np.arange(len(self.names), dtype=np.int32), counts)
+        document_count = len(self.names) - self.names.count(None)
+        document_frequency = np.bincount(rows, minlength=len(self.vocabulary))
+        # Smoothed idf, as scikit-learn's TfidfVectorizer
+        self.idf = np.log((1 + document_count) / (1 + document_frequency)) + 1
+        self.unknown_idf = np.log(1 + document_count) + 1
+
+        weights = self.idf[rows]
+        norms = np.sqrt(np.bincount(columns, weights=weights ** 2, minlength=len(self.names)))
+        weights /= norms[columns]
+        self.matrix = sparse.csr_matrix((weights.astype(np.float32), (rows, columns)),
+                                        shape=(len(self.vocabulary), len(self.names)))
+        # Names added since the build, as (gram rows, weights) columns, and names removed since
+        self._added = []
+        self._added_matrix = None
+        self._removed = []
+
+    def add(self, name):
+        """Append a name (or None, as a removed name) and return its id."""
+        name_id = len(self.names)
+        self.names.append(name)
+        rows = np.array([], dtype=np.int64)
+        if name is not None:
+            rows = np.array([self.vocabulary.setdefault(term, len(self.vocabulary))
+                             for term in name_terms(name, self.sizes)], dtype=np.int64)
+        if len(self.vocabulary) > len(self.idf):
+            self.idf = np.concatenate([self.idf, np.full(len(self.vocabulary) - len(self.idf), self.unknown_idf)])
+        weights = self.idf[rows]
+        if len(weights):
+            weights /= np.sqrt((weights ** 2).sum())
+        self._added.append((rows, weights.astype(np.float32)))
+        self._added_matrix = None
+        return name_id
+
+    def remove(self, name_id):
+        """Stop scoring a name; its id is not reused."""
+        if self.names[name_id] is not None:
+            self.names[name_id] = None
+            self._removed.append(name_id)
+
+    def __len__(self):
+        return len(self.names) - self.names.count(None)
+
+    def scores(self, query_name):
+        """Cosine similarity of the query to every name, as a float32 array indexed by name id."""
+        known, unknown = [], 0
+        for term in name_terms(query_name, self.sizes):
+            row = self.vocabulary.get(term)
+            if row is None:
+                unknown += 1
+            else:
+                known.append(row)
+        if not known:
+            return np.zeros(len(self.names), dtype=np.float32)
+
+        known = np.array(known, dtype=np.int64)
+        weights = self.idf[known]
+        # Grams no name has still count towards the query's norm
+        query = (weights / np.sqrt((weights ** 2).sum() + unknown * self.unknown_idf ** 2)).astype(np.float32)
+        built = known < self.matrix.shape[0]
+        scores = query[built] @ self.matrix[known[built]]
+        if self._added:
+            scores = np.concatenate([scores, query @ self._added_columns()[known]])
+        scores[self._removed] = 0
+        return scores
+
+    def _added_columns(self):
+        """Gram-by-name matrix of the names added since the build."""
+        if self._added_matrix is None:
+            rows = np.concatenate([rows for rows, _ in self._added])
+            weights = np.concatenate([weights for _, weights in self._added])
+            columns = np.repeat(np.arange(len(self._added)), [len(rows) for rows, _ in self._added])
+            self._added_matrix = sparse.csr_matrix((weights, (rows, columns)),
+                                                   shape=(len(self.vocabulary), len(self._added)))
+        return self._added_matrix
+
+    def top_ids(self, query_name, top_n=100):
+        """Ids of the top_n names by cosine similarity, best first; names sharing no gram are left out."""
+        scores = self.scores(query_name)
+        if top_n < len(scores):
+            ids = np.argpartition(scores, len(scores) - top_n)[-top_n:]
+        else:
+            ids = np.arange(len(scores))
+        ids = ids[scores[ids] > 0]
+        # Ties keep the lower id first
+        return ids[np.lexsort((ids, -scores[ids]))].tolist()
+
+    def top(self, query_name, top_n=100):
+        """Names of the top_n names by cosine similarity, best first."""
+        return [self.names[i] for i in self.top_ids(query_name, top_n)]